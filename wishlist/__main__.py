@@ -3,12 +3,23 @@ from __future__ import unicode_literals, division, print_function, absolute_impo
 import logging
 import sys
 import argparse
+import json
 
 from captain import echo, exit, ArgError
 from captain.decorators import arg, args
 
 from wishlist import __version__
-from wishlist.core import Wishlist
+from wishlist.core import Wishlist, WishlistElement
+from wishlist.crawl import Crawler
+from wishlist.archive import Archiver
+from wishlist.cache import PageCache
+from wishlist.export import export
+from wishlist.reparse import Reparser
+from wishlist.profile import Profiler
+from wishlist.events import Events, Stats
+from wishlist.throttle import Throttle, Backoff
+from wishlist.checkpoint import Checkpoint
+from wishlist.region import get_region, REGIONS
 from wishlist.exception import RobotError, ParseError
 
 
@@ -20,9 +31,11 @@ log_handler.setFormatter(log_formatter)
 logger.addHandler(log_handler)
 
 
-def main_auth(**kwargs):
+@arg('--region', default="", help="the marketplace to sign in to (eg, de), defaults to WISHLIST_HOST")
+def main_auth(region="", **kwargs):
     """Signin to amazon so you can access private wishlists"""
-    with Wishlist.authenticate() as b:
+    host = get_region(region).host if region else ""
+    with Wishlist.authenticate(host) as b:
         # If you access from another country, amazon might prompt to redirect to
         # country specific store, we don't want that
         if b.has_element("#redir-opt-out"):
@@ -91,21 +104,168 @@ def main_auth(**kwargs):
 
 
 @arg('name', nargs=1, help="the name of the wishlist, amazon.com/gp/registry/wishlist/NAME")
-def main_dump(name, **kwargs):
+@arg(
+    '--fields',
+    default="",
+    help="comma separated item fields to print (eg, title,price,uuid), only these will be parsed"
+)
+@arg(
+    '--archive',
+    choices=["off", "sample", "always"],
+    default="",
+    help="save the fetched pages, defaults to WISHLIST_ARCHIVE or off"
+)
+@arg('--archive-dir', default="", help="where the archived pages are saved")
+@arg('--cache', action="store_true", help="cache the fetched pages on disk")
+@arg('--cache-dir', default="", help="where the cached pages are saved, turns on --cache")
+@arg('--cache-ttl', type=float, default=None, help="how many seconds a cached page is used")
+@arg('--replay', action="store_true", help="only use cached pages, nothing is fetched")
+@arg(
+    '--format',
+    choices=["text", "jsonl", "csv"],
+    default="text",
+    help="text prints numbered lines, jsonl and csv stream every item to stdout"
+)
+@arg(
+    '--stats',
+    default="",
+    help="write crawl stats to this file when done, json if it ends with .json, otherwise prometheus text"
+)
+@arg('--rate', type=float, default=0.0, help="the starting requests per second, it adapts to how the host responds, 0 turns throttling off")
+@arg('--retries', type=int, default=3, help="how many times a page is retried after a robot check or 429/503")
+@arg('--region', choices=sorted(REGIONS), default="", help="the marketplace the list is on, defaults to WISHLIST_HOST")
+@arg('--host', default="", help="the host the list is on (eg, https://www.amazon.de)")
+@arg('--resume', action="store_true", help="continue from the page the last --resume dump of the list stopped on, and save the progress of this one")
+@arg('--checkpoint-dir', default="", help="save the dump's progress here so it can be resumed")
+@arg('--profile', action="store_true", help="print where the time went when the dump is done")
+@arg('--profile-memory', action="store_true", help="also record the peak memory of each stage, turns on --profile")
+def main_dump(name, fields="", archive="", archive_dir="", cache=False, cache_dir="", cache_ttl=None, replay=False, format="text", stats="", rate=0.0, retries=3, region="", host="", resume=False, checkpoint_dir="", profile=False, profile_memory=False, **kwargs):
     """This is really here just to test that I can parse a wishlist completely and
     to demonstrate (by looking at the code) how to iterate through a list"""
-    name = name[0]
-    w = Wishlist(name)
+    fields = get_fields(fields)
+    profiler = None
+    if profile or profile_memory:
+        profiler = Profiler(memory=profile_memory).start()
+
+    events = Events()
+    crawl_stats = Stats(events)
+    try:
+        throttle = get_throttle(rate, retries)
+        checkpoint = None
+        if resume or checkpoint_dir:
+            checkpoint = Checkpoint(name[0], directory=checkpoint_dir)
+        dump(
+            name[0],
+            fields=fields,
+            format=format,
+            events=events,
+            throttle=throttle,
+            checkpoint=checkpoint,
+            resume=resume,
+            archive=archive,
+            archive_dir=archive_dir,
+            cache=cache,
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            replay=replay,
+            region=region,
+            host=host,
+        )
+
+    finally:
+        if stats:
+            crawl_stats.write(stats)
+
+        if profiler:
+            profiler.stop()
+            echo.err(profiler.report())
+
+
+def get_fields(fields):
+    """Return the list of the comma separated --fields value
+
+    :raises: ArgError, if a field isn't one of WishlistElement.json_fields
+    """
+    fields = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in WishlistElement.json_fields]
+    if unknown:
+        raise ArgError("Unknown fields {}, choose from {}".format(
+            ", ".join(unknown),
+            ", ".join(WishlistElement.json_fields)
+        ))
+    return fields
+
+
+def get_throttle(rate, retries):
+    """Return the Throttle the --rate and --retries flags ask for, None if rate is 0"""
+    if rate <= 0.0:
+        return None
+    return Throttle(backoff=Backoff(retries=retries), rate=rate)
+
+
+def dump(name, fields=None, format="text", events=None, throttle=None, checkpoint=None, resume=False, archive="", archive_dir="", cache=False, cache_dir="", cache_ttl=None, replay=False, region="", host=""):
+    """Iterate the wishlist and print its items, see main_dump() for the
+    arguments, the archiver is closed when done so every archived page is
+    written"""
+    page_cache = None
+    if cache or cache_dir or replay:
+        page_cache = PageCache(cache_dir, ttl=cache_ttl, replay=replay)
+
+    archiver = Archiver(archive, directory=archive_dir)
+    try:
+        w = Wishlist(name, archive=archiver, cache=page_cache, region=region, host=host)
+        items = w.crawl(resume=resume, events=events, throttle=throttle, checkpoint=checkpoint)
+        print_items(w, items, fields=fields, format=format, events=events)
+
+    finally:
+        archiver.close()
+
+
+def print_items(w, items, fields=None, format="text", events=None):
+    """Print the items of the wishlist w, see dump()
+
+    :param w: Wishlist
+    :param items: iterable, the items of w (eg, w.crawl())
+    :param fields: list, the fields of each item
+    :param format: string, "text", "jsonl" or "csv"
+    :param events: Events, the hooks items was crawled with, see export()
+    """
+    if format != "text":
+        def on_error(item, e):
+            if isinstance(e, RobotError):
+                raise e
+            if isinstance(e, ParseError):
+                w.item_failed(item, e)
+            echo.err("{} failed with {}", item.page_url, e)
+
+        # stdout only has the items so it can be piped somewhere else
+        i = export(
+            items,
+            sys.stdout,
+            format=format,
+            fields=fields or None,
+            on_error=on_error,
+            events=events,
+        )
+        echo.err("Done with wishlist, {} total items", i)
+        return
+
     i = 0
-    for i, item in enumerate(w, 1):
+    for i, item in enumerate(items, 1):
         try:
-            item_json = item.jsonable()
-            echo.out("{}. {} is ${:.2f}", i, item_json["title"], item_json["price"])
+            if fields:
+                item_json = item.jsonable(fields)
+                echo.out("{}. {}", i, json.dumps(item_json))
+
+            else:
+                item_json = item.jsonable(["title", "price"])
+                echo.out("{}. {} is ${:.2f}", i, item_json["title"], item_json["price"])
 
         except RobotError:
             raise
 
         except ParseError as e:
+            w.item_failed(item, e)
             echo.err("{}. Failed!", i)
             echo.exception(e)
             echo.err(e.body)
@@ -118,6 +278,107 @@ def main_dump(name, **kwargs):
     echo.out("Done with wishlist, {} total items", i)
 
 
+@arg('path', nargs=1, help="a file with one wishlist name per line, a name can be followed by its region (eg, NAME de)")
+@arg('--workers', type=int, default=4, help="how many wishlists are crawled at the same time")
+@arg('--per-host', type=int, default=2, help="how many wishlists from the same host are crawled at the same time")
+@arg(
+    '--fields',
+    default="",
+    help="comma separated item fields to print (eg, title,price,uuid), defaults to all"
+)
+@arg(
+    '--stats',
+    default="",
+    help="write crawl stats to this file when done, json if it ends with .json, otherwise prometheus text"
+)
+@arg('--rate', type=float, default=1.0, help="the starting requests per second to each host, it adapts to how the host responds, 0 turns throttling off")
+@arg('--retries', type=int, default=3, help="how many times a page is retried after a robot check or 429/503")
+@arg('--region', choices=sorted(REGIONS), default="", help="the marketplace of the names without a region, defaults to WISHLIST_HOST")
+def main_dump_many(path, workers=4, per_host=2, fields="", stats="", rate=1.0, retries=3, region="", **kwargs):
+    """Crawl all the wishlists in a file and print each item as a json line tagged
+    with its wishlist name, a failed wishlist is reported and the rest keep going"""
+    path = path[0]
+    fields = get_fields(fields)
+    i = 0
+    with open(path) as f:
+        # ignore comments and blank lines
+        names = (line.split("#", 1)[0] for line in f)
+        events = Events()
+        crawl_stats = Stats(events)
+        # all the workers share the throttle so the rate is per host, not per list
+        crawler = Crawler(
+            names,
+            workers=workers,
+            per_host=per_host,
+            events=events,
+            throttle=get_throttle(rate, retries),
+            region=region,
+        )
+        for result in crawler:
+            if result.error:
+                echo.err("{} failed with {}", result.name, result.error)
+                continue
+
+            i += 1
+            try:
+                item_json = result.item.jsonable(fields)
+                echo.out(json.dumps({"name": result.name, "item": item_json}))
+
+            except ParseError as e:
+                result.wishlist.item_failed(result.item, e)
+                echo.err("{} item failed!", result.name)
+                echo.exception(e)
+
+            except Exception as e:
+                echo.err("{} item failed with {}", result.name, e)
+                echo.exception(e)
+
+    # stdout only has the items so it can be piped somewhere else
+    echo.err(
+        "Done with {} wishlists, {} total items, {} failed wishlists",
+        len(crawler.counts),
+        i,
+        len(crawler.failures)
+    )
+    for name, e in crawler.failures.items():
+        echo.err("{}: {}", name, e)
+
+    if stats:
+        crawl_stats.write(stats)
+
+
+@arg('directory', nargs=1, help="the directory with the archived {name}-{page}.html(.gz) pages")
+@arg('--processes', type=int, default=0, help="how many worker processes, defaults to the cpu count")
+@arg(
+    '--fields',
+    default="",
+    help="comma separated item fields to print (eg, title,price,uuid), defaults to all"
+)
+def main_reparse(directory, processes=0, fields="", **kwargs):
+    """Parse all the archived pages in a directory (nothing is fetched) and print
+    each item as a json line tagged with its wishlist name and page, the pages that
+    failed to parse are reported at the end"""
+    directory = directory[0]
+    fields = get_fields(fields)
+    reparser = Reparser(directory, processes=processes, fields=fields)
+    pages = 0
+    for result in reparser:
+        pages += 1
+        for item_json in result.items:
+            echo.out(json.dumps({"name": result.name, "page": result.page, "item": item_json}))
+
+    # stdout only has the items so it can be piped somewhere else
+    echo.err(
+        "Done with {} pages, {} total items, {} pages with failures",
+        pages,
+        reparser.count,
+        len(reparser.failures)
+    )
+    for path, failures in reparser.failures.items():
+        for failure in failures:
+            echo.err("{}: {}", path, failure)
+
+
 def console():
     exit(__name__)
 
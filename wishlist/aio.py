@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""asyncio support, this module is python 3 only
+
+    from wishlist.aio import AsyncWishlist
+
+    async for item in AsyncWishlist(name):
+        print(item.jsonable())
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import asyncio
+import functools
+import logging
+
+from .core import Wishlist
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWishlist(Wishlist):
+    """A Wishlist that can be iterated with `async for`
+
+    all the blocking work (fetching and parsing the pages and extracting the item
+    fields) is run in an executor so the event loop is never blocked, this means
+    many lists can be crawled concurrently by one event loop
+    """
+    def __init__(self, name, executor=None, fields=None, **kwargs):
+        """
+        :param name: string, the name of the wishlist
+        :param executor: concurrent.futures.Executor, where the blocking work is run,
+            defaults to the event loop's default executor
+        :param fields: list, the item fields (see WishlistElement.json_fields) that
+            are extracted in the executor, defaults to all of them, accessing any
+            other field will parse it on the event loop
+        :param **kwargs: passed through to Wishlist
+        """
+        super(AsyncWishlist, self).__init__(name, **kwargs)
+        self.executor = executor
+        self.fields = fields
+
+    async def run(self, callback, *args):
+        """Run callback(*args) in .executor and return its value"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(callback, *args)
+        )
+
+    def extract_item(self, item):
+        """Parse the .fields of item so accessing them on the event loop doesn't
+        block, this is run in the executor"""
+        if isinstance(item, self.element_class):
+            fields = self.fields
+            if fields is None:
+                fields = self.element_class.json_fields
+
+            for field in fields:
+                try:
+                    item.jsonable_field(field)
+
+                except Exception:
+                    # errors aren't cached so they will be raised again when the
+                    # field is accessed
+                    pass
+
+        return item
+
+    def next_item(self, it):
+        """Return the next item of it with its fields extracted, or None when there
+        aren't any more items, this is run in the executor"""
+        item = next(it, None)
+        return None if item is None else self.extract_item(item)
+
+    def __aiter__(self):
+        return self.aiter_crawl()
+
+    def resume(self, **kwargs):
+        """The async version of Wishlist.resume(), use it with `async for`"""
+        return self.aiter_crawl(resume=True, **kwargs)
+
+    async def aiter_crawl(self, **kwargs):
+        """Yield every item of the wishlist, this is the async version of
+        Wishlist.crawl()
+
+            async for item in w.aiter_crawl(events=events):
+                print(item.jsonable())
+
+        the crawl is the same generator a sync iteration uses (so detach, stream,
+        prefetch, checkpoint and the event hooks all work), it is just advanced in
+        the executor one item at a time
+
+        :param **kwargs: the options of Wishlist.crawl()
+        """
+        it = self.crawl(**kwargs)
+        try:
+            while True:
+                item = await self.run(self.next_item, it)
+                if item is None:
+                    break
+                yield item
+
+        finally:
+            await self.run(it.close)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, division, print_function, absolute_import
+import gzip
+import logging
+import os
+import random
+import tempfile
+import threading
+
+from .compat import *
+from . import environ
+
+
+logger = logging.getLogger(__name__)
+
+
+# os.replace() is python 3 only, os.rename() also replaces the file on posix
+replace_file = getattr(os, "replace", os.rename)
+
+
+class Archiver(object):
+    """Saves the html of the fetched wishlist pages on a background thread so the
+    crawl never waits on the disk
+
+        archiver = Archiver("always", directory="/tmp/pages")
+        archiver.archive("NAME-1", body)
+        archiver.close()
+
+    the pages are written to directory/basename.html, or directory/basename.html.gz
+    if compress is True
+    """
+    policies = set(["off", "sample", "always"])
+
+    @property
+    def directory(self):
+        directory = self._directory
+        if not directory:
+            from brow import environ as brow_environ
+            directory = brow_environ.CACHE_DIR
+        return directory
+
+    def __init__(self, policy="", directory="", compress=True, sample_rate=None, queue_size=10):
+        """
+        :param policy: string, "off" to never archive, "always" to archive every page,
+            or "sample" to archive sample_rate of the pages, defaults to
+            environ.ARCHIVE
+        :param directory: string, where the pages are written, defaults to
+            environ.ARCHIVE_DIR or brow's cache directory
+        :param compress: bool, True to gzip the pages
+        :param sample_rate: float, between 0.0 and 1.0, defaults to
+            environ.ARCHIVE_SAMPLE_RATE
+        :param queue_size: int, how many pages can be waiting to be written, if the
+            queue is full new pages are dropped instead of slowing the crawl down
+        """
+        policy = policy or environ.ARCHIVE
+        if policy not in self.policies:
+            raise ValueError("Unknown archive policy {}".format(policy))
+
+        self.policy = policy
+        self._directory = directory or environ.ARCHIVE_DIR
+        self.compress = compress
+        self.sample_rate = environ.ARCHIVE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.thread = None
+        self.dropped = 0
+        self.paths = []
+        self._lock = threading.Lock()
+
+    def should_archive(self, basename):
+        """Return True if the page should be archived according to .policy"""
+        if self.policy == "always":
+            ret = True
+
+        elif self.policy == "sample":
+            ret = random.random() < self.sample_rate
+
+        else:
+            ret = False
+
+        return ret
+
+    def archive(self, basename, body):
+        """Queue body to be written to the archive, this doesn't wait for the write
+
+        :param basename: string, the file name without extension (eg, NAME-1)
+        :param body: string, the html of the page
+        :returns: bool, True if the page was queued
+        """
+        ret = False
+        if self.should_archive(basename):
+            self.start()
+            try:
+                self.queue.put_nowait((basename, body))
+                ret = True
+
+            except queue.Full:
+                self.dropped += 1
+                logger.warning("Archive queue is full, dropping {}".format(basename))
+
+        return ret
+
+    def start(self):
+        with self._lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name="wishlist-archive")
+                self.thread.daemon = True
+                self.thread.start()
+
+    def run(self):
+        while True:
+            value = self.queue.get()
+            try:
+                if value is None:
+                    break
+
+                try:
+                    self.paths.append(self.write(*value))
+
+                except Exception as e:
+                    logger.exception(e)
+
+            finally:
+                self.queue.task_done()
+
+    def write(self, basename, body):
+        """Actually write the page, this is called from the background thread
+
+        :returns: string, the path that was written
+        """
+        directory = self.directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        path = os.path.join(directory, "{}.html".format(basename))
+        if self.compress:
+            path += ".gz"
+
+        # the page is written to a temp file that is moved into place so a crash
+        # never leaves a truncated page behind
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                if self.compress:
+                    with gzip.GzipFile(fileobj=fp, mode="wb") as f:
+                        f.write(body.encode("utf-8"))
+
+                else:
+                    fp.write(body.encode("utf-8"))
+
+            replace_file(tmp_path, path)
+
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        logger.debug("Archived html to {}".format(path))
+        return path
+
+    def flush(self):
+        """Wait for all the queued pages to be written"""
+        if self.thread:
+            self.queue.join()
+
+    def close(self):
+        """Write all the queued pages and stop the background thread"""
+        with self._lock:
+            thread = self.thread
+            self.thread = None
+
+        if thread:
+            self.queue.put(None)
+            thread.join()
+
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, division, print_function, absolute_import
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .compat import *
+from .exception import CacheMissError, RobotError
+from .fetch import is_robot_check
+from . import environ
+
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache(object):
+    """An on-disk cache of fetched wishlist pages keyed by url
+
+        cache = PageCache(ttl=3600, max_size=100 * 1024 * 1024)
+        w = Wishlist(name, cache=cache)
+
+    the url includes the showMoreUrl continuation, so every page of a list is
+    cached separately. When the cache gets bigger than max_size the least recently
+    used pages are deleted, and in replay mode pages are only ever read from the
+    cache, a missing page raises CacheMissError instead of being fetched
+    """
+    @property
+    def directory(self):
+        directory = self._directory
+        if not directory:
+            directory = os.path.join(tempfile.gettempdir(), "wishlist-cache")
+        return directory
+
+    def __init__(self, directory="", ttl=None, max_size=None, replay=False):
+        """
+        :param directory: string, where the pages are saved, defaults to
+            environ.CACHE_DIR
+        :param ttl: float, how many seconds a cached page is fresh, 0 is forever,
+            defaults to environ.CACHE_TTL
+        :param max_size: int, the most bytes the cache can use, 0 is unlimited,
+            defaults to environ.CACHE_MAX_SIZE
+        :param replay: bool, True to never fetch anything, stale pages are still used
+        """
+        self._directory = directory or environ.CACHE_DIR
+        self.ttl = environ.CACHE_TTL if ttl is None else ttl
+        self.max_size = environ.CACHE_MAX_SIZE if max_size is None else max_size
+        self.replay = replay
+        self.size = None
+        self._lock = threading.Lock()
+
+    def get_path(self, url):
+        return os.path.join(self.directory, "{}.html.gz".format(md5(url)))
+
+    def get(self, url):
+        """Return the cached body of url
+
+        :param url: string, the full page url
+        :returns: string, None if the page isn't cached or is stale
+        """
+        path = self.get_path(url)
+        try:
+            mtime = os.path.getmtime(path)
+            if not self.replay and self.ttl and (time.time() - mtime) > self.ttl:
+                logger.debug("Cached page for {} is stale".format(url))
+                return None
+
+            with gzip.open(path, "rb") as f:
+                body = f.read().decode("utf-8")
+
+        except (IOError, OSError):
+            return None
+
+        # the modified time is when the page was fetched (for the ttl) and the
+        # access time is when it was last used (for eviction), the access time is
+        # set explicitly because the filesystem might not update it (eg, noatime)
+        os.utime(path, (time.time(), mtime))
+        logger.debug("Using cached page for {}".format(url))
+        return body
+
+    def set(self, url, body):
+        """Save body as the cached page for url"""
+        directory = self.directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        path = self.get_path(url)
+        # write to a temp file and move it so a reader never sees a partial page
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            with gzip.GzipFile(fileobj=fp, mode="wb") as f:
+                f.write(body.encode("utf-8"))
+
+        size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.isfile(path) else 0
+        os.rename(tmp_path, path)
+
+        if self.max_size:
+            with self._lock:
+                if self.size is None:
+                    self.size = self.get_size()
+                else:
+                    self.size += size - old_size
+
+                if self.size > self.max_size:
+                    self.evict()
+
+    def get_entries(self):
+        """Return (path, size, fetched, last used) tuples of all the cached pages"""
+        entries = []
+        directory = self.directory
+        if os.path.isdir(directory):
+            for basename in os.listdir(directory):
+                if basename.endswith(".html.gz"):
+                    path = os.path.join(directory, basename)
+                    st = os.stat(path)
+                    entries.append((path, st.st_size, st.st_mtime, st.st_atime))
+        return entries
+
+    def get_size(self):
+        return sum(entry[1] for entry in self.get_entries())
+
+    def evict(self):
+        """Delete the least recently used pages until the cache fits in .max_size"""
+        entries = sorted(self.get_entries(), key=lambda entry: entry[3])
+        size = sum(entry[1] for entry in entries)
+        for path, entry_size, _, _ in entries:
+            if size <= self.max_size:
+                break
+
+            try:
+                os.unlink(path)
+                size -= entry_size
+                logger.debug("Evicted cached page {}".format(path))
+
+            except OSError:
+                pass
+
+        self.size = size
+
+    def clear(self):
+        for entry in self.get_entries():
+            os.unlink(entry[0])
+        self.size = 0
+
+
+class CachedFetcher(object):
+    """Wraps a fetcher session so pages come from the PageCache when they can
+
+    this has the same interface as the fetchers in wishlist.fetch
+    """
+
+    checks_robots = True
+    """a robot check page is never cached, and a fetched page is checked before it
+    is cached"""
+
+    @property
+    def body(self):
+        return self._body
+
+    @property
+    def url(self):
+        return self._url
+
+    def __init__(self, fetcher, cache):
+        """
+        :param fetcher: Fetcher, the session that fetches pages that aren't cached,
+            this can be None in replay mode
+        :param cache: PageCache
+        """
+        self.fetcher = fetcher
+        self.cache = cache
+        self._body = None
+        self._url = None
+
+    def load(self, url):
+        body = self.cache.get(url)
+        if body is None:
+            if self.cache.replay or not self.fetcher:
+                raise CacheMissError("No cached page for {}".format(url))
+
+            self.fetcher.load(url)
+            body = self.fetcher.body
+            if getattr(self.fetcher, "checks_robots", False):
+                self.cache.set(url, body)
+
+            else:
+                self.set(url, body)
+
+        self._url = url
+        self._body = body
+
+    def set(self, url, body):
+        """Cache body, a robot check page is never cached because it would be
+        replayed forever"""
+        if is_robot_check(body):
+            raise RobotError("Amazon robot check")
+        self.cache.set(url, body)
+
+    def iter_body(self, url, chunk_size=16384):
+        body = self.cache.get(url)
+        if body is None:
+            if self.cache.replay or not self.fetcher:
+                raise CacheMissError("No cached page for {}".format(url))
+
+            iter_body = getattr(self.fetcher, "iter_body", None)
+            if iter_body:
+                chunks = []
+                for chunk in iter_body(url, chunk_size):
+                    chunks.append(chunk)
+                    yield chunk
+                body = "".join(chunks)
+
+            else:
+                self.fetcher.load(url)
+                body = self.fetcher.body
+                yield body
+
+            self.set(url, body)
+
+        else:
+            yield body
+
+        self._url = url
+        self._body = body
+
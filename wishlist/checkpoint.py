@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Save how far a crawl got so it can pick up where it left off
+
+    w = Wishlist(name)
+    for item in w.resume(checkpoint=Checkpoint(name)):
+        pass
+
+the pagination can't be jumped into, the url of a page is only found on the page
+before it, so the checkpoint keeps the url (and the lastEvaluatedKey values that
+were seen before it) of the page the crawl was on and the uuids of the items that
+were already yielded. A resumed crawl starts at that page and skips the items it
+already yielded, so the items on the page that was interrupted aren't yielded
+twice. The checkpoint is saved every time a page is started and whenever the
+crawl stops early, and each yielded uuid is appended (and flushed) to a log next
+to it, so even a crawl that is killed in the middle of a page knows which of
+that page's items it already yielded. Both files are deleted when the crawl
+finishes
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .compat import *
+from . import environ
+
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint(object):
+    """The pagination state of one wishlist's crawl, saved as a json file"""
+    @property
+    def directory(self):
+        directory = self._directory
+        if not directory:
+            directory = os.path.join(tempfile.gettempdir(), "wishlist-checkpoints")
+        return directory
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, "{}.json".format(self.name))
+
+    @property
+    def log_path(self):
+        """the uuids yielded since the last .save(), one per line"""
+        return os.path.join(self.directory, "{}.uuids".format(self.name))
+
+    def __init__(self, name, directory=""):
+        """
+        :param name: string, the name of the wishlist
+        :param directory: string, where the checkpoint is saved, defaults to
+            environ.CHECKPOINT_DIR
+        """
+        self.name = name
+        self._directory = directory or environ.CHECKPOINT_DIR
+        self._lock = threading.Lock()
+        self._log = None
+        self.reset()
+
+    def reset(self):
+        """Forget everything, the next crawl starts at the first page"""
+        self.page = 0
+        """the page the crawl was on, 0 if it hasn't started"""
+
+        self.url = ""
+        """the url of .page, empty if it is the first page"""
+
+        self.seen_keys = []
+        """the lastEvaluatedKey values that were seen before .page"""
+
+        self.uuids = []
+        """the uuids of the items that were yielded, in the order they were"""
+
+        self._uuids = set()
+        self.pages = {}
+        """page -> (url, seen_keys) of the pages that were loaded but not started"""
+
+    def load(self):
+        """Load the saved checkpoint
+
+        :returns: bool, True if there was a saved checkpoint
+        """
+        self.reset()
+        try:
+            with open(self.path) as fp:
+                d = json.load(fp)
+
+        except (IOError, OSError):
+            return False
+
+        except ValueError as e:
+            logger.warning("Ignoring unreadable checkpoint {}: {}".format(self.path, e))
+            return False
+
+        self.page = d["page"]
+        self.url = d["url"]
+        self.seen_keys = d["seen_keys"]
+        self.uuids = d["uuids"]
+        self._uuids = set(self.uuids)
+
+        try:
+            with io.open(self.log_path, encoding="utf-8") as fp:
+                for line in fp:
+                    uuid = line.strip()
+                    # a line cut off by a kill is missing its newline
+                    if uuid and line.endswith("\n") and uuid not in self._uuids:
+                        self.uuids.append(uuid)
+                        self._uuids.add(uuid)
+
+        except (IOError, OSError):
+            pass
+
+        return True
+
+    def save(self):
+        """Write the checkpoint, the file is replaced all at once so a crawl that
+        dies while saving doesn't lose the last checkpoint"""
+        with self._lock:
+            d = {
+                "name": self.name,
+                "page": self.page,
+                "url": self.url,
+                "seen_keys": list(self.seen_keys),
+                "uuids": list(self.uuids),
+                "updated": time.time(),
+            }
+
+        directory = self.directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fp:
+            json.dump(d, fp)
+        os.rename(tmp_path, self.path)
+
+        # every uuid in the log is in the checkpoint now
+        self.close_log()
+        self.remove(self.log_path)
+
+    def close_log(self):
+        with self._lock:
+            log = self._log
+            self._log = None
+        if log:
+            log.close()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+
+        except (IOError, OSError):
+            pass
+
+    def clear(self):
+        """Delete the saved checkpoint and forget everything"""
+        self.reset()
+        self.close_log()
+        self.remove(self.path)
+        self.remove(self.log_path)
+
+    def get_start(self):
+        """Return where a resumed crawl should start
+
+        :returns: tuple, (url, page, seen_keys), url is empty if the crawl should
+            start at the beginning
+        """
+        if self.url:
+            return self.url, self.page, set(self.seen_keys)
+        return "", 1, set()
+
+    def add_page(self, page, url, seen_keys):
+        """Remember a page was loaded, this can be called ahead of the items (eg,
+        when the pages are prefetched)
+
+        :param page: int
+        :param url: string, the url of page
+        :param seen_keys: set, the lastEvaluatedKey values seen before page
+        """
+        with self._lock:
+            self.pages[page] = (url, list(seen_keys))
+
+    def is_emitted(self, uuid):
+        """Return True if the item was already yielded"""
+        return uuid in self._uuids
+
+    def add_item(self, page, uuid):
+        """Remember an item was yielded, the checkpoint is saved when this is the
+        first item of a page and the uuid is appended to the log
+
+        :param page: int, the page of the item
+        :param uuid: string, the uuid of the item, items without one can't be
+            skipped when resuming
+        """
+        if page != self.page:
+            with self._lock:
+                url, seen_keys = self.pages.get(page, (self.url, self.seen_keys))
+                self.page = page
+                # the first page is always started from the wishlist url
+                self.url = url if page > 1 else ""
+                self.seen_keys = seen_keys
+                for p in [p for p in self.pages if p <= page]:
+                    self.pages.pop(p)
+            self.save()
+
+        if uuid:
+            with self._lock:
+                self.uuids.append(uuid)
+                self._uuids.add(uuid)
+                if not self._log:
+                    self._log = io.open(self.log_path, "a", encoding="utf-8")
+                # flushed so the uuid survives the process being killed
+                self._log.write(uuid + "\n")
+                self._log.flush()
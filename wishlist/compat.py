@@ -11,6 +11,9 @@ is_py3 = (_ver[0] == 3)
 
 if is_py2:
     from StringIO import StringIO
+    import Queue as queue
+    import urlparse
+    from HTMLParser import HTMLParser
 
     basestring = basestring
     range = xrange # range is now always an iterator
@@ -31,6 +34,9 @@ if is_py2:
 
 elif is_py3:
     from io import StringIO
+    import queue
+    import urllib.parse as urlparse
+    from html.parser import HTMLParser
 
     basestring = (str, bytes)
 
@@ -1,32 +1,213 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, division, print_function, absolute_import
-import datetime
 import re
+import functools
+import threading
+import sys
 import os
 from contextlib import contextmanager
 import logging
 
-from bs4 import BeautifulSoup, Tag, NavigableString
-from brow.interface.selenium import FirefoxBrowser as FullBrowser
-from brow.interface.simple import SimpleFirefoxBrowser as SimpleBrowser
-#from brow.interface.selenium import ChromeBrowser as FullBrowser
-#from brow.interface.simple import SimpleChromeBrowser as SimpleBrowser
-
+from bs4 import BeautifulSoup, Tag, NavigableString, SoupStrainer
 from brow.utils import Soup
 
 from .compat import *
 from .exception import RobotError, ParseError
+from .fetch import HTTPFetcher, is_robot_check
+from .archive import Archiver
+from .cache import CachedFetcher
+from .throttle import ThrottledFetcher
+from .stream import ItemStream
+from .events import Events
+from .checkpoint import Checkpoint
+from .region import get_region
+from .locales import get_parser
+from .table import Table
 from . import environ
+from . import profile
 
 
 logger = logging.getLogger(__name__)
 
 
+class cachedproperty(object):
+    """A read only property that is only computed the first time it is accessed,
+    the value is stored in the instance's ._cache dict, so clearing that (see
+    WishlistElement.invalidate()) will cause it to be computed again"""
+    def __init__(self, fget):
+        self.fget = fget
+        self.name = fget.__name__
+        self.__doc__ = fget.__doc__
+
+    def __get__(self, instance, instance_class=None):
+        if instance is None:
+            return self
+
+        cache = instance._cache
+        try:
+            ret = cache[self.name]
+
+        except KeyError:
+            profiler = profile.current
+            if profiler:
+                start = profile.timer()
+                ret = self.fget(instance)
+                profiler.add("field." + self.name, profile.timer() - start)
+
+            else:
+                ret = self.fget(instance)
+
+            cache[self.name] = ret
+
+        return ret
+
+
+def cachedmethod(method):
+    """Same as cachedproperty but for methods that don't take any arguments"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        cache = self._cache
+        try:
+            ret = cache[name]
+
+        except KeyError:
+            profiler = profile.current
+            if profiler:
+                start = profile.timer()
+                ret = method(self)
+                profiler.add("field." + name, profile.timer() - start)
+
+            else:
+                ret = method(self)
+
+            cache[name] = ret
+
+        return ret
+
+    return wrapper
+
+
+class PageStrainer(SoupStrainer):
+    """Only lets Beautiful Soup build the parts of a wishlist page that Wishlist
+    uses, the item containers and the pagination inputs, everything else (nav,
+    footer, scripts) is skipped while the page is parsed
+
+    https://www.crummy.com/software/BeautifulSoup/bs4/doc/#parsing-only-part-of-a-document
+    """
+    pagination_classes = set(["showMoreUrl", "lastEvaluatedKey"])
+
+    def __init__(self):
+        super(PageStrainer, self).__init__()
+
+    def allow_tag(self, name, attrs):
+        """Return True if a tag with name and attrs should be built
+
+        this is only called for top level tags, once a tag is allowed all the tags
+        inside of it are built also
+        """
+        ret = False
+        if name == "div":
+            ret = (attrs.get("id") or "").startswith("item_")
+
+        elif name == "input":
+            classes = attrs.get("class") or ""
+            if not isinstance(classes, basestring):
+                classes = " ".join(classes)
+            ret = bool(self.pagination_classes.intersection(classes.split()))
+
+        return ret
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        """bs4 >= 4.13 calls this"""
+        return self.allow_tag(name, attrs or {})
+
+    def allow_string_creation(self, string):
+        """bs4 >= 4.13 calls this for top level strings"""
+        return False
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        """bs4 < 4.13 calls this"""
+        if isinstance(markup_name, Tag):
+            return markup_name if self.allow_tag(markup_name.name, markup_name.attrs) else None
+        return self.allow_tag(markup_name, markup_attrs)
+
+
+def prefetched(iterable, depth):
+    """Iterate iterable on a background thread so up to depth values are ready
+    before they are asked for, the values are yielded in the same order iterable
+    yields them
+
+    :param iterable: the values, iterable is only ever touched by the background
+        thread
+    :param depth: int, how many values can be waiting to be yielded
+    :returns: generator, closing it stops the background thread
+    """
+    q = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                q.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run():
+        it = iter(iterable)
+        try:
+            for value in it:
+                if not put((value, None)):
+                    break
+            else:
+                put((done, None))
+
+        except BaseException:
+            put((done, sys.exc_info()))
+
+        finally:
+            close = getattr(it, "close", None)
+            if close:
+                close()
+
+    t = threading.Thread(target=run, name="wishlist-prefetch")
+    t.daemon = True
+    t.start()
+
+    try:
+        while True:
+            value, exc_info = q.get()
+            if value is done:
+                if exc_info:
+                    reraise(*exc_info)
+                break
+            yield value
+
+    finally:
+        stop.set()
+        t.join()
+
+
 class BaseAmazon(object):
+    __slots__ = ()
+
+    region = None
+    """the Region (see wishlist.region) of the instance, if None then the
+    marketplace of environ.HOST is used"""
+
     @property
     def host(self):
-        return environ.HOST
-        #return os.environ.get("WISHLIST_HOST", "https://www.amazon.com")
+        region = self.region
+        return region.host if region else environ.HOST
+
+    @property
+    def locale(self):
+        region = self.region
+        return (region or get_region(host=environ.HOST)).locale
 
     def soupify(self, body):
         # https://www.crummy.com/software/BeautifulSoup/
@@ -40,23 +221,141 @@ class BaseAmazon(object):
         return self.soup.prettify()
 
 
-class WishlistElement(BaseAmazon):
-    """Wishlist.get() returns an instance of this object"""
-    @property
+class BaseItem(object):
+    """The json methods shared by WishlistElement and WishlistRecord, the child
+    class needs .json_fields, a property for each field, .wanted_count,
+    .has_count and .is_digital()"""
+    __slots__ = ()
+
+    def jsonable(self, fields=None):
+        """Return a dict of the fields of this element
+
+        :param fields: list, the field names (see .json_fields) you want, only
+            these fields will be extracted, if empty then all the fields are returned
+        :returns: dict
+        """
+        if not fields:
+            fields = self.json_fields
+
+        with profile.stage("jsonable"):
+            json_item = {}
+            for field in fields:
+                json_item[field] = self.jsonable_field(field)
+        return json_item
+
+    def jsonable_field(self, field):
+        """Return the json friendly value of field
+
+        :param field: string, one of the .json_fields
+        :returns: mixed
+        """
+        if field == "added":
+            ret = "UNKNOWN"
+            added = self.added
+            if added:
+                ret = added.strftime('%B %d, %Y')
+
+        elif field == "quantity":
+            ret = {
+                "wanted": self.wanted_count,
+                "has": self.has_count
+            }
+
+        elif field == "digital":
+            ret = self.is_digital()
+
+        elif field in self.json_fields:
+            ret = getattr(self, field)
+
+        else:
+            raise ValueError("Unknown field {}".format(field))
+
+        return ret
+
+
+class WishlistElement(BaseAmazon, BaseItem):
+    """Wishlist.get() returns an instance of this object
+
+    all the field properties are computed the first time they are accessed and
+    then remembered, call .invalidate() if you change .soup"""
+
+    __slots__ = ("soup", "_page_url", "page", "_cache", "region")
+
+    id_anchors = (
+        "itemName_",
+        "itemPrice_",
+        "itemComment_",
+        "item-byline-",
+        "itemAddedDate_",
+        "itemQuantityRow_",
+        "itemMain_",
+        "itemInfo_",
+        "item_from",
+    )
+    """the id prefixes the properties look for, every tag with an id starting with
+    one of these will be in .index under the prefix"""
+
+    class_anchors = (
+        "clip-text",
+        "itemUsedAndNewPrice",
+        "reviewStarsPopoverLink",
+        "dateAddedText",
+    )
+    """the exact css classes the properties look for, see .index"""
+
+    class_prefix_anchors = (
+        "itemAvailOfferedBy",
+        "itemAvailability",
+        "itemPriceDrop",
+    )
+    """the css class prefixes the properties look for, see .index"""
+
+    json_fields = (
+        "title",
+        "image",
+        "uuid",
+        "url",
+        "page_url",
+        "price",
+        "marketplace_price",
+        "comment",
+        "author",
+        "discount",
+        "added",
+        "rating",
+        "quantity",
+        "digital",
+        "source",
+    )
+    """the fields .jsonable() returns by default"""
+
+    @cachedproperty
+    def index(self):
+        """Return the anchor index of this element
+
+        the index is built with one pass through the element's tree and then all
+        the properties resolve their tags from it instead of each walking the tree
+
+        :returns: dict, the keys are the anchors (eg, "itemName_") and "img", the
+            values are lists of tags in document order
+        """
+        return self.build_index(self.soup)
+
+    @cachedproperty
     def uuid(self):
         uuid = self.a_uuid
         if not uuid:
             uuid = self.external_uuid
         return uuid
 
-    @property
+    @cachedproperty
     def url(self):
         url = self.a_url
         if not url:
             url = self.external_url
         return url
 
-    @property
+    @cachedproperty
     def a_uuid(self):
         """return the amazon uuid of the item"""
         uuid = ""
@@ -67,7 +366,7 @@ class WishlistElement(BaseAmazon):
                 uuid = m.group(1)
         else:
             # go through all the a tags in ItemInfo looking for asin=
-            el = self.soup.find("div", id=re.compile("^itemInfo_"))
+            el = self.find_anchor("itemInfo_", "div")
             if el:
                 regex = re.compile("asin\=([^\&]+)")
                 els = el.findAll("a", {"href": regex})
@@ -78,31 +377,31 @@ class WishlistElement(BaseAmazon):
                         if uuid: break
         return uuid
 
-    @property
+    @cachedproperty
     def a_url(self):
         """return the amazon url of the item"""
         href = ""
         # http://stackoverflow.com/questions/5041008/how-to-find-elements-by-class
         # http://stackoverflow.com/a/5099355/5006
         # http://stackoverflow.com/a/2832635/5006
-        el = self.soup.find("a", id=re.compile("^itemName_"))
+        el = self.find_anchor("itemName_", "a")
         if el and ("href" in el.attrs):
             href = self.host + el.attrs["href"]
         return href
 
-    @property
+    @cachedproperty
     def external_uuid(self):
         """Return the external uuid of the item"""
         ext_url = self.external_url
         return md5(ext_url) if ext_url else ""
 
-    @property
+    @cachedproperty
     def external_url(self):
         """was this added from an external website? Then this returns that url"""
         href = ""
-        el = self.soup.find("span", {"class": "clip-text"})
+        el = self.find_anchor("clip-text", "span")
         if not el:
-            el = self.soup.select_one("[id^=item_from]")
+            el = self.find_anchor("item_from")
         if el:
             el = el.find("a")
             if el:
@@ -111,10 +410,10 @@ class WishlistElement(BaseAmazon):
         return href.strip()
 
 
-    @property
+    @cachedproperty
     def image(self):
         src = ""
-        imgs = self.soup.find_all("img")
+        imgs = self.index.get("img", [])
         for img in imgs:
             if "src" in img.attrs:
                 if img.parent and img.parent.name == "a":
@@ -132,131 +431,116 @@ class WishlistElement(BaseAmazon):
 
         return src
 
-    @property
+    @cachedproperty
     def price(self):
         price = 0.0
 
-        el = self.soup.find("span", id=re.compile(r"^itemPrice_"))
+        el = self.find_anchor("itemPrice_", "span")
         if el and len(el.contents) >= 1:
             # the new HTML actually has separate spans for whole currency
-            # units and fractional currency units
-            try:
-                whole = float(
-                    el.find(
-                        'span', class_='a-price-whole'
-                    ).contents[0].strip().replace(',', '')
-                )
-                fract = float(
-                    el.find('span', class_='a-price-fraction').contents[0].strip()
-                )
-                price = float(whole) + (float(fract) / 100.0)
-
-            except AttributeError:
-                try:
-                    s = "".join(el.strings).split("-")[0].strip()
-                    price = float(s.lstrip('$').replace(",", ""))
-                except ValueError:
-                    price = 0.0
+            # units and fractional currency units, the separators (eg, 1,234 or
+            # 1.234) depend on the locale so only the digits are used
+            whole = el.find('span', class_='a-price-whole')
+            fract = el.find('span', class_='a-price-fraction')
+            if whole and fract and whole.contents and fract.contents:
+                whole = re.sub(r"\D", "", whole.contents[0])
+                fract = re.sub(r"\D", "", fract.contents[0])
+                if whole:
+                    price = float(whole)
+                    if fract:
+                        price += float(fract) / (10 ** len(fract))
+
+            else:
+                # a range (eg, $18.95 - $79.99) is the low price
+                s = "".join(el.strings).split("-")[0]
+                price = get_parser(self.locale).parse_price(s) or 0.0
 
         return price
 
-    @property
+    @cachedproperty
     def marketplace_price(self):
         price = 0.0
-        el = self.soup.find("span", {"class": "itemUsedAndNewPrice"})
+        el = self.find_anchor("itemUsedAndNewPrice", "span")
         if el and len(el.contents) > 0:
-            match = re.match(".+(\d+\.\d+)", el.contents[0])
-            price = float(match.group(1)) if match else 0.0
+            price = get_parser(self.locale).parse_price(el.get_text()) or 0.0
         return price
 
-    @property
+    @cachedproperty
     def title(self):
         title = ""
-        el = self.soup.find("a", id=re.compile("^itemName_"))
+        el = self.find_anchor("itemName_", "a")
         if el and len(el.contents) > 0:
             title = el.contents[0].strip()
 
         else:
-            el = self.soup.find("span", id=re.compile("^itemName_"))
+            el = self.find_anchor("itemName_", "span")
             if el and len(el.contents) > 0:
                 title = el.contents[0].strip()
 
         return title
 
-    @property
+    @cachedproperty
     def comment(self):
         ret = ""
-        el = self.soup.find("span", id=re.compile("^itemComment_"))
+        el = self.find_anchor("itemComment_", "span")
         if el and len(el.contents) > 0:
             ret = el.contents[0].strip()
         return ret
 
-    @property
+    @cachedproperty
     def rating(self):
         stars = 0.0
-        el = self.soup.find("a", {"class": "reviewStarsPopoverLink"})
+        el = self.find_anchor("reviewStarsPopoverLink", "a")
         if el:
             el = el.find("span", {"class": "a-icon-alt"})
             if len(el.contents) > 0:
                 stars = float(el.contents[0].strip().split()[0])
         return stars
 
-    @property
+    @cachedproperty
     def author(self):
         ret = ""
-        el = self.soup.find("span", id=re.compile(r"^item-byline-"))
+        el = self.find_anchor("item-byline-", "span")
         if el:
             contents = getattr(el, "contents", [])
             if contents:
                 ret = contents[0].strip().replace("by ", "").strip()
         return ret
 
-    @property
+    @cachedproperty
     def added(self):
         ret = None
-        format_str = '%B %d, %Y'
-        el = self.soup.find('span', id=re.compile('^itemAddedDate_'))
+        parser = get_parser(self.locale)
+        el = self.find_anchor("itemAddedDate_", "span")
 
         if el:
-            for content in el.contents:
-                m = re.search(r"[^\d\s]+\s+\d{1,2},?\s\d{4}", content)
-                if m:
-                    ret = datetime.datetime.strptime(m.group(0).strip(), format_str).date()
-                    break
+            # the date can be split across tags (eg, "Item added<span> </span>June
+            # 19, 2018") so the text is joined back together
+            ret = parser.parse_date(el.get_text(" "))
 
         else:
-            if el is None or len(el.contents) < 3:
-                el = self.soup.select_one(".dateAddedText > span")
-                if el:
-                    s = el.get_text().strip()
-                    while s:
-                        try:
-                            ret = datetime.datetime.strptime(s, format_str).date()
-                            break
-
-                        except ValueError:
-                            bits = s.split(" ", 1)
-                            if len(bits) > 1:
-                                s = " ".join(bits[1:])
-                            else:
-                                s = ""
-
-                    if not ret:
-                        logger.error('Unable to find added date for item.')
+            for parent in self.index.get("dateAddedText", []):
+                el = parent.find("span", recursive=False)
+                if el: break
+
+            if el:
+                ret = parser.parse_date(el.get_text(" "))
+                if not ret:
+                    logger.error('Unable to find added date for item.')
 
         return ret
 
-    @property
+    @cachedproperty
     def wanted_count(self):
         """returns the wanted portion of .quantity"""
         return self.quantity[0]
 
-    @property
+    @cachedproperty
     def has_count(self):
         """Returns the has portion of .quantity"""
         return self.quantity[1]
 
-    @property
+    @cachedproperty
     def quantity(self):
         """Return the quantity wanted and owned of the element
 
@@ -264,7 +548,7 @@ class WishlistElement(BaseAmazon):
         """
         ret = [0, 0]
 
-        el = self.soup.find(id=re.compile("^itemQuantityRow_"))
+        el = self.find_anchor("itemQuantityRow_")
         bits = [s for s in el.stripped_strings]
         total_bits = len(bits)
         needed = {"needs": 0, "has": 1}
@@ -283,9 +567,9 @@ class WishlistElement(BaseAmazon):
                 body=self.body
             )
 
-        return ret
+        return tuple(ret)
 
-    @property
+    @cachedproperty
     def source(self):
         """Return "amazon" if product is offered by amazon, otherwise return "marketplace" """
         if self.is_digital():
@@ -293,7 +577,7 @@ class WishlistElement(BaseAmazon):
 
         else:
             ret = "marketplace"
-            el = self.soup.find(class_=re.compile("^itemAvailOfferedBy"))
+            el = self.find_anchor("itemAvailOfferedBy")
             if el:
                 s = el.string
                 # In Stock. Offered by Amazon.com.
@@ -301,10 +585,10 @@ class WishlistElement(BaseAmazon):
                     ret = "amazon"
         return ret
 
-    @property
+    @cachedproperty
     def discount(self):
         ret = None
-        el = self.soup.find("div", class_=re.compile("^itemPriceDrop"))
+        el = self.find_anchor("itemPriceDrop", "div")
         if el:
             for content in el.contents:
                 if isinstance(content, NavigableString):
@@ -322,31 +606,121 @@ class WishlistElement(BaseAmazon):
     def body(self):
         return self.soup.prettify()
 
-    @property
+    @cachedproperty
     def page_url(self):
         ret = self._page_url
         if ret:
-            el = self.soup.find(id=re.compile("^itemMain_"))
+            el = self.find_anchor("itemMain_")
             if el:
                 ret += "#{}".format(el.attrs["id"])
         return ret
 
-    def __init__(self, element, page_url="", page=0):
+    def __init__(self, element, page_url="", page=0, region=None):
         """
         :param element: mixed, the html for the element
         :param page_url: string, the current page url
         :param page: int, the current page number
+        :param region: Region, the marketplace of the element, see wishlist.region
         """
         self.soup = self.soupify(element)
         self._page_url = page_url
         self.page = int(page)
+        self._cache = {}
+        self.region = region
+
+    def invalidate(self, *names):
+        """Clear the remembered field values so they will be computed again on next
+        access
+
+        :param *names: the field names to clear, if empty everything (including the
+            .index) is cleared
+        """
+        if names:
+            for name in names:
+                self._cache.pop(name, None)
+
+        else:
+            self._cache.clear()
+
+    def invalidate_fields(self):
+        """Clear every remembered value (including the ones other fields are
+        derived from, eg .is_digital()) but keep the .index"""
+        index = self._cache.get("index")
+        self._cache.clear()
+        if index is not None:
+            self._cache["index"] = index
+
+    @classmethod
+    def build_index(cls, soup):
+        """Go through every tag in soup one time and bucket the tags that match the
+        anchors
+
+        :param soup: Tag, the element's tree
+        :returns: dict, see .index
+        """
+        index = {}
+        id_regex = re.compile("^({})".format(
+            "|".join(re.escape(a) for a in cls.id_anchors)
+        ))
+
+        class_anchors = set(cls.class_anchors)
+        class_prefix_anchors = cls.class_prefix_anchors
+
+        for tag in soup.descendants:
+            if not isinstance(tag, Tag): continue
+
+            if tag.name == "img":
+                index.setdefault("img", []).append(tag)
+
+            attrs = tag.attrs
+            anchors = []
+
+            tag_id = attrs.get("id", "")
+            if tag_id:
+                m = id_regex.match(tag_id)
+                if m:
+                    anchors.append(m.group(1))
+
+            classes = attrs.get("class", [])
+            if classes:
+                if isinstance(classes, basestring):
+                    classes = classes.split()
+
+                for c in classes:
+                    if c in class_anchors:
+                        anchors.append(c)
+
+                    else:
+                        for prefix in class_prefix_anchors:
+                            if c.startswith(prefix):
+                                anchors.append(prefix)
 
+            for anchor in anchors:
+                tags = index.setdefault(anchor, [])
+                # a tag could match the same anchor with more than one class
+                if not tags or tags[-1] is not tag:
+                    tags.append(tag)
+
+        return index
+
+    def find_anchor(self, anchor, name=""):
+        """Return the first tag in .index for anchor
+
+        :param anchor: string, one of the *_anchors values
+        :param name: string, if passed in then the tag must also be this type of tag
+        :returns: Tag or None
+        """
+        for tag in self.index.get(anchor, []):
+            if not name or tag.name == name:
+                return tag
+
+    @cachedmethod
     def is_digital(self):
         """Return true if this is a digital good like a Kindle book or mp3"""
         ret = False
-        el = self.soup.find(class_=re.compile("^itemAvailOfferedBy"))
+        el = self.find_anchor("itemAvailOfferedBy")
         if not el:
-            el = self.soup.find(class_=re.compile("^itemAvailability"))
+            el = self.find_anchor("itemAvailability")
 
         if el:
             s = "".join(el.strings)
@@ -369,32 +743,130 @@ class WishlistElement(BaseAmazon):
         """returns True if product is offered by amazon, otherwise False"""
         return "amazon" in self.source
 
-    def jsonable(self):
-        json_item = {}
-        json_item["title"] = self.title
-        json_item["image"] = self.image
-        json_item["uuid"] = self.uuid
-        json_item["url"] = self.url
-        json_item["page_url"] = self.page_url
-        json_item["price"] = self.price
-        json_item["marketplace_price"] = self.marketplace_price
-        json_item["comment"] = self.comment
-        json_item["author"] = self.author
-        json_item["discount"] = self.discount
-
-        json_item["added"] = "UNKNOWN"
-        added = self.added
-        if added:
-            json_item["added"] = added.strftime('%B %d, %Y')
-
-        json_item["rating"] = self.rating
-        json_item["quantity"] = {
-            "wanted": self.wanted_count,
-            "has": self.has_count
-        }
-        json_item["digital"] = self.is_digital()
-        json_item["source"] = self.source
-        return json_item
+    def detach(self, fields=None, on_error=None):
+        """Return the extracted values of this element as a WishlistRecord, the
+        record doesn't reference .soup so the page can be freed
+
+        :param fields: list, the fields to extract, defaults to .json_fields
+        :param on_error: callable, see WishlistRecord.from_element()
+        :returns: WishlistRecord
+        """
+        return WishlistRecord.from_element(self, fields, on_error)
+
+
+class WishlistRecord(BaseItem):
+    """The extracted values of a WishlistElement, this is what Wishlist yields when
+    detach is on
+
+    an element keeps its soup, and the soup's parents keep the whole page alive,
+    so holding onto elements holds onto every page. A record only has the values,
+    it can't be changed, and it can be pickled (eg, sent to another process)
+    """
+    json_fields = WishlistElement.json_fields
+
+    __slots__ = ("page", "fields") + json_fields
+
+    @property
+    def wanted_count(self):
+        return self.quantity[0] if self.quantity else None
+
+    @property
+    def has_count(self):
+        return self.quantity[1] if self.quantity else None
+
+    @classmethod
+    def from_element(cls, element, fields=None, on_error=None):
+        """Extract the values of element
+
+        a field that fails to parse is set to None (and logged) instead of failing
+        the whole record because the element can't be gone back to later
+
+        :param element: WishlistElement
+        :param fields: list, the fields to extract, defaults to .json_fields, the
+            other fields will be None
+        :param on_error: callable, called with (field, exception) for each field
+            that failed to parse
+        :returns: WishlistRecord
+        """
+        values = {}
+        for field in (fields or cls.json_fields):
+            try:
+                if field == "digital":
+                    values[field] = element.is_digital()
+
+                elif field in cls.json_fields:
+                    values[field] = getattr(element, field)
+
+                else:
+                    raise ValueError("Unknown field {}".format(field))
+
+            except ParseError as e:
+                logger.warning("Could not parse {} of page {} item: {}".format(
+                    field,
+                    element.page,
+                    e
+                ))
+                values[field] = None
+                if on_error:
+                    on_error(field, e)
+
+        return cls(element.page, **values)
+
+    def __init__(self, page=0, **values):
+        """
+        :param page: int, the page number of the item
+        :param **values: the field values, see .json_fields
+        """
+        set_value = super(WishlistRecord, self).__setattr__
+        set_value("page", int(page))
+        set_value("fields", tuple(f for f in self.json_fields if f in values))
+        for field in self.json_fields:
+            set_value(field, values.get(field, None))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("WishlistRecord instances can't be changed")
+
+    def __delattr__(self, name):
+        raise AttributeError("WishlistRecord instances can't be changed")
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        set_value = super(WishlistRecord, self).__setattr__
+        for name in self.__slots__:
+            set_value(name, state[name])
+
+    def __eq__(self, other):
+        if not isinstance(other, WishlistRecord):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    def __hash__(self):
+        return hash((self.page, self.uuid, self.title))
+
+    def __repr__(self):
+        return "<{} page={} uuid={!r} title={!r}>".format(
+            type(self).__name__,
+            self.page,
+            self.uuid,
+            self.title
+        )
+
+    def is_digital(self):
+        return bool(self.digital)
+
+    def jsonable(self, fields=None):
+        """Return a dict of the fields of this record
+
+        :param fields: list, defaults to the fields that were extracted
+        :returns: dict
+        """
+        return super(WishlistRecord, self).jsonable(fields or self.fields)
 
 
 class Wishlist(BaseAmazon):
@@ -402,21 +874,129 @@ class Wishlist(BaseAmazon):
 
     element_class = WishlistElement
 
+    fetcher_class = HTTPFetcher
+    """the fetch backend used to get the pages, see wishlist.fetch"""
+
     @classmethod
     @contextmanager
-    def authenticate(cls):
-        host = environ.HOST
+    def authenticate(cls, host=""):
+        # selenium is only needed to sign in, so it is only imported here
+        from brow.interface.selenium import FirefoxBrowser as FullBrowser
+        #from brow.interface.selenium import ChromeBrowser as FullBrowser
+
+        host = host or environ.HOST
         logger.info("Requesting {}".format(host))
         with FullBrowser.session() as b:
             b.load(host, ignore_cookies=True)
             yield b
 
-    def __init__(self, name):
+    def __init__(self, name, parser="", strain=True, prefetch=0, fetcher_class=None, archive=None, cache=None, detach=False, stream=False, host="", region="", locale=""):
+        """
+        :param name: string, the name of the wishlist
+        :param parser: string, the Beautiful Soup parser (eg, lxml, html.parser) used
+            to parse the pages, defaults to environ.PARSER
+        :param strain: bool, True if only the items and pagination of each page
+            should be parsed, see PageStrainer
+        :param prefetch: int, if > 0 then pages are fetched and parsed on a
+            background thread while the items of the current page are being
+            consumed, this is how many pages can be fetched ahead
+        :param fetcher_class: Fetcher, the fetch backend, defaults to .fetcher_class
+        :param archive: Archiver|string, how the fetched pages are saved, either an
+            Archiver instance or an archive policy ("off", "sample", "always"),
+            defaults to environ.ARCHIVE
+        :param cache: PageCache, if passed in then pages are cached on disk, see
+            wishlist.cache
+        :param detach: bool|list, if True then iterating yields WishlistRecord
+            instances instead of WishlistElement instances and each page's soup is
+            decomposed once its items are extracted, so memory grows with the items
+            and not the pages, this can also be the list of fields to extract
+        :param stream: bool, True to yield each item as soon as it is downloaded
+            instead of after its whole page is downloaded and parsed, see
+            .iter_stream()
+        :param host: string, the host the list is on (eg, https://www.amazon.de),
+            defaults to the host of region or environ.HOST
+        :param region: string, the marketplace code the list is on (eg, de), see
+            wishlist.region
+        :param locale: string, the locale the pages are written in (eg, de_DE),
+            defaults to the locale of the region
+        """
         self.name = name
+        self._host = host
+        self._region = region
+        self._locale = locale
+        if region:
+            # fail right away on a region that doesn't exist
+            get_region(region)
 
-    def robot_check(self, soup):
-        el = soup.find("form", action=re.compile(r"validateCaptcha", re.I))
-        if el:
+        self.parser = parser or environ.PARSER
+        self.strain = strain
+        self.prefetch = prefetch
+        if fetcher_class:
+            self.fetcher_class = fetcher_class
+
+        self.owns_archiver = not isinstance(archive, Archiver)
+        """True if .archiver was created here, so it is closed when a crawl
+        finishes, an Archiver that was passed in is only flushed"""
+
+        self.archiver = Archiver(archive or "") if self.owns_archiver else archive
+
+        self.cache = cache
+        self.detach = detach
+        self.stream = stream
+
+        self.events = Events()
+        """the hooks of the current (or last) crawl, see .crawl()"""
+
+        self.throttle = None
+        """the Throttle of the current (or last) crawl, see .crawl()"""
+
+        self.checkpoint = None
+        """the Checkpoint of the current (or last) crawl, see .crawl()"""
+
+        self.pages = 0
+        """how many pages the current (or last) crawl loaded"""
+
+        self.page = 0
+        """the page the current (or last) crawl is fetching"""
+
+        self.stop_reason = ""
+        """why the last crawl stopped paginating, see wishlist.events"""
+
+    @property
+    def region(self):
+        """The Region of the list, this is worked out every time so a list without
+        a host or region follows environ.HOST"""
+        region = get_region(self._region, self._host or ("" if self._region else environ.HOST))
+        if self._locale:
+            region = region._replace(locale=self._locale)
+        return region
+
+    def soupify_page(self, body):
+        """Parse the html of a wishlist page
+
+        :param body: string, the html of the page
+        :returns: Soup, if .strain is True this will only contain the item containers
+            and the pagination inputs
+        """
+        kwargs = {}
+        # html5lib doesn't support parse_only
+        if self.strain and self.parser != "html5lib":
+            kwargs["parse_only"] = PageStrainer()
+        with profile.stage("soupify"):
+            return Soup(body, self.parser, **kwargs)
+
+    def robot_check(self, body):
+        """Raise RobotError if body is Amazon's robot check (captcha) page
+
+        :param body: string|Tag, the html of the page, this should be checked
+            before it is parsed because the strained soup won't have the captcha
+            form and a string check is a lot faster than parsing
+        """
+        if isinstance(body, Tag):
+            if body.find("form", action=re.compile(r"validateCaptcha", re.I)):
+                raise RobotError("Amazon robot check")
+
+        elif is_robot_check(body):
             raise RobotError("Amazon robot check")
 
     def get_wishlist_url(self, path=""):
@@ -427,37 +1007,528 @@ class Wishlist(BaseAmazon):
 
     def get_items(self, soup, current_page_url, current_page=0):
         """this will return the wishlist elements on the current page"""
-        html_items = soup.findAll("div", {"id": re.compile("^item_")})
+        with profile.stage("get_items"):
+            html_items = soup.findAll("div", {"id": re.compile("^item_")})
+        region = self.region
         for i, html_item in enumerate(html_items):
-            item = self.element_class(html_item, current_page_url, current_page)
+            item = self.element_class(html_item, current_page_url, current_page, region)
             yield item
 
-    def __iter__(self):
-        host = self.host
-        # so the lists are circular for some reason, so we need to track what pages
-        # we have seen and stop when we see the item uuid again
-        name = self.name
-        seen_uuids = set()
-        url = self.get_wishlist_url()
-        with SimpleBrowser.session() as b:
-            page = 1
-            while url:
+    def get_next_url(self, soup, seen_keys):
+        """Return the url of the page after soup
+
+        the lists are circular for some reason, so we need to track the pagination
+        keys we have seen and stop when we see one again
+
+        :param soup: Soup, the current page
+        :param seen_keys: set, the lastEvaluatedKey values of the pages that have
+            already been seen, the key of soup will be added
+        :returns: string, the next url or empty string if soup is the last page
+        """
+        url = ""
+        url_elem = soup.select_one("input.showMoreUrl")
+        if url_elem:
+            uuid_elem = soup.select_one("input.lastEvaluatedKey")
+            url = self.get_pagination_url(url_elem["value"], uuid_elem.get("value"), seen_keys)
+        return url
+
+    def get_pagination_url(self, path, uuid, seen_keys):
+        """Return the url of the next page from the values of the page's pagination
+        inputs, see .get_next_url()
+
+        :param path: string, the showMoreUrl value
+        :param uuid: string, the lastEvaluatedKey value
+        :param seen_keys: set
+        :returns: string
+        """
+        url = ""
+        if path and uuid:
+            if uuid not in seen_keys:
+                logger.debug("First time seeing uuid {}".format(uuid))
+                url = self.get_wishlist_url(path)
+                seen_keys.add(uuid)
+        return url
+
+    @contextmanager
+    def session(self):
+        """Return a context manager that yields the fetcher session used to fetch
+        the pages, see .load_page()
+
+        if there is a .cache then the pages will come from the cache when they can,
+        and in replay mode nothing is fetched
+        """
+        cache = self.cache
+        if cache and cache.replay:
+            yield CachedFetcher(None, cache)
+
+        else:
+            with self.fetcher_class.session() as b:
+                # the cache is checked before the throttle so cached pages are
+                # never slowed down
+                if self.throttle:
+                    b = ThrottledFetcher(b, self.throttle, self.fetch_retried)
+                yield CachedFetcher(b, cache) if cache else b
+
+    def fetch_retried(self, url, e):
+        """Called for each fetch the throttle retries, a robot check that is
+        retried is still a robot check"""
+        if isinstance(e, RobotError):
+            self.events.emit("robot_check", wishlist=self, error=e, url=url, page=self.page)
+
+    def load_page(self, b, url, page):
+        """Fetch and parse a wishlist page
+
+        :param b: Fetcher, the fetcher session
+        :param url: string, the page url
+        :param page: int, the page number
+        :returns: Soup
+        """
+        start = profile.timer()
+        try:
+            with profile.stage("fetch"):
                 b.load(url)
-                b.dump(basename="{}-{}".format(name, page))
-                soup = b.soup
-
-                for item in self.get_items(soup, url, page):
-                    yield item
-
-                url = ""
-                url_elem = soup.select_one("input.showMoreUrl")
-                if url_elem:
-                    uuid_elem = soup.select_one("input.lastEvaluatedKey")
-                    uuid = uuid_elem.get("value")
-                    if uuid:
-                        if uuid not in seen_uuids:
-                            logger.debug("First time seeing uuid {}".format(uuid))
-                            url = self.get_wishlist_url(url_elem["value"])
-                            seen_uuids.add(uuid)
-                            page += 1
+                body = b.body
+            if not getattr(b, "checks_robots", False):
+                self.robot_check(body)
+
+        except RobotError as e:
+            self.events.emit("robot_check", wishlist=self, error=e, url=url, page=page)
+            raise
+
+        self.page_fetched(url, page, body, profile.timer() - start)
+
+        with profile.stage("archive"):
+            self.archiver.archive("{}-{}".format(self.name, page), body)
+
+        return self.soupify_page(body)
+
+    def load_page_chunks(self, b, url, page):
+        """Fetch a wishlist page a chunk at a time, this is the streaming version
+        of .load_page()
+
+        :returns: generator of strings, the html of the page as it is downloaded
+        """
+        start = profile.timer()
+        body = []
+        try:
+            iter_body = getattr(b, "iter_body", None)
+            if iter_body:
+                chunks = profile.iterate("fetch", iter_body(url))
+
+            else:
+                # a brow browser can't stream
+                with profile.stage("fetch"):
+                    b.load(url)
+                    chunks = [b.body]
+
+            # a brow browser already loaded the page, a streaming fetcher hasn't
+            # even connected yet
+            seconds = profile.timer() - start
+            tail = ""
+            it = iter(chunks)
+            while True:
+                chunk_start = profile.timer()
+                chunk = next(it, None)
+                seconds += profile.timer() - chunk_start
+                if chunk is None:
+                    break
+
+                # the captcha marker could be split between 2 chunks
+                self.robot_check(tail + chunk)
+                tail = chunk[-32:]
+                body.append(chunk)
+                yield chunk
+
+        except RobotError as e:
+            self.events.emit("robot_check", wishlist=self, error=e, url=url, page=page)
+            raise
+
+        body = "".join(body)
+        self.page_fetched(url, page, body, seconds)
+        if self.archiver.policy != "off":
+            self.archiver.archive("{}-{}".format(self.name, page), body)
+
+    def page_fetched(self, url, page, body, seconds):
+        """Let the hooks know about a fetched page"""
+        self.pages += 1
+        if self.events.has("page_fetched"):
+            self.events.emit(
+                "page_fetched",
+                wishlist=self,
+                url=url,
+                page=page,
+                bytes=len(body.encode("utf-8")),
+                seconds=seconds,
+            )
+
+    def finish_archive(self):
+        """Wait for the archived pages of a crawl to be written, the background
+        thread of an archiver this Wishlist created is stopped so it doesn't
+        outlive the crawl (the next crawl starts it again)"""
+        if self.owns_archiver:
+            self.archiver.close()
+
+        else:
+            self.archiver.flush()
+
+    def get_start(self):
+        """Return where the crawl starts, this is the first page unless a
+        checkpointed crawl is being resumed
+
+        :returns: tuple, (url, page, seen_keys)
+        """
+        url, page, seen_keys = "", 1, set()
+        if self.checkpoint:
+            url, page, seen_keys = self.checkpoint.get_start()
+            if url:
+                logger.info("Resuming {} from page {}".format(self.name, page))
+        return url or self.get_wishlist_url(), page, seen_keys
+
+    def page_started(self, url, page, seen_keys):
+        """Called before each page is loaded"""
+        self.page = page
+        if self.checkpoint:
+            self.checkpoint.add_page(page, url, seen_keys)
+        if self.events.has("page_started"):
+            self.events.emit("page_started", wishlist=self, url=url, page=page)
+
+    def iter_stream(self):
+        """Fetch each page of the wishlist and yield each item as soon as its html
+        has been downloaded
+
+        the pages are never built into a tree, see wishlist.stream.ItemStream, each
+        item is built on its own
+
+        :returns: generator of WishlistElement instances
+        """
+        url, page, seen_keys = self.get_start()
+        self.pages = 0
+        self.stop_reason = ""
+        try:
+            with self.session() as b:
+                while url:
+                    self.page_started(url, page, seen_keys)
+                    stream = ItemStream()
+                    for chunk in self.load_page_chunks(b, url, page):
+                        for markup in stream.feed(chunk):
+                            yield self.get_stream_item(markup, url, page)
+
+                    for markup in stream.close():
+                        yield self.get_stream_item(markup, url, page)
+
+                    url = self.get_pagination_url(
+                        stream.pagination.get("showMoreUrl"),
+                        stream.pagination.get("lastEvaluatedKey"),
+                        seen_keys
+                    )
+                    if not url:
+                        self.stop_reason = "circular" if stream.pagination.get("showMoreUrl") else "last_page"
+                    page += 1
+
+        finally:
+            self.finish_archive()
+
+    def get_stream_item(self, markup, url, page):
+        """Return the element of the html of one item, see .iter_stream()"""
+        soup = self.soupify_page(markup)
+        return self.element_class(soup.find("div"), url, page, self.region)
+
+    def iter_pages(self):
+        """Fetch and parse each page of the wishlist
+
+        the next page url is found before the current page is yielded
+
+        :returns: generator of (soup, url, page) tuples
+        """
+        url, page, seen_keys = self.get_start()
+        self.pages = 0
+        self.stop_reason = ""
+        try:
+            with self.session() as b:
+                while url:
+                    self.page_started(url, page, seen_keys)
+                    soup = self.load_page(b, url, page)
+                    next_url = self.get_next_url(soup, seen_keys)
+                    if not next_url:
+                        self.stop_reason = "circular" if soup.select_one("input.showMoreUrl") else "last_page"
+                    yield soup, url, page
+
+                    url = next_url
+                    page += 1
+
+        finally:
+            self.finish_archive()
+
+    def get_pages(self):
+        """Return the pages iterator, this is .iter_pages() but prefetched if
+        .prefetch is set"""
+        pages = self.iter_pages()
+        if self.prefetch > 0:
+            pages = prefetched(pages, self.prefetch)
+        return pages
+
+    def iter_items(self):
+        """Yield every item of the wishlist, this is .__iter__() without the hooks"""
+        detach = self.detach
+        fields = None if detach is True else detach
+        if fields and self.checkpoint and "uuid" not in fields:
+            # the checkpoint needs the uuids to know what was already yielded
+            fields = list(fields) + ["uuid"]
+        if self.stream:
+            for item in self.iter_stream():
+                yield self.detach_item(item, fields) if detach else item
+
+        else:
+            for soup, url, page in self.get_pages():
+                items = self.get_items(soup, url, page)
+                if detach:
+                    try:
+                        for item in items:
+                            yield self.detach_item(item, fields)
+
+                    finally:
+                        soup.decompose()
+
+                else:
+                    for item in items:
+                        yield item
+
+    def detach_item(self, item, fields):
+        def on_error(field, e):
+            self.item_failed(item, e)
+        return item.detach(fields, on_error)
+
+    def item_failed(self, item, e):
+        """Let the hooks know a field of item failed to parse, whatever catches an
+        item's ParseError should call this so the failure is counted"""
+        self.events.emit("parse_failed", wishlist=self, error=e, page=item.page, item=item)
+
+    def __iter__(self):
+        return self.crawl()
+
+    def set_options(self, events=None, throttle=None, checkpoint=None):
+        """Set the options of the crawl that is starting, see .crawl()"""
+        if checkpoint is True:
+            checkpoint = Checkpoint(self.name)
+        self.events = Events() if events is None else events
+        self.throttle = throttle
+        self.checkpoint = checkpoint or None
+
+    def resume(self, **kwargs):
+        """Continue the last crawl from the page it stopped on, the items it already
+        yielded are skipped, if there isn't a saved checkpoint the crawl starts at
+        the beginning
+
+        :param **kwargs: the options of .crawl()
+        :returns: generator, the items that weren't yielded yet
+        """
+        return self.crawl(resume=True, **kwargs)
+
+    def crawl(self, resume=False, events=None, throttle=None, checkpoint=None):
+        """Yield every item of the wishlist and call the event hooks, this is what
+        iterating a Wishlist does
+
+            for item in w.crawl(events=events, throttle=throttle, checkpoint=True):
+                pass
+
+        :param resume: bool, True to continue from the checkpoint, see .resume()
+        :param events: Events, the hooks that are called while crawling, see
+            wishlist.events
+        :param throttle: Throttle, if passed in then the requests to each host are
+            rate limited and retried when the host pushes back, see
+            wishlist.throttle
+        :param checkpoint: Checkpoint|bool, if passed in then how far the crawl got
+            is saved so it can be continued with .resume(), True (or resuming
+            without a checkpoint) uses a Checkpoint in environ.CHECKPOINT_DIR, see
+            wishlist.checkpoint
+        :returns: generator
+        """
+        if resume and not checkpoint:
+            checkpoint = True
+        self.set_options(events, throttle, checkpoint)
+        events = self.events
+        checkpoint = self.checkpoint
+
+        start = profile.timer()
+        items = 0
+        reason = "closed"
+        error = None
+
+        if checkpoint:
+            if not resume or not checkpoint.load():
+                checkpoint.reset()
+
+        try:
+            for item in self.iter_items():
+                if checkpoint:
+                    uuid = self.get_item_uuid(item)
+                    if uuid and checkpoint.is_emitted(uuid):
+                        continue
+                    checkpoint.add_item(item.page, uuid)
+
+                items += 1
+                events.emit("item_parsed", wishlist=self, item=item, page=item.page)
+                yield item
+
+            reason = self.stop_reason
+
+        except RobotError as e:
+            reason = "robot_check"
+            error = e
+            raise
+
+        except ParseError as e:
+            reason = "parse_failed"
+            error = e
+            events.emit("parse_failed", wishlist=self, error=e, page=self.page, item=None)
+            raise
+
+        except Exception as e:
+            reason = "error"
+            error = e
+            raise
+
+        finally:
+            if checkpoint:
+                if reason in ("last_page", "circular"):
+                    checkpoint.clear()
+
+                else:
+                    checkpoint.save()
+
+            events.emit(
+                "crawl_finished",
+                wishlist=self,
+                pages=self.pages,
+                items=items,
+                reason=reason,
+                error=error,
+                seconds=profile.timer() - start,
+            )
+
+    def to_table(self, columns=None):
+        """Crawl the list into a columnar Table, each item's values are added as it
+        is yielded so the pages don't pile up, see wishlist.table
+
+        :param columns: list, the columns, defaults to all of them
+        :returns: Table
+        """
+        table = Table(columns)
+        table.extend(self)
+        return table
+
+    def get_item_uuid(self, item):
+        """Return the uuid of item, or None if it doesn't have one"""
+        try:
+            return item.uuid
+
+        except ParseError:
+            return None
+
+    def sync(self, snapshot=None, watermark="", fields=None, events=None, throttle=None):
+        """Find what changed since a previous crawl without crawling the whole list
+
+        wishlists are ordered by date added (newest first) so once a page with an
+        item that was already seen is reached the rest of the list is assumed to be
+        unchanged and no more pages are fetched
+
+        :param snapshot: list, the .jsonable() dicts of the previous crawl in the
+            order they were yielded, if given then changed and removed items are
+            also found
+        :param watermark: string, the uuid of the newest item of the previous crawl
+            (WishlistDelta.watermark), use this if there isn't a snapshot, only
+            added items will be found
+        :param fields: list, the fields compared to find changed items, defaults to
+            WishlistDelta.fields, a field that fails to parse is None
+        :param events: Events, see .crawl()
+        :param throttle: Throttle, see .crawl()
+        :returns: WishlistDelta
+        """
+        self.set_options(events, throttle)
+        delta = WishlistDelta(watermark=watermark)
+        if fields is None:
+            fields = delta.fields
+        json_fields = list(fields)
+        if "uuid" not in json_fields:
+            json_fields.append("uuid")
+
+        known = {}
+        for i, item_json in enumerate(snapshot or []):
+            known[item_json["uuid"]] = (i, item_json)
+
+        seen = set()
+        last_known_index = -1
+        complete = True
+        for soup, url, page in self.get_pages():
+            delta.pages += 1
+            reached = False
+            for item in self.get_items(soup, url, page):
+                # a field that doesn't parse is None (and the parse_failed hook is
+                # called) instead of failing the whole sync
+                item_json = self.detach_item(item, json_fields).jsonable(json_fields)
+                uuid = item_json["uuid"]
+                seen.add(uuid)
+                if delta.pages == 1 and not delta.items:
+                    delta.watermark = uuid
+                delta.items.append(item_json)
+
+                if uuid in known:
+                    reached = True
+                    i, old_json = known[uuid]
+                    last_known_index = max(last_known_index, i)
+                    if any(old_json.get(f) != item_json.get(f) for f in fields):
+                        delta.changed.append((old_json, item_json))
+
+                elif uuid == watermark:
+                    reached = True
+
+                elif not reached:
+                    # anything after an item that was already seen is older than it
+                    delta.added.append(item_json)
+
+            if reached:
+                complete = False
+                break
+
+        delta.complete = complete
+        for uuid, (i, old_json) in known.items():
+            if uuid not in seen and (complete or i < last_known_index):
+                delta.removed.append((i, old_json))
+        delta.removed = [old_json for i, old_json in sorted(delta.removed, key=lambda r: r[0])]
+
+        return delta
+
+
+class WishlistDelta(object):
+    """What Wishlist.sync() returns, the differences between the wishlist now and a
+    previous crawl"""
+
+    fields = ("title", "price", "marketplace_price", "comment", "discount", "quantity")
+    """the fields that are compared to decide if an item changed"""
+
+    def __init__(self, watermark=""):
+        self.added = []
+        """the .jsonable() of the items that weren't in the previous crawl"""
+
+        self.removed = []
+        """the previous .jsonable() of the items that aren't in the list anymore"""
+
+        self.changed = []
+        """(previous, current) .jsonable() tuples of the items that changed"""
+
+        self.items = []
+        """the .jsonable() of all the items that were fetched"""
+
+        self.watermark = watermark
+        """the uuid of the newest item, pass this to the next .sync()"""
+
+        self.pages = 0
+        """how many pages were fetched"""
+
+        self.complete = False
+        """True if every page was fetched"""
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+    __nonzero__ = __bool__
 
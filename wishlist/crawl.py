@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, division, print_function, absolute_import
+from collections import namedtuple
+import threading
+import logging
+
+from .compat import *
+from .core import Wishlist
+
+
+logger = logging.getLogger(__name__)
+
+
+CrawlResult = namedtuple("CrawlResult", ["name", "item", "error", "wishlist"])
+"""What Crawler yields, if error is set then the wishlist name failed and item
+will be None, wishlist is the Wishlist the item came from (None if it couldn't be
+created)"""
+
+
+class Crawler(object):
+    """Crawl many wishlists at the same time with a bounded pool of worker threads
+
+        for result in Crawler(names, workers=8, per_host=2):
+            if result.error:
+                print("{} failed: {}".format(result.name, result.error))
+            else:
+                print(result.name, result.item.jsonable())
+
+    results are streamed as they are parsed, so the items of the different lists
+    will be interleaved, but the items of any one list are always in list order. A
+    list that fails (eg, RobotError, ParseError) yields one result with the error
+    (after any items it had already yielded) and the rest of the lists keep going
+
+    a name can be followed by the region it is on (eg, "NAME de"), so lists from
+    different marketplaces can be crawled by the same workers
+    """
+    wishlist_class = Wishlist
+
+    def __init__(self, names, workers=4, per_host=2, buffer_size=100, events=None, throttle=None, **kwargs):
+        """
+        :param names: iterable, the wishlist names, this is only iterated as the
+            workers need more names
+        :param workers: int, how many lists can be crawled at the same time
+        :param per_host: int, how many lists from the same host (eg, amazon.com) can
+            be crawled at the same time
+        :param buffer_size: int, how many results can be waiting to be yielded
+            before the workers pause, this is also how many names can be set aside
+            while their host is full
+        :param events: Events, the hooks of every list's crawl, see Wishlist.crawl()
+        :param throttle: Throttle, shared by every list's crawl so the rate is per
+            host, see Wishlist.crawl()
+        :param **kwargs: passed through to each Wishlist
+        """
+        self.names = names
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.buffer_size = buffer_size
+        self.events = events
+        self.throttle = throttle
+        self.kwargs = kwargs
+
+        self.failures = {}
+        """name -> exception of the lists that failed"""
+
+        self.counts = {}
+        """name -> how many items were yielded for the list"""
+
+        self._active = {}
+        """host -> how many of its lists are being crawled"""
+
+        self._pending = []
+        """(name, Wishlist) of the names that were taken but whose host was full"""
+
+        self._names = None
+        self._lock = threading.Condition()
+
+    def get_wishlist(self, name):
+        kwargs = self.kwargs
+        parts = name.split()
+        if len(parts) > 1:
+            kwargs = dict(kwargs, region=parts[1], host="")
+        return self.wishlist_class(parts[0], **kwargs)
+
+    def read_name(self):
+        """Return the next name, None if there aren't any more"""
+        for name in self._names:
+            name = name.strip()
+            if name:
+                return name
+        return None
+
+    def acquire(self, stop):
+        """Return the next list whose host has a free slot, this runs in a worker
+        thread
+
+        a name whose host is full is set aside and the next names are tried, so the
+        workers never sit idle behind one busy host while the names of other hosts
+        are waiting
+
+        :param stop: threading.Event
+        :returns: tuple, (name, Wishlist, exception), the Wishlist is None and the
+            exception is set if it couldn't be created, None when there aren't any
+            more names
+        """
+        with self._lock:
+            while not stop.is_set():
+                for i, (name, w) in enumerate(self._pending):
+                    if self._active.get(w.host, 0) < self.per_host:
+                        self._pending.pop(i)
+                        self._active[w.host] = self._active.get(w.host, 0) + 1
+                        return name, w, None
+
+                name = None
+                if len(self._pending) < self.buffer_size:
+                    name = self.read_name()
+
+                if name:
+                    try:
+                        w = self.get_wishlist(name)
+
+                    except Exception as e:
+                        return name, None, e
+
+                    self._pending.append((name, w))
+
+                elif self._pending:
+                    # every waiting name is on a full host
+                    self._lock.wait(0.1)
+
+                else:
+                    break
+
+        return None
+
+    def release(self, w):
+        """Free the host slot of a list that was returned from .acquire()"""
+        with self._lock:
+            self._active[w.host] -= 1
+            self._lock.notify_all()
+
+    def __iter__(self):
+        results = queue.Queue(maxsize=max(1, self.buffer_size))
+        stop = threading.Event()
+        self._names = iter(self.names)
+        self._pending = []
+        self._active = {}
+        done = object()
+
+        def put(result):
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def work():
+            try:
+                task = self.acquire(stop)
+                while task and not stop.is_set():
+                    name, w, error = task
+                    if error:
+                        self.fail(name, error, put)
+
+                    else:
+                        try:
+                            self.crawl(name, w, put, stop)
+
+                        finally:
+                            self.release(w)
+
+                    task = self.acquire(stop)
+
+            finally:
+                put(done)
+
+        threads = []
+        for i in range(self.workers):
+            t = threading.Thread(target=work, name="wishlist-crawl-{}".format(i))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+
+        try:
+            running = len(threads)
+            while running:
+                result = results.get()
+                if result is done:
+                    running -= 1
+                else:
+                    yield result
+
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+
+    def crawl(self, name, w, put, stop):
+        """Crawl one wishlist, this runs in a worker thread
+
+        :param name: string, the wishlist name
+        :param w: Wishlist, the list of name
+        :param put: callable, called with each CrawlResult, returns False if the
+            crawl should stop
+        :param stop: threading.Event, set when the crawl should stop
+        """
+        self.counts[name] = 0
+        try:
+            logger.debug("Crawling wishlist {}".format(name))
+            for item in w.crawl(events=self.events, throttle=self.throttle):
+                if stop.is_set() or not put(CrawlResult(name, item, None, w)):
+                    break
+                self.counts[name] += 1
+
+        except Exception as e:
+            self.fail(name, e, put, w)
+
+    def fail(self, name, e, put, w=None):
+        """Report the list name failed"""
+        logger.warning("Wishlist {} failed with {}".format(name, e))
+        self.counts.setdefault(name, 0)
+        self.failures[name] = e
+        put(CrawlResult(name, None, e, w))
@@ -4,3 +4,32 @@ import os
 
 HOST = os.environ.get("WISHLIST_HOST", "https://www.amazon.com")
 
+
+# the Beautiful Soup parser used to parse wishlist pages (eg, lxml, html.parser),
+# if empty then brow's default parser is used
+PARSER = os.environ.get("WISHLIST_PARSER", "")
+
+# how fetched wishlist pages are archived, "off", "sample" or "always", see
+# wishlist.archive.Archiver
+ARCHIVE = os.environ.get("WISHLIST_ARCHIVE", "off")
+
+# where the archived pages are written, if empty brow's cache directory is used
+ARCHIVE_DIR = os.environ.get("WISHLIST_ARCHIVE_DIR", "")
+
+# the fraction of pages archived when ARCHIVE is "sample"
+ARCHIVE_SAMPLE_RATE = float(os.environ.get("WISHLIST_ARCHIVE_SAMPLE_RATE", 0.1))
+
+# where fetched pages are cached when caching is on, if empty a wishlist-cache
+# directory in the temp directory is used, see wishlist.cache.PageCache
+CACHE_DIR = os.environ.get("WISHLIST_CACHE_DIR", "")
+
+# how many seconds a cached page is fresh, 0 is forever
+CACHE_TTL = float(os.environ.get("WISHLIST_CACHE_TTL", 0))
+
+# the most bytes the page cache can use, 0 is unlimited
+CACHE_MAX_SIZE = int(os.environ.get("WISHLIST_CACHE_MAX_SIZE", 0))
+
+
+# where crawl checkpoints are saved, if empty a wishlist-checkpoints directory in
+# the temp directory is used, see wishlist.checkpoint.Checkpoint
+CHECKPOINT_DIR = os.environ.get("WISHLIST_CHECKPOINT_DIR", "")
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Hooks into what a Wishlist is doing while it crawls
+
+    events = Events()
+    events.on("page_fetched", lambda **kw: print(kw["url"], kw["seconds"]))
+
+    stats = Stats(events)
+    for item in Wishlist(name).crawl(events=events):
+        pass
+    stats.write("/var/lib/node_exporter/wishlist.prom")
+
+every event is called with keyword arguments, they all get wishlist (the
+Wishlist instance) and then:
+
+    page_started: url, page (before the page is fetched, so the page before it is
+        done)
+    page_fetched: url, page, bytes, seconds
+    item_parsed: item, page
+    parse_failed: error, page, item (None if the page failed)
+    robot_check: error, url, page
+    crawl_finished: pages, items, reason, error, seconds
+
+reason is why the crawl stopped: "last_page", "circular" (the pagination went
+back to a page that was already seen), "robot_check", "parse_failed", "error",
+or "closed" if the items stopped being iterated
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+class Events(object):
+    """A registry of event callbacks, see the module docblock for the events"""
+    names = set(["page_started", "page_fetched", "item_parsed", "parse_failed", "robot_check", "crawl_finished"])
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def on(self, name, callback):
+        """Call callback(**kwargs) every time the name event happens"""
+        if name not in self.names:
+            raise ValueError("Unknown event {}".format(name))
+        self.callbacks.setdefault(name, []).append(callback)
+        return callback
+
+    def off(self, name, callback):
+        callbacks = self.callbacks.get(name, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def has(self, name):
+        """Return True if anything is listening for name, this can be used to skip
+        doing any work for an event nobody wants"""
+        return bool(self.callbacks.get(name))
+
+    def emit(self, name, **kwargs):
+        """Call all the callbacks of name, a callback that fails is logged so it
+        can't break the crawl"""
+        for callback in self.callbacks.get(name, ()):
+            try:
+                callback(**kwargs)
+
+            except Exception as e:
+                logger.exception(e)
+
+
+class Stats(object):
+    """Aggregates the events into counters that can be written out in the
+    Prometheus text format or as json
+
+    one Stats can listen to the events of many wishlists (eg, all the lists of a
+    Crawler), it is thread safe
+    """
+    buckets = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    """the fetch latency histogram buckets in seconds"""
+
+    def __init__(self, events=None, prefix="wishlist"):
+        """
+        :param events: Events, if passed in then the stats will listen to it
+        :param prefix: string, the prefix of the prometheus metric names
+        """
+        self.prefix = prefix
+        self.pages = 0
+        self.bytes = 0
+        self.fetch_seconds = 0.0
+        self.fetch_buckets = [0] * len(self.buckets)
+        self.items = 0
+        self.parse_failures = 0
+        self.robot_checks = 0
+        self.crawls = {}
+        """reason -> how many crawls stopped for that reason"""
+
+        self.crawl_seconds = 0.0
+        self._lock = threading.Lock()
+
+        if events is not None:
+            self.listen(events)
+
+    def listen(self, events):
+        events.on("page_fetched", self.page_fetched)
+        events.on("item_parsed", self.item_parsed)
+        events.on("parse_failed", self.parse_failed)
+        events.on("robot_check", self.robot_check)
+        events.on("crawl_finished", self.crawl_finished)
+
+    def page_fetched(self, bytes=0, seconds=0.0, **kwargs):
+        with self._lock:
+            self.pages += 1
+            self.bytes += bytes
+            self.fetch_seconds += seconds
+            for i, bucket in enumerate(self.buckets):
+                if seconds <= bucket:
+                    self.fetch_buckets[i] += 1
+
+    def item_parsed(self, **kwargs):
+        with self._lock:
+            self.items += 1
+
+    def parse_failed(self, **kwargs):
+        with self._lock:
+            self.parse_failures += 1
+
+    def robot_check(self, **kwargs):
+        with self._lock:
+            self.robot_checks += 1
+
+    def crawl_finished(self, reason="", seconds=0.0, **kwargs):
+        with self._lock:
+            self.crawls[reason] = self.crawls.get(reason, 0) + 1
+            self.crawl_seconds += seconds
+
+    def jsonable(self):
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "bytes": self.bytes,
+                "fetch_seconds": self.fetch_seconds,
+                "items": self.items,
+                "parse_failures": self.parse_failures,
+                "robot_checks": self.robot_checks,
+                "crawls": dict(self.crawls),
+                "crawl_seconds": self.crawl_seconds,
+            }
+
+    def prometheus(self):
+        """Return the stats in the Prometheus text exposition format"""
+        d = self.jsonable()
+        with self._lock:
+            fetch_buckets = list(self.fetch_buckets)
+
+        lines = []
+        def metric(name, kind, help, samples):
+            name = "{}_{}".format(self.prefix, name)
+            lines.append("# HELP {} {}".format(name, help))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for suffix, labels, value in samples:
+                labels = ",".join('{}="{}"'.format(k, v) for k, v in labels)
+                lines.append("{}{}{} {}".format(
+                    name,
+                    suffix,
+                    "{" + labels + "}" if labels else "",
+                    value
+                ))
+
+        metric("pages_fetched_total", "counter", "Wishlist pages fetched", [("", (), d["pages"])])
+        metric("fetched_bytes_total", "counter", "Bytes of html fetched", [("", (), d["bytes"])])
+
+        samples = []
+        for bucket, count in zip(self.buckets, fetch_buckets):
+            samples.append(("_bucket", (("le", bucket),), count))
+        samples.append(("_bucket", (("le", "+Inf"),), d["pages"]))
+        samples.append(("_sum", (), d["fetch_seconds"]))
+        samples.append(("_count", (), d["pages"]))
+        metric("fetch_seconds", "histogram", "How long fetching a page took", samples)
+
+        metric("items_parsed_total", "counter", "Wishlist items parsed", [("", (), d["items"])])
+        metric("parse_failures_total", "counter", "Pages and items that failed to parse", [("", (), d["parse_failures"])])
+        metric("robot_checks_total", "counter", "Robot check pages that were fetched", [("", (), d["robot_checks"])])
+        metric(
+            "crawls_total",
+            "counter",
+            "Finished crawls by why they stopped",
+            [("", (("reason", reason),), count) for reason, count in sorted(d["crawls"].items())]
+        )
+        metric("crawl_seconds_total", "counter", "Time spent crawling", [("", (), d["crawl_seconds"])])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, format=""):
+        """Write the stats to path, the file is replaced all at once so a reader
+        (eg, node_exporter's textfile collector) never sees part of it
+
+        :param path: string
+        :param format: string, "prometheus" or "json", defaults to json if path ends
+            with .json and prometheus otherwise
+        """
+        if not format:
+            format = "json" if path.endswith(".json") else "prometheus"
+
+        if format == "json":
+            body = json.dumps(self.jsonable(), indent=2, sort_keys=True)
+
+        elif format == "prometheus":
+            body = self.prometheus()
+
+        else:
+            raise ValueError("Unknown stats format {}".format(format))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fp:
+            fp.write(body)
+        os.rename(tmp_path, path)
+
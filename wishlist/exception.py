@@ -8,3 +8,21 @@ class RobotError(ParseError):
     """Raised when programatic access is detected"""
     pass
 
+
+class FetchError(IOError):
+    """Raised when a page can't be fetched because of the response status"""
+    def __init__(self, msg, status=0):
+        self.status = status
+        super(FetchError, self).__init__(msg)
+
+    @property
+    def retry(self):
+        """True if the host is asking for the requests to slow down"""
+        return self.status in set([429, 503])
+
+
+
+class CacheMissError(LookupError):
+    """Raised when a page isn't in the cache and it can't be fetched (eg, replay
+    mode)"""
+    pass
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Stream wishlist items out as json lines or csv rows as they are parsed
+
+    with open("wishlist.jsonl", "w") as fp:
+        export(Wishlist(name), fp, format="jsonl")
+
+    # or with the hooks of the crawl
+    with open("wishlist.jsonl", "w") as fp:
+        export(Wishlist(name).crawl(events=events), fp, events=events)
+
+nothing is held in memory, each item is written as soon as it is parsed and the
+output is flushed after the items of every page
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import csv
+import itertools
+import json
+import logging
+import threading
+
+from .compat import *
+from .core import WishlistElement
+from .events import Events
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_json_encoder():
+    """Return a callable that encodes a dict to a json string, this uses orjson
+    if it is installed because it is a lot faster than the builtin json module"""
+    try:
+        import orjson
+
+    except ImportError:
+        return json.dumps
+
+    else:
+        return lambda d: orjson.dumps(d).decode("utf-8")
+
+
+def get_csv_fields(fields):
+    """Return the csv column names of fields, quantity is split into 2 columns"""
+    columns = []
+    for field in fields:
+        if field == "quantity":
+            columns.extend(["wanted", "has"])
+        else:
+            columns.append(field)
+    return columns
+
+
+def iter_pages(items):
+    """Yield the items page by page
+
+    :param items: iterable, a Wishlist or WishlistElement instances
+    :returns: generator of iterables, each one is the items of one page
+    """
+    # a Wishlist is iterated like any other iterable so its options (eg, detach,
+    # stream) are all honored, a page is done once an item of the next page shows
+    # up, see PageFlusher
+    for page, page_items in itertools.groupby(items, lambda item: item.page):
+        yield page_items
+
+
+def iter_jsonable(items, fields=None, on_error=None):
+    """Yield the .jsonable() of each item
+
+    :param items: iterable, WishlistElement instances (eg, a Wishlist)
+    :param fields: list, the fields of each item, defaults to all of them
+    :param on_error: callable, called with (item, exception) when an item fails to
+        parse and the item is skipped, if None the exception is raised
+    """
+    for item in items:
+        try:
+            yield item.jsonable(fields)
+
+        except Exception as e:
+            if on_error:
+                on_error(item, e)
+            else:
+                raise
+
+
+def iter_jsonl(items, fields=None, on_error=None):
+    """Yield each item as a line of json
+
+    see iter_jsonable() for the arguments
+    """
+    encode = get_json_encoder()
+    for item_json in iter_jsonable(items, fields, on_error):
+        yield encode(item_json) + "\n"
+
+
+def iter_csv(items, fields=None, on_error=None, header=True):
+    """Yield each item as a csv row
+
+    see iter_jsonable() for the arguments
+
+    :param header: bool, True if the first row should be the column names
+    """
+    fields = list(fields or WishlistElement.json_fields)
+    buf = StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+
+    def row(values):
+        writer.writerow(values)
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        return line
+
+    if header:
+        yield row(get_csv_fields(fields))
+
+    for item_json in iter_jsonable(items, fields, on_error):
+        values = []
+        for field in fields:
+            value = item_json[field]
+            if field == "quantity":
+                values.extend([value["wanted"], value["has"]])
+            else:
+                values.append("" if value is None else value)
+        yield row(values)
+
+
+class PageFlusher(object):
+    """Flushes fp once every item of a page has been written
+
+    grouping the items by page only shows a page is done when the first item of
+    the next page shows up, and that is after the next page was fetched, so if
+    there are events (the hooks of the crawl, see Wishlist.crawl()) fp is flushed
+    when the next page is started, before it is fetched. Pages can be started on
+    another thread (eg, prefetch) so the writes and flushes are locked
+    """
+    def __init__(self, fp, events=None):
+        self.fp = fp
+        self.events = events
+        self.written = 0
+        """how many items were written"""
+
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self.events is not None:
+            self.events.on("page_started", self.page_started)
+        return self
+
+    def __exit__(self, *args):
+        if self.events is not None:
+            self.events.off("page_started", self.page_started)
+        self.flush()
+
+    def write(self, line, item=True):
+        with self._lock:
+            self.fp.write(line)
+            self.dirty = True
+            if item:
+                self.written += 1
+
+    def flush(self):
+        """Flush fp if anything was written since the last flush"""
+        with self._lock:
+            if self.dirty:
+                self.fp.flush()
+                self.dirty = False
+
+    def page_started(self, **kwargs):
+        self.flush()
+
+
+def export(items, fp, format="jsonl", fields=None, on_error=None, events=None):
+    """Write items to fp as they are parsed, fp is flushed after each page, see
+    PageFlusher
+
+    :param items: iterable, a Wishlist or WishlistElement instances (eg,
+        Wishlist.crawl())
+    :param fp: file, a text file
+    :param format: string, "jsonl" or "csv"
+    :param fields: list, the fields of each item, defaults to all of them
+    :param on_error: callable, see iter_jsonable()
+    :param events: Events, the hooks of the crawl that yields items, if items is a
+        Wishlist then it is crawled with new hooks when this is None
+    :returns: int, how many items were written
+    """
+    if format not in set(["jsonl", "csv"]):
+        raise ValueError("Unknown export format {}".format(format))
+
+    if events is None and hasattr(items, "crawl"):
+        events = Events()
+        items = items.crawl(events=events)
+
+    with PageFlusher(fp, events) as flusher:
+        for i, page_items in enumerate(iter_pages(items)):
+            if format == "jsonl":
+                lines = iter_jsonl(page_items, fields, on_error)
+            else:
+                lines = iter_csv(page_items, fields, on_error, header=(i == 0))
+                if i == 0:
+                    flusher.write(next(lines), item=False)
+
+            for line in lines:
+                flusher.write(line)
+
+            flusher.flush()
+
+    return flusher.written
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Fetch backends, these are what Wishlist uses to get the html of each page
+
+a fetch backend has the same interface as the parts of a brow Browser that
+Wishlist uses:
+
+    with Fetcher.session() as f:
+        f.load(url)
+        f.body # the html of url
+        f.dump(basename="foo") # save the html for debugging
+
+        for chunk in f.iter_body(url):
+            pass # the html of url as it is downloaded
+
+none of the http or browser libraries are imported until a session is started
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from contextlib import contextmanager
+import codecs
+import logging
+import os
+import random
+
+from .compat import *
+from .exception import RobotError, FetchError
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_robot_check(body):
+    """Return True if body (the html of a page as bytes or text) is Amazon's robot
+    check, this is just a substring check so it is a lot faster than parsing"""
+    if isinstance(body, bytes):
+        return b"validateCaptcha" in body
+    return "validateCaptcha" in body
+
+
+class Fetcher(object):
+    """Base fetch backend"""
+
+    checks_robots = False
+    """True if .load() raises RobotError on a robot check page, so the body
+    doesn't have to be checked again after it"""
+
+    @property
+    def body(self):
+        raise NotImplementedError()
+
+    @property
+    def url(self):
+        raise NotImplementedError()
+
+    @classmethod
+    @contextmanager
+    def session(cls, **kwargs):
+        instance = cls(**kwargs)
+        try:
+            yield instance
+
+        finally:
+            instance.close()
+
+    def close(self):
+        pass
+
+    def load(self, url):
+        raise NotImplementedError()
+
+    def iter_body(self, url, chunk_size=16384):
+        """Load url and yield its html in chunks as it is downloaded, a fetcher that
+        can't stream yields the whole body as one chunk
+
+        :param url: string, the page url
+        :param chunk_size: int, about how many bytes each chunk will be
+        :returns: generator of strings
+        """
+        self.load(url)
+        yield self.body
+
+    def dump(self, prefix="dump", directory=None, basename=""):
+        """Write the current body to directory/prefix-basename.html
+
+        :returns: list, the paths that were written
+        """
+        if directory is None:
+            from brow import environ as brow_environ
+            directory = brow_environ.CACHE_DIR
+
+        if prefix:
+            basename = "{}-{}".format(prefix, basename)
+
+        path = os.path.join(directory, "{}.html".format(basename))
+        with codecs.open(path, encoding='utf-8', mode='w+') as f:
+            f.write(self.body)
+        logger.debug("Dumped html to {}".format(path))
+        return [path]
+
+
+class HTTPFetcher(Fetcher):
+    """Fetches pages with a plain pooled http client (a requests Session) that keeps
+    connections alive, accepts gzip, and uses the cookies saved by `wishlist auth`"""
+
+    timeout = 30.0
+
+    checks_robots = True
+
+    @property
+    def body(self):
+        # the page is only decoded once no matter how many times this is called
+        body = self._body
+        if body is None:
+            body = self.response.content
+            if body:
+                encoding = self.response.encoding
+                if not encoding:
+                    encoding = "utf-8"
+                body = body.decode(encoding)
+            self._body = body
+        return body
+
+    @property
+    def url(self):
+        return self.response.url
+
+    def __init__(self, headers=None, pool_size=10):
+        """
+        :param headers: dict, sent with every request, defaults to .get_headers()
+        :param pool_size: int, how many connections are kept alive per host
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.interface = requests.Session()
+        self.interface.headers.update(headers or self.get_headers())
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.interface.mount("http://", adapter)
+        self.interface.mount("https://", adapter)
+
+        self.response = None
+        self._body = None
+        self.domains = set()
+
+    def close(self):
+        self.interface.close()
+
+    def load_cookies(self, domain):
+        """Add the cookies `wishlist auth` saved for domain to the session"""
+        from brow.core import Cookies
+
+        cookies = Cookies(domain)
+        cookies.load()
+        if len(cookies):
+            self.interface.cookies.update(cookies.jar)
+            logger.debug("Loaded {} cookies for {}".format(len(cookies), domain))
+
+    def load_domain(self, url):
+        """Make sure the cookies for the domain of url are loaded"""
+        domain = urlparse.urlparse(url).hostname
+        if domain not in self.domains:
+            self.load_cookies(domain)
+            self.domains.add(domain)
+
+    def load(self, url):
+        logger.debug("Loading url {}".format(url))
+        self.load_domain(url)
+        self._body = None
+        self.response = self.interface.get(url, timeout=self.timeout)
+        self.check_response(self.response)
+        # checking the raw bytes means a robot check page is never decoded
+        if is_robot_check(self.response.content):
+            raise RobotError("Amazon robot check")
+        return self.response
+
+    def check_response(self, response):
+        """Raise FetchError if the response status means the host is pushing back"""
+        if response.status_code in set([429, 503]):
+            raise FetchError(
+                "{} returned {}".format(response.url, response.status_code),
+                response.status_code
+            )
+
+    def iter_body(self, url, chunk_size=16384):
+        self.load_domain(url)
+        logger.debug("Streaming url {}".format(url))
+        self._body = None
+        self.response = self.interface.get(url, timeout=self.timeout, stream=True)
+        try:
+            self.check_response(self.response)
+            if not self.response.encoding:
+                self.response.encoding = "utf-8"
+
+            first = True
+            for chunk in self.response.iter_content(chunk_size, decode_unicode=True):
+                if chunk:
+                    # a robot check page is small so it will be in the first chunk
+                    if first and is_robot_check(chunk):
+                        raise RobotError("Amazon robot check")
+                    first = False
+                    yield chunk
+
+        finally:
+            self.response.close()
+
+    def get_headers(self):
+        """Return headers that will make the requests look like they are coming from
+        Firefox"""
+        version = "91.0"
+        oses = [
+            "Macintosh; Intel Mac OS X 10.15",
+            "Windows NT 10.0; Win64; x64",
+            "X11; Linux x86_64",
+        ]
+        user_agent = " ".join([
+            "Mozilla/5.0",
+            "({}; rv:{})".format(random.choice(oses), version),
+            "Gecko/20100101",
+            "Firefox/{}".format(version),
+        ])
+
+        return {
+            "accept-language": "en-US,en;q=0.5",
+            "accept-encoding": "gzip, deflate",
+            "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "user-agent": user_agent,
+            "connection": "keep-alive",
+            "upgrade-insecure-requests": "1",
+        }
+
+
+class BrowserFetcher(Fetcher):
+    """Fetches pages with brow's simple Firefox browser, this is what Wishlist used
+    before the fetch backends, it imports selenium"""
+    @classmethod
+    @contextmanager
+    def session(cls, **kwargs):
+        from brow.interface.simple import SimpleFirefoxBrowser
+        with SimpleFirefoxBrowser.session(**kwargs) as b:
+            yield b
+
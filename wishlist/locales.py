@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Parse the prices and dates of the wishlist pages of every marketplace
+
+    parser = get_parser("de_DE")
+    parser.parse_price("1.234,56 €") # 1234.56
+    parser.parse_date("Artikel hinzugefügt 16. Juli 2020") # date(2020, 7, 16)
+
+the regexes of each locale are compiled once, the first time the locale is
+used. A page written in another locale than the parser's (eg, a German list read
+with the default en_US locale) still parses, the numbers fall back to guessing
+the decimal separator from the digits after it and the dates fall back to the
+month names of every language. The same date strings show up over and over (every
+item added on the same day) so the parsed dates are kept in a bounded cache
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from collections import OrderedDict
+import datetime
+import logging
+import re
+import threading
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+MONTHS = {
+    "en": ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"],
+    "de": ["januar", "februar", "märz", "april", "mai", "juni", "juli", "august", "september", "oktober", "november", "dezember"],
+    "fr": ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"],
+    "es": ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"],
+    "it": ["gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio", "agosto", "settembre", "ottobre", "novembre", "dicembre"],
+    "nl": ["januari", "februari", "maart", "april", "mei", "juni", "juli", "augustus", "september", "oktober", "november", "december"],
+    "pt": ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"],
+}
+"""language -> the month names in order"""
+
+
+SEPARATORS = {
+    "en": (".", ","),
+    "ja": (".", ","),
+    "de": (",", "."),
+    "es": (",", "."),
+    "it": (",", "."),
+    "nl": (",", "."),
+    "pt": (",", "."),
+    "fr": (",", " "),
+    "es_MX": (".", ","),
+}
+"""language or locale -> (decimal separator, thousands separator), the locale
+wins over its language"""
+
+
+class BoundedCache(object):
+    """A thread safe least recently used cache that holds at most maxsize values"""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._values.pop(key)
+
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            # put it back at the end so it is the most recently used
+            self._values[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = value
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+
+def get_month_regex(months):
+    """Return the regex alternation of the month names in months, longest first so
+    eg, junio is never matched as juni"""
+    return "|".join(re.escape(m) for m in sorted(months, key=len, reverse=True))
+
+
+def get_date_regexes(months, numbers=None):
+    """Return the compiled (regex, month name -> month number) of the month day
+    year and the day month year orders
+
+    :param months: list, the month names in order
+    :param numbers: dict, month name -> month number, defaults to the order of
+        months
+    :returns: list
+    """
+    if numbers is None:
+        numbers = dict((m, i) for i, m in enumerate(months, 1))
+
+    month = get_month_regex(months)
+    flags = re.I | re.U
+    return [
+        # June 19, 2018
+        (re.compile(r"\b(?P<month>{})\.?\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}})\b".format(month), flags), numbers),
+        # 16. Juli 2020, 19 June 2018, 16 de julio de 2020
+        (re.compile(r"\b(?P<day>\d{{1,2}})\.?\s+(?:de\s+)?(?P<month>{})\.?\s+(?:de\s+)?(?P<year>\d{{4}})\b".format(month), flags), numbers),
+    ]
+
+
+_all_date_regexes = []
+
+
+def get_all_date_regexes():
+    """Return the date regexes of the month names of every language, these are
+    compiled the first time they are needed"""
+    if not _all_date_regexes:
+        numbers = {}
+        for months in MONTHS.values():
+            for i, m in enumerate(months, 1):
+                numbers[m] = i
+        _all_date_regexes.extend(get_date_regexes(list(numbers), numbers))
+    return list(_all_date_regexes)
+
+
+class LocaleParser(object):
+    """The compiled price and date parsing of one locale, use get_parser() to get
+    one"""
+
+    cache_size = 1024
+    """how many date strings are remembered"""
+
+    ymd_regex = re.compile(r"(?P<year>\d{4})\s*年\s*(?P<month>\d{1,2})\s*月\s*(?P<day>\d{1,2})\s*日")
+    """the Japanese dates (eg, 2020年7月16日)"""
+
+    def __init__(self, locale):
+        """
+        :param locale: string, eg de_DE
+        """
+        self.locale = locale
+        self.language = locale.split("_")[0].lower()
+        self.decimal, self.thousands = SEPARATORS.get(
+            locale,
+            SEPARATORS.get(self.language, SEPARATORS["en"])
+        )
+
+        separators = "".join(re.escape(s) for s in set([".", ",", self.thousands]))
+        if self.thousands == " ":
+            # French uses (narrow) no-break spaces to group the thousands
+            separators += "\u00a0\u202f"
+        self.number_regex = re.compile(r"\d(?:[\d{}]*\d)?".format(separators), re.U)
+        self.space_regex = re.compile("[\\s\u00a0\u202f']", re.U)
+
+        months = MONTHS.get(self.language)
+        self.date_regexes = get_date_regexes(months) if months else []
+        # the page might not be written in the locale (eg, the host is amazon.com
+        # but the list is German), so every language is tried last
+        self.date_regexes.extend(get_all_date_regexes())
+
+        self.cache = BoundedCache(self.cache_size)
+
+    def to_float(self, s):
+        """Convert a number string (eg, 1.234,56) into a float
+
+        when only one kind of separator is in s and it isn't the locale's decimal
+        separator it is still treated as the decimal separator if it isn't
+        followed by 3 digits, so 6,90 is 6.9 even in en_US
+
+        :returns: float
+        """
+        s = self.space_regex.sub("", s)
+        dot = s.rfind(".")
+        comma = s.rfind(",")
+        if dot >= 0 and comma >= 0:
+            decimal = "." if dot > comma else ","
+
+        elif dot >= 0 or comma >= 0:
+            separator = "." if dot >= 0 else ","
+            parts = s.split(separator)
+            decimal = ""
+            if len(parts) == 2:
+                if separator == self.decimal or len(parts[1]) != 3:
+                    decimal = separator
+
+        else:
+            decimal = ""
+
+        if decimal:
+            whole, fraction = s.rsplit(decimal, 1)
+            s = "{}.{}".format(re.sub(r"\D", "", whole), fraction)
+
+        else:
+            s = re.sub(r"\D", "", s)
+
+        return float(s)
+
+    def parse_price(self, text):
+        """Return the last price in text (eg, "2 new from $12.99" is 12.99)
+
+        :param text: string
+        :returns: float, None if there isn't a number in text
+        """
+        numbers = self.number_regex.findall(text)
+        return self.to_float(numbers[-1]) if numbers else None
+
+    def parse_date(self, text):
+        """Return the first date in text (eg, "Item added June 19, 2018")
+
+        :param text: string
+        :returns: datetime.date, None if there isn't a date in text
+        """
+        text = text.strip()
+        ret = self.cache.get(text, False)
+        if ret is False:
+            ret = self.find_date(text)
+            self.cache.set(text, ret)
+        return ret
+
+    def find_date(self, text):
+        m = self.ymd_regex.search(text)
+        if m:
+            return datetime.date(int(m.group("year")), int(m.group("month")), int(m.group("day")))
+
+        for regex, numbers in self.date_regexes:
+            m = regex.search(text)
+            if m:
+                try:
+                    return datetime.date(
+                        int(m.group("year")),
+                        numbers[m.group("month").lower()],
+                        int(m.group("day"))
+                    )
+
+                except ValueError as e:
+                    logger.warning("Invalid date {}: {}".format(m.group(0), e))
+
+        return None
+
+
+_parsers = {}
+_lock = threading.Lock()
+
+
+def get_parser(locale="en_US"):
+    """Return the LocaleParser of locale, each locale is only compiled once"""
+    parser = _parsers.get(locale)
+    if parser is None:
+        with _lock:
+            parser = _parsers.get(locale)
+            if parser is None:
+                parser = LocaleParser(locale)
+                _parsers[locale] = parser
+    return parser
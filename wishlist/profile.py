@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Find out where the time of a crawl goes
+
+    with Profiler() as p:
+        for item in Wishlist(name):
+            item.jsonable()
+    print(p.report())
+
+while a Profiler is active it records how many times, and for how long, each
+stage of the crawl ran (fetch, archive, soupify, get_items, jsonable) and each
+WishlistElement field was computed. Field times are cumulative, so a field that
+uses another field (eg, wanted_count uses quantity) includes its time, and the
+same goes for stages (eg, when streaming, fetch includes soupify). Nothing is
+recorded, and almost nothing is done, while there isn't an active Profiler
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from contextlib import contextmanager
+import logging
+import threading
+import timeit
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+current = None
+"""the active Profiler, this is checked by the instrumented code"""
+
+timer = timeit.default_timer
+
+
+class Stat(object):
+    """The measurements of one stage or field"""
+    __slots__ = ("count", "total", "peak")
+
+    def __init__(self):
+        self.count = 0
+        """how many times it ran"""
+
+        self.total = 0.0
+        """the cumulative seconds"""
+
+        self.peak = 0
+        """the most bytes allocated above what was already allocated when it
+        started, only set if memory is on"""
+
+    def jsonable(self):
+        return {"count": self.count, "total": self.total, "peak": self.peak}
+
+
+class Profiler(object):
+    """Records call counts and cumulative times while it is active, see the module
+    docblock"""
+    def __init__(self, memory=False):
+        """
+        :param memory: bool, True to also record the peak memory of each stage with
+            tracemalloc, this slows everything down a lot
+        """
+        self.memory = memory
+        self.stats = {}
+        """name (eg, "fetch", "field.added") -> Stat"""
+
+        self._lock = threading.Lock()
+        self._previous = None
+        self._tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        global current
+        self._previous = current
+        current = self
+
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+        return self
+
+    def stop(self):
+        global current
+        current = self._previous
+        self._previous = None
+
+        if self._tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._tracing = False
+
+    def get_stat(self, name):
+        stat = self.stats.get(name)
+        if stat is None:
+            with self._lock:
+                stat = self.stats.setdefault(name, Stat())
+        return stat
+
+    def add(self, name, seconds, peak=0, count=1):
+        """Record count runs of name that took seconds"""
+        stat = self.get_stat(name)
+        with self._lock:
+            stat.count += count
+            stat.total += seconds
+            if peak > stat.peak:
+                stat.peak = peak
+
+    @contextmanager
+    def stage(self, name):
+        """Time the wrapped block as one run of name"""
+        tracemalloc = None
+        if self.memory:
+            import tracemalloc
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        start = timer()
+        try:
+            yield self
+
+        finally:
+            peak = 0
+            if tracemalloc:
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+            self.add(name, timer() - start, peak)
+
+    def jsonable(self):
+        return dict((name, stat.jsonable()) for name, stat in self.stats.items())
+
+    def report(self):
+        """Return the stats as a table, the stages first and then the fields, each
+        slowest first"""
+        lines = ["{:<28} {:>8} {:>12} {:>10} {:>10}".format(
+            "name",
+            "calls",
+            "total ms",
+            "avg us",
+            "peak KiB",
+        )]
+        stats = sorted(
+            self.stats.items(),
+            key=lambda s: (s[0].startswith("field."), -s[1].total)
+        )
+        for name, stat in stats:
+            lines.append("{:<28} {:>8} {:>12.2f} {:>10.1f} {:>10}".format(
+                name,
+                stat.count,
+                stat.total * 1000.0,
+                stat.total * 1000000.0 / max(1, stat.count),
+                "{:.1f}".format(stat.peak / 1024.0) if stat.peak else "-",
+            ))
+        return "\n".join(lines)
+
+
+class NoStage(object):
+    """What stage() returns when nothing is being profiled"""
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *args):
+        pass
+
+no_stage = NoStage()
+
+
+def stage(name):
+    """Return a context manager that times the wrapped block as one run of name
+    if there is an active Profiler"""
+    profiler = current
+    return profiler.stage(name) if profiler else no_stage
+
+
+def iterate(name, iterable):
+    """Time every value iterable yields as one run of name if there is an active
+    Profiler, the time the caller spends with each value isn't counted"""
+    profiler = current
+    if profiler:
+        return profiled(profiler, name, iterable)
+    return iterable
+
+
+def profiled(profiler, name, iterable):
+    it = iter(iterable)
+    while True:
+        start = timer()
+        try:
+            value = next(it)
+
+        except StopIteration:
+            # finding out there isn't another value still took time
+            profiler.add(name, timer() - start, count=0)
+            break
+
+        profiler.add(name, timer() - start)
+        yield value
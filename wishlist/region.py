@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""The Amazon marketplaces, a Region is the host a list lives on and the locale its
+pages are written in
+
+    w = Wishlist(name, region="de")
+    w = Wishlist(name, host="https://www.amazon.co.uk")
+
+every Wishlist (and each of its elements) has its own region, so lists from
+different marketplaces can be crawled at the same time in the same process
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from collections import namedtuple
+import logging
+import threading
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+Region = namedtuple("Region", ["code", "host", "locale"])
+"""code is the short name of the marketplace (eg, "de"), it is empty for a host
+that isn't a known marketplace"""
+
+
+DEFAULT_LOCALE = "en_US"
+
+
+REGIONS = dict((r.code, r) for r in [
+    Region("us", "https://www.amazon.com", "en_US"),
+    Region("ca", "https://www.amazon.ca", "en_CA"),
+    Region("mx", "https://www.amazon.com.mx", "es_MX"),
+    Region("br", "https://www.amazon.com.br", "pt_BR"),
+    Region("uk", "https://www.amazon.co.uk", "en_GB"),
+    Region("de", "https://www.amazon.de", "de_DE"),
+    Region("fr", "https://www.amazon.fr", "fr_FR"),
+    Region("it", "https://www.amazon.it", "it_IT"),
+    Region("es", "https://www.amazon.es", "es_ES"),
+    Region("nl", "https://www.amazon.nl", "nl_NL"),
+    Region("in", "https://www.amazon.in", "en_IN"),
+    Region("jp", "https://www.amazon.co.jp", "ja_JP"),
+    Region("au", "https://www.amazon.com.au", "en_AU"),
+])
+"""code -> Region of the known marketplaces"""
+
+
+def get_domain(host):
+    """Return the domain of host without the scheme and www (eg, amazon.de)"""
+    if "//" not in host:
+        host = "//" + host
+    domain = urlparse.urlparse(host).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+_domains = dict((get_domain(r.host), r) for r in REGIONS.values())
+_hosts = {}
+_lock = threading.Lock()
+
+
+def get_region(code="", host=""):
+    """Return the Region of a marketplace code or host
+
+    :param code: string, a key of REGIONS (eg, "de"), if host is also passed in
+        then the region uses host instead of the marketplace's host
+    :param host: string, the host (eg, https://www.amazon.de), a host that isn't
+        a known marketplace gets the default locale
+    :returns: Region
+    """
+    if code:
+        try:
+            region = REGIONS[code.lower()]
+
+        except KeyError:
+            raise ValueError("Unknown region {}, it should be one of {}".format(
+                code,
+                ", ".join(sorted(REGIONS))
+            ))
+
+        return region._replace(host=host) if host else region
+
+    region = _hosts.get(host)
+    if region is None:
+        region = _domains.get(get_domain(host))
+        region = region._replace(host=host) if region else Region("", host, DEFAULT_LOCALE)
+        with _lock:
+            # the hosts are remembered because every element asks for its region
+            if len(_hosts) < 1000:
+                _hosts[host] = region
+    return region
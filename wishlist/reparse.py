@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Re-parse archived wishlist pages without fetching anything
+
+    for result in Reparser("/tmp/pages", processes=8):
+        for item_json in result.items:
+            print(result.name, result.page, item_json["title"])
+
+the pages are the {name}-{page}.html(.gz) files written by Archiver (or the
+dump-{name}-{page}.html files the older versions wrote), each file is parsed in a
+worker process and the results come back in (name, page) order no matter which
+worker finished first
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from collections import namedtuple
+import codecs
+import gzip
+import logging
+import multiprocessing
+import os
+import re
+import zlib
+
+from .compat import *
+from .core import Wishlist
+from .exception import ParseError, RobotError
+from .fetch import is_robot_check
+
+
+logger = logging.getLogger(__name__)
+
+
+PageResult = namedtuple("PageResult", ["path", "name", "page", "items", "failures"])
+"""What Reparser yields for each page file, items is a list of .jsonable() dicts
+and failures is a list of error messages, one for each item that raised a
+ParseError, or one for the whole file if it couldn't be read or parsed"""
+
+
+def get_page_files(directory):
+    """Return the archived page files in directory
+
+    :param directory: string, the archive directory
+    :returns: list, (name, page, path) tuples sorted by name and then page
+    """
+    regex = re.compile(r"^(?:dump-)?(.+)-(\d+)\.html(?:\.gz)?$")
+    page_files = []
+    for basename in os.listdir(directory):
+        m = regex.match(basename)
+        if m:
+            path = os.path.join(directory, basename)
+            page_files.append((m.group(1), int(m.group(2)), path))
+
+    page_files.sort()
+    return page_files
+
+
+def read_page(path):
+    """Return the html of an archived page, compressed or not"""
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            body = f.read().decode("utf-8")
+
+    else:
+        with codecs.open(path, encoding="utf-8") as f:
+            body = f.read()
+
+    return body
+
+
+def reparse_page(args):
+    """Parse one page file, this runs in a worker process so it is a module level
+    function that only takes and returns plain values
+
+    :param args: tuple, (path, name, page, fields, parser)
+    :returns: PageResult
+    """
+    path, name, page, fields, parser = args
+    items = []
+    failures = []
+    try:
+        try:
+            body = read_page(path)
+
+        except (EOFError, IOError, OSError, UnicodeDecodeError, zlib.error) as e:
+            # eg, a page that was cut off when the crawl crashed
+            raise ParseError(msg="Could not read {}: {}".format(path, e))
+
+        if is_robot_check(body):
+            raise RobotError("Amazon robot check")
+
+        w = Wishlist(name, parser=parser, archive="off")
+        soup = w.soupify_page(body)
+        for i, item in enumerate(w.get_items(soup, w.get_wishlist_url(), page), 1):
+            try:
+                items.append(item.jsonable(fields))
+
+            except ParseError as e:
+                failures.append("item {} failed with {}".format(i, e))
+
+    except ParseError as e:
+        failures.append("failed with {}".format(e))
+
+    except Exception as e:
+        # one bad file shouldn't lose the results of all the others
+        logger.exception(e)
+        failures.append("failed with {}: {}".format(type(e).__name__, e))
+
+    return PageResult(path, name, page, items, failures)
+
+
+class Reparser(object):
+    """Parse every archived page in a directory across a pool of processes
+
+    parsing is cpu bound so threads don't help, each page file is handed to a
+    worker process which returns plain dicts, and the results are yielded in
+    (name, page) order
+    """
+    def __init__(self, directory, processes=None, fields=None, parser="", chunksize=1):
+        """
+        :param directory: string, the directory with the archived pages
+        :param processes: int, how many worker processes, defaults to the cpu count,
+            1 parses everything in this process
+        :param fields: list, the item fields to extract, defaults to all of them
+        :param parser: string, the Beautiful Soup parser, see Wishlist
+        :param chunksize: int, how many page files are sent to a worker at a time
+        """
+        self.directory = directory
+        self.processes = processes or multiprocessing.cpu_count()
+        self.fields = list(fields) if fields else None
+        self.parser = parser
+        self.chunksize = max(1, chunksize)
+
+        self.failures = {}
+        """path -> list of error messages of the page files that had failures"""
+
+        self.count = 0
+        """how many items were parsed"""
+
+    def __iter__(self):
+        tasks = [
+            (path, name, page, self.fields, self.parser)
+            for name, page, path in get_page_files(self.directory)
+        ]
+        logger.debug("Re-parsing {} pages in {}".format(len(tasks), self.directory))
+
+        if self.processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(self.processes, len(tasks)))
+            try:
+                # imap keeps the order of tasks
+                for result in pool.imap(reparse_page, tasks, self.chunksize):
+                    yield self.add_result(result)
+
+            finally:
+                pool.terminate()
+                pool.join()
+
+        else:
+            for task in tasks:
+                yield self.add_result(reparse_page(task))
+
+    def add_result(self, result):
+        self.count += len(result.items)
+        if result.failures:
+            self.failures[result.path] = result.failures
+        return result
+
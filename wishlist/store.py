@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, division, print_function, absolute_import
+import logging
+import sqlite3
+import time
+
+from .compat import *
+from .exception import ParseError
+
+
+logger = logging.getLogger(__name__)
+
+
+class Store(object):
+    """A SQLite database of crawled wishlist items with a price/quantity history for
+    each item
+
+        store = Store("wishlist.db")
+        store.save(Wishlist(name), wishlist=name)
+        for item in store.price_drops(10):
+            print(item["title"], item["previous_price"], item["price"])
+
+    the item table has one row per item (keyed by WishlistElement.uuid) with its
+    latest values, including the price of the crawl before, so the common queries
+    never have to touch the history table
+    """
+    schema = [
+        """
+        CREATE TABLE IF NOT EXISTS crawl (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            wishlist TEXT NOT NULL,
+            created REAL NOT NULL,
+            items INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS item (
+            uuid TEXT PRIMARY KEY,
+            wishlist TEXT NOT NULL,
+            title TEXT,
+            url TEXT,
+            image TEXT,
+            author TEXT,
+            price REAL,
+            previous_price REAL,
+            price_ratio REAL,
+            marketplace_price REAL,
+            wanted INTEGER,
+            has INTEGER,
+            in_stock INTEGER NOT NULL DEFAULT 0,
+            first_crawl INTEGER NOT NULL,
+            last_crawl INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            uuid TEXT NOT NULL,
+            crawl_id INTEGER NOT NULL,
+            price REAL,
+            marketplace_price REAL,
+            wanted INTEGER,
+            has INTEGER,
+            PRIMARY KEY (uuid, crawl_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS item_price_ratio ON item (price_ratio)",
+        "CREATE INDEX IF NOT EXISTS item_in_stock_price ON item (in_stock, price)",
+        "CREATE INDEX IF NOT EXISTS item_wishlist ON item (wishlist, last_crawl)",
+        "CREATE INDEX IF NOT EXISTS crawl_wishlist ON crawl (wishlist, id)",
+    ]
+
+    fields = ["uuid", "title", "url", "image", "author", "price", "marketplace_price", "quantity", "digital"]
+    """the WishlistElement fields that are saved"""
+
+    def __init__(self, path=":memory:"):
+        """
+        :param path: string, the sqlite database file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            for sql in self.schema:
+                self.connection.execute(sql)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_row(self, item):
+        """Normalize item into the values that are saved
+
+        :param item: WishlistElement|dict, a dict should be what .jsonable() returns
+        :returns: dict, None if the item doesn't have a uuid
+        """
+        if isinstance(item, dict):
+            item_json = item
+
+        else:
+            item_json = {}
+            for field in self.fields:
+                try:
+                    item_json[field] = item.jsonable_field(field)
+
+                except ParseError as e:
+                    # one field failing shouldn't lose the whole item, it will be
+                    # saved as NULL
+                    logger.warning("Could not parse {} of page {} item: {}".format(field, item.page, e))
+                    item_json[field] = None
+
+        if not item_json.get("uuid"):
+            # every row is keyed by the uuid, so without one the item would
+            # overwrite every other item without one
+            logger.warning("Skipping item {} without a uuid".format(item_json.get("title")))
+            return None
+
+        price = item_json.get("price")
+        quantity = item_json.get("quantity") or {}
+        return {
+            "uuid": item_json["uuid"],
+            "title": item_json.get("title", ""),
+            "url": item_json.get("url", ""),
+            "image": item_json.get("image", ""),
+            "author": item_json.get("author", ""),
+            "price": price,
+            "marketplace_price": item_json.get("marketplace_price"),
+            "wanted": quantity.get("wanted"),
+            "has": quantity.get("has"),
+            "in_stock": 1 if (price or item_json.get("digital")) else 0,
+        }
+
+    def save(self, items, wishlist=""):
+        """Save one crawl of a wishlist, everything is saved in one transaction
+
+        :param items: iterable, WishlistElement instances or .jsonable() dicts, the
+            items without a uuid are skipped
+        :param wishlist: string, the wishlist name
+        :returns: int, the crawl id
+        """
+        rows = [row for row in (self.get_row(item) for item in items) if row]
+        with self.connection as c:
+            cursor = c.execute(
+                "INSERT INTO crawl (wishlist, created, items) VALUES (?, ?, ?)",
+                (wishlist, time.time(), len(rows))
+            )
+            crawl_id = cursor.lastrowid
+            for row in rows:
+                row["wishlist"] = wishlist
+                row["crawl_id"] = crawl_id
+
+            c.executemany(
+                """
+                INSERT INTO item (
+                    uuid, wishlist, title, url, image, author, price, previous_price,
+                    price_ratio, marketplace_price, wanted, has, in_stock, first_crawl,
+                    last_crawl
+                ) VALUES (
+                    :uuid, :wishlist, :title, :url, :image, :author, :price, NULL,
+                    NULL, :marketplace_price, :wanted, :has, :in_stock, :crawl_id,
+                    :crawl_id
+                )
+                ON CONFLICT (uuid) DO UPDATE SET
+                    wishlist = excluded.wishlist,
+                    title = excluded.title,
+                    url = excluded.url,
+                    image = excluded.image,
+                    author = excluded.author,
+                    previous_price = item.price,
+                    price_ratio = CASE WHEN item.price > 0 AND excluded.price IS NOT NULL
+                        THEN excluded.price / item.price ELSE NULL END,
+                    price = excluded.price,
+                    marketplace_price = excluded.marketplace_price,
+                    wanted = excluded.wanted,
+                    has = excluded.has,
+                    in_stock = excluded.in_stock,
+                    last_crawl = excluded.last_crawl
+                """,
+                rows
+            )
+
+            c.executemany(
+                """
+                INSERT OR REPLACE INTO history (
+                    uuid, crawl_id, price, marketplace_price, wanted, has
+                ) VALUES (
+                    :uuid, :crawl_id, :price, :marketplace_price, :wanted, :has
+                )
+                """,
+                rows
+            )
+
+        logger.debug("Saved {} items for crawl {}".format(len(rows), crawl_id))
+        return crawl_id
+
+    def query(self, sql, params=()):
+        """Run sql and return the rows as dicts"""
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def price_drops(self, percent, limit=None):
+        """Return the items whose price dropped more than percent since the crawl
+        before their last crawl, biggest drops first, only the items that were in
+        the latest crawl of their wishlist are returned
+
+        :param percent: float, eg 10 for items that are at least 10% cheaper
+        :param limit: int, the most items returned
+        :returns: list of dicts
+        """
+        sql = " ".join([
+            "SELECT * FROM item",
+            "WHERE price_ratio <= ? AND price > 0",
+            "AND last_crawl = (SELECT MAX(crawl.id) FROM crawl WHERE crawl.wishlist = item.wishlist)",
+            "ORDER BY price_ratio ASC",
+        ])
+        params = [1.0 - (percent / 100.0)]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+    def cheapest(self, limit, in_stock=True):
+        """Return the limit cheapest items
+
+        :param limit: int, how many items
+        :param in_stock: bool, True to only return items that are in stock
+        :returns: list of dicts
+        """
+        if in_stock:
+            sql = "SELECT * FROM item WHERE in_stock = 1 AND price > 0 ORDER BY price ASC LIMIT ?"
+        else:
+            sql = "SELECT * FROM item WHERE price > 0 ORDER BY price ASC LIMIT ?"
+        return self.query(sql, [limit])
+
+    def history(self, uuid):
+        """Return the price/quantity history of an item, oldest first"""
+        return self.query(
+            " ".join([
+                "SELECT history.*, crawl.created FROM history",
+                "INNER JOIN crawl ON crawl.id = history.crawl_id",
+                "WHERE history.uuid = ? ORDER BY history.crawl_id ASC",
+            ]),
+            [uuid]
+        )
+
+    def get(self, uuid):
+        """Return the latest values of an item, or None"""
+        rows = self.query("SELECT * FROM item WHERE uuid = ?", [uuid])
+        return rows[0] if rows else None
+
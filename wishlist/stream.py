@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Find the items of a wishlist page while the page is still being downloaded
+
+    stream = ItemStream()
+    for chunk in chunks:
+        for markup in stream.feed(chunk):
+            item = WishlistElement(markup)
+    for markup in stream.close():
+        ...
+
+the page is tokenized (not tree built) and the html of each item container is
+handed off as soon as its closing tag is seen, so only one item is ever built
+into a tree at a time
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import logging
+import re
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+class ItemStream(HTMLParser):
+    """An incremental tokenizer that pulls the item containers (div#item_*) and
+    the pagination inputs out of a wishlist page"""
+
+    pagination_classes = set(["showMoreUrl", "lastEvaluatedKey"])
+
+    conditional_comment_regex = re.compile(r"<!\[(?:if|else|endif)\b[^\]]*\][^>]*>", re.I)
+    """matches the ends of IE conditional comments (eg, <![endif]-->), HTMLParser
+    waits for a "]>" that never comes so it would buffer the rest of the page"""
+
+    def __init__(self):
+        try:
+            # character references are passed through untouched so the item html
+            # can be put back together exactly
+            HTMLParser.__init__(self, convert_charrefs=False)
+
+        except TypeError:
+            # py2 never converts them
+            HTMLParser.__init__(self)
+
+        self.pagination = {}
+        """pagination class (eg, showMoreUrl) -> input value"""
+
+        self.items = []
+        self.markup = None
+        self.depth = 0
+
+    def feed(self, data):
+        """Tokenize the next part of the page
+
+        :param data: string, the next chunk of the page html
+        :returns: list, the html of the items that were closed in this chunk
+        """
+        HTMLParser.feed(self, data)
+        return self.pop_items()
+
+    def close(self):
+        """Tokenize what's left of the page
+
+        :returns: list, the html of the items that were closed
+        """
+        HTMLParser.close(self)
+        if self.markup is not None:
+            logger.warning("Page ended inside of an item")
+            self.markup = None
+        return self.pop_items()
+
+    def pop_items(self):
+        items = self.items
+        self.items = []
+        return items
+
+    def parse_marked_section(self, i, report=1):
+        m = self.conditional_comment_regex.match(self.rawdata, i)
+        if m:
+            if self.markup is not None:
+                self.markup.append(m.group(0))
+            return m.end()
+
+        return HTMLParser.parse_marked_section(self, i, report)
+
+    def handle_starttag(self, tag, attrs):
+        if self.markup is None:
+            if tag == "div":
+                if (dict(attrs).get("id") or "").startswith("item_"):
+                    self.markup = [self.get_starttag_text()]
+                    self.depth = 1
+
+            elif tag == "input":
+                self.handle_input(attrs)
+
+        else:
+            self.markup.append(self.get_starttag_text())
+            # only divs are counted, the other tags (eg, p, li) don't always get
+            # closed and the void tags (eg, img, input) never do
+            if tag == "div":
+                self.depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self.markup is None:
+            if tag == "input":
+                self.handle_input(attrs)
+
+        else:
+            self.markup.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self.markup is not None:
+            self.markup.append("</{}>".format(tag))
+            if tag == "div":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.items.append("".join(self.markup))
+                    self.markup = None
+
+    def handle_input(self, attrs):
+        attrs = dict(attrs)
+        for c in (attrs.get("class") or "").split():
+            if c in self.pagination_classes:
+                self.pagination[c] = attrs.get("value") or ""
+
+    def handle_data(self, data):
+        if self.markup is not None:
+            self.markup.append(data)
+
+    def handle_entityref(self, name):
+        if self.markup is not None:
+            self.markup.append("&{};".format(name))
+
+    def handle_charref(self, name):
+        if self.markup is not None:
+            self.markup.append("&#{};".format(name))
+
+    def handle_comment(self, data):
+        if self.markup is not None:
+            self.markup.append("<!--{}-->".format(data))
+
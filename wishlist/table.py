@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""A columnar table of wishlist items for analytics over a whole list
+
+    table = Wishlist(name).to_table()
+    cheap = table.where("price", "<", 20.0).sort("rating", reverse=True)
+    print(cheap.aggregate("price"))
+    prices = table.to_numpy("price")
+
+each numeric column is a typed array.array (so a list of 100k items is a few
+megabytes instead of 100k dicts), the filters, sorts and aggregates run over whole
+columns with builtins like map() and itertools.compress() instead of a python
+loop per row, and if NumPy is installed the numeric columns can be handed to it
+without copying them. Values that are missing (a field that failed to parse or
+wasn't on the item) are NaN in the float columns and -1 in the integer columns,
+the filters and aggregates skip them
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+from array import array
+import datetime
+import itertools
+import logging
+import operator
+
+from .compat import *
+from .exception import ParseError
+
+
+logger = logging.getLogger(__name__)
+
+
+class Table(object):
+    """Typed columns of item values, see the module docblock"""
+
+    numeric_columns = (
+        ("price", str("d")),
+        ("marketplace_price", str("d")),
+        ("rating", str("d")),
+        ("discount", str("d")),
+        ("wanted", str("l")),
+        ("has", str("l")),
+        ("added", str("l")),
+        ("digital", str("b")),
+        ("page", str("l")),
+    )
+    """(name, array typecode) of the numeric columns, added is the date's ordinal
+    (see datetime.date.fromordinal()) and digital is 1 or 0"""
+
+    text_columns = ("uuid", "title")
+    """the columns that are kept as lists of strings"""
+
+    missing = {
+        str("d"): float("nan"),
+        str("l"): -1,
+        str("b"): -1,
+    }
+    """typecode -> the value of a missing value"""
+
+    operators = {
+        "<": operator.lt,
+        "<=": operator.le,
+        "==": operator.eq,
+        "!=": operator.ne,
+        ">=": operator.ge,
+        ">": operator.gt,
+    }
+
+    def __init__(self, columns=None):
+        """
+        :param columns: list, the column names (see .numeric_columns and
+            .text_columns), defaults to all of them, only these fields are parsed
+        """
+        typecodes = dict(self.numeric_columns)
+        if not columns:
+            columns = [name for name, typecode in self.numeric_columns] + list(self.text_columns)
+
+        self.columns = {}
+        """name -> array.array or list"""
+
+        self.typecodes = {}
+        """name -> typecode of the numeric columns"""
+
+        for name in columns:
+            if name in typecodes:
+                self.typecodes[name] = typecodes[name]
+                self.columns[name] = array(typecodes[name])
+
+            elif name in self.text_columns:
+                self.columns[name] = []
+
+            else:
+                raise ValueError("Unknown column {}".format(name))
+
+        self.names = list(columns)
+        """the column names in the order they were asked for"""
+
+    def __len__(self):
+        return len(self.columns[self.names[0]])
+
+    def __getitem__(self, name):
+        """Return the column name"""
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def get_value(self, item, name):
+        """Return the value of the name column of item, or None if it is missing"""
+        try:
+            if name == "wanted":
+                return item.wanted_count
+
+            elif name == "has":
+                return item.has_count
+
+            elif name == "digital":
+                return 1 if item.is_digital() else 0
+
+            elif name == "added":
+                added = item.added
+                return added.toordinal() if added else None
+
+            else:
+                return getattr(item, name)
+
+        except ParseError as e:
+            logger.warning("Could not parse {} of page {} item: {}".format(name, item.page, e))
+            return None
+
+    def append(self, item):
+        """Add the values of item as a row
+
+        :param item: WishlistElement|WishlistRecord
+        """
+        for name in self.names:
+            value = self.get_value(item, name)
+            typecode = self.typecodes.get(name)
+            if typecode:
+                if value is None:
+                    value = self.missing[typecode]
+                elif typecode == "d":
+                    value = float(value)
+                else:
+                    value = int(value)
+
+            elif value is None:
+                value = ""
+
+            self.columns[name].append(value)
+
+    def extend(self, items):
+        """Add every item as a row, the items are only iterated once so this can
+        be a Wishlist that is still being crawled"""
+        for item in items:
+            self.append(item)
+
+    def row(self, i):
+        """Return the values of the ith row as a dict"""
+        return dict((name, self.columns[name][i]) for name in self.names)
+
+    def rows(self):
+        """Yield every row as a dict"""
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def take(self, indices):
+        """Return a new Table with only the rows in indices, in the order of
+        indices"""
+        indices = list(indices)
+        table = type(self)(self.names)
+        for name in self.names:
+            values = map(self.columns[name].__getitem__, indices)
+            typecode = self.typecodes.get(name)
+            table.columns[name] = array(typecode, values) if typecode else list(values)
+        return table
+
+    def filter(self, mask):
+        """Return a new Table with the rows where mask is true
+
+        :param mask: iterable, one bool for every row (eg, from .compare())
+        """
+        return self.take(itertools.compress(range(len(self)), mask))
+
+    def present(self, name):
+        """Return an iterator of True for every row that has a value for name"""
+        column = self.columns[name]
+        typecode = self.typecodes.get(name)
+        if typecode == "d":
+            # NaN is the only float that doesn't equal itself
+            return map(operator.eq, column, column)
+
+        elif typecode:
+            return map(operator.ne, column, itertools.repeat(self.missing[typecode]))
+
+        return map(bool, column)
+
+    def compare(self, name, op, value):
+        """Return a mask of the rows where the name column op value is true, rows
+        that are missing the value are always false
+
+        :param name: string, the column
+        :param op: string, one of .operators (eg, "<")
+        :param value: mixed
+        :returns: list, a bool for every row
+        """
+        column = self.columns[name]
+        mask = map(self.operators[op], column, itertools.repeat(value))
+        if name in self.typecodes:
+            mask = map(operator.and_, mask, self.present(name))
+        return list(mask)
+
+    def where(self, name, op, value):
+        """Return a new Table of the rows where the name column op value is true
+        (eg, .where("price", "<", 20.0))"""
+        return self.filter(self.compare(name, op, value))
+
+    def sort(self, name, reverse=False):
+        """Return a new Table sorted by the name column, the rows that are missing
+        the value always go last"""
+        column = self.columns[name]
+        indices = range(len(self))
+        present = list(self.present(name))
+        ordered = sorted(itertools.compress(indices, present), key=column.__getitem__, reverse=reverse)
+        ordered.extend(itertools.compress(indices, map(operator.not_, present)))
+        return self.take(ordered)
+
+    def values(self, name):
+        """Return an iterator of the values of the name column that aren't
+        missing"""
+        return itertools.compress(self.columns[name], self.present(name))
+
+    def aggregate(self, name):
+        """Return the count, sum, mean, min and max of the name column, the missing
+        values are skipped
+
+        :returns: dict, the values are None if the column has no values
+        """
+        values = array(str("d"), self.values(name))
+        count = len(values)
+        total = float(sum(values))
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else None,
+            "min": min(values) if count else None,
+            "max": max(values) if count else None,
+        }
+
+    def dates(self, name="added"):
+        """Return the ordinal column name as datetime.date instances, None where the
+        date is missing"""
+        return [datetime.date.fromordinal(o) if o > 0 else None for o in self.columns[name]]
+
+    def to_numpy(self, name=None):
+        """Return the column as a NumPy array, the numeric columns aren't copied so
+        the table can't have rows added while the array exists
+
+        :param name: string, the column, if None then a dict of all the columns
+        :returns: numpy.ndarray|dict
+        """
+        import numpy
+
+        if name is None:
+            return dict((n, self.to_numpy(n)) for n in self.names)
+
+        typecode = self.typecodes.get(name)
+        if typecode:
+            column = self.columns[name]
+            if not len(column):
+                return numpy.zeros(0, dtype=typecode)
+            return numpy.frombuffer(column, dtype=typecode)
+
+        return numpy.array(self.columns[name], dtype=object)
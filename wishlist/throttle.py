@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Keep the request rate to each host at what the host will put up with
+
+    throttle = Throttle(rate=1.0)
+    for item in Wishlist(name).crawl(throttle=throttle):
+        pass
+
+every host gets a token bucket whose rate is adjusted AIMD style (like TCP
+congestion control): each successful fetch adds a little to the rate and each
+robot check (or 429/503) halves it. A fetch that hits a robot check is retried
+after a jittered exponential backoff instead of failing the whole crawl
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import logging
+import random
+import threading
+import time
+import timeit
+
+from .compat import *
+from .exception import RobotError, FetchError
+from .fetch import is_robot_check
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    """A thread safe token bucket, every request takes a token and the tokens are
+    refilled at rate per second up to burst"""
+
+    clock = staticmethod(timeit.default_timer)
+
+    sleep = staticmethod(time.sleep)
+
+    def __init__(self, rate, burst=1.0):
+        """
+        :param rate: float, the tokens added per second
+        :param burst: float, the most tokens the bucket can hold
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.updated = self.clock()
+        self._lock = threading.Lock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take a token, waiting until there is one
+
+        the token is reserved right away (the bucket can go negative) so the
+        waiting threads are let through in the order they asked
+
+        :returns: float, how many seconds were spent waiting
+        """
+        with self._lock:
+            self.refill()
+            self.tokens -= 1.0
+            wait = max(0.0, -self.tokens / self.rate)
+
+        if wait:
+            self.sleep(wait)
+        return wait
+
+    def drain(self):
+        """Throw away all the tokens so the next request has to wait"""
+        with self._lock:
+            self.refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveBucket(TokenBucket):
+    """A TokenBucket whose rate goes up additively on success and down
+    multiplicatively on failure"""
+    def __init__(self, rate=1.0, burst=2.0, min_rate=0.05, max_rate=10.0, increase=0.1, decrease=0.5):
+        """
+        :param rate: float, the starting requests per second
+        :param burst: float, see TokenBucket
+        :param min_rate: float, the rate never goes below this
+        :param max_rate: float, the rate never goes above this
+        :param increase: float, added to the rate after every success
+        :param decrease: float, the rate is multiplied by this after every failure
+        """
+        super(AdaptiveBucket, self).__init__(rate, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+
+    def success(self):
+        with self._lock:
+            self.refill()
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def failure(self):
+        with self._lock:
+            self.refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.drain()
+        logger.debug("Slowing down to {:.2f} requests per second".format(self.rate))
+
+
+class Backoff(object):
+    """Exponential backoff with full jitter, the delay of attempt n is a random
+    number between 0 and min(cap, base * 2^n)
+
+    https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    """
+    def __init__(self, retries=3, base=2.0, cap=60.0):
+        """
+        :param retries: int, how many times a fetch is retried
+        :param base: float, the seconds of the first backoff
+        :param cap: float, the most seconds of any backoff
+        """
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt):
+        """Return how many seconds to wait before retry attempt (starting at 0)"""
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+
+class Throttle(object):
+    """The per host buckets and the backoff policy, one Throttle can be shared by
+    any number of Wishlist instances and threads (eg, all the lists of a Crawler)"""
+
+    bucket_class = AdaptiveBucket
+
+    sleep = staticmethod(time.sleep)
+
+    def __init__(self, backoff=None, **kwargs):
+        """
+        :param backoff: Backoff, defaults to Backoff()
+        :param **kwargs: passed to each host's AdaptiveBucket (eg, rate, max_rate)
+        """
+        self.backoff = backoff or Backoff()
+        self.kwargs = kwargs
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, url):
+        """Return the bucket of url's host"""
+        host = urlparse.urlparse(url).netloc
+        with self._lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.bucket_class(**self.kwargs)
+                self.buckets[host] = bucket
+        return bucket
+
+    def call(self, url, callback, on_retry=None):
+        """Run callback (which fetches url) at the host's rate, retrying it with
+        backoff if the host pushes back
+
+        :param url: string, the url callback fetches
+        :param callback: callable, the fetch, it should raise RobotError or
+            FetchError when the host wants it to slow down
+        :param on_retry: callable, called with the exception of each attempt that
+            is going to be retried, the exception of the last attempt is raised
+            instead
+        :returns: whatever callback returns
+        """
+        bucket = self.get_bucket(url)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                ret = callback()
+
+            except (RobotError, FetchError) as e:
+                bucket.failure()
+                if isinstance(e, FetchError) and not e.retry:
+                    raise
+
+                if attempt >= self.backoff.retries:
+                    raise
+
+                if on_retry:
+                    on_retry(e)
+
+                delay = self.backoff.delay(attempt)
+                logger.warning("{} on {}, retrying in {:.1f} seconds".format(e, url, delay))
+                self.sleep(delay)
+                attempt += 1
+
+            else:
+                bucket.success()
+                return ret
+
+
+class ThrottledFetcher(object):
+    """Wraps a fetcher session so every page goes through a Throttle
+
+    this has the same interface as the fetchers in wishlist.fetch
+    """
+
+    checks_robots = True
+
+    @property
+    def body(self):
+        return self.fetcher.body
+
+    @property
+    def url(self):
+        return self.fetcher.url
+
+    def __init__(self, fetcher, throttle, on_retry=None):
+        """
+        :param fetcher: Fetcher, the session that fetches the pages
+        :param throttle: Throttle
+        :param on_retry: callable, called with (url, exception) for each fetch that
+            is retried, see Throttle.call()
+        """
+        self.fetcher = fetcher
+        self.throttle = throttle
+        self.on_retry = on_retry
+
+    def call(self, url, callback):
+        on_retry = None
+        if self.on_retry:
+            on_retry = lambda e: self.on_retry(url, e)
+        return self.throttle.call(url, callback, on_retry)
+
+    def load(self, url):
+        def fetch():
+            ret = self.fetcher.load(url)
+            # not every fetcher checks for robot check pages (eg, brow's browser)
+            if not getattr(self.fetcher, "checks_robots", False):
+                if is_robot_check(self.fetcher.body):
+                    raise RobotError("Amazon robot check")
+            return ret
+        return self.call(url, fetch)
+
+    def iter_body(self, url, chunk_size=16384):
+        iter_body = getattr(self.fetcher, "iter_body", None)
+        if iter_body:
+            def first():
+                # a robot check page is small so if the first chunk isn't one the
+                # page isn't one, once a chunk is yielded it can't be retried
+                chunks = iter_body(url, chunk_size)
+                chunk = next(chunks, "")
+                if is_robot_check(chunk):
+                    chunks.close()
+                    raise RobotError("Amazon robot check")
+                return chunk, chunks
+
+            chunk, chunks = self.call(url, first)
+            if chunk:
+                yield chunk
+            for chunk in chunks:
+                yield chunk
+
+        else:
+            self.load(url)
+            yield self.body
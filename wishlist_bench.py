@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmarks for parsing the wishlist pages in testdata/
+
+    $ python wishlist_bench.py
+    $ python wishlist_bench.py --parser lxml --number 10 testdata/zero-price-2.html
+    $ python wishlist_bench.py --bench fields --bench memory
+    $ python wishlist_bench.py --bench crawl --crawl-items 1000 --crawl-items 100000
+
+every measurement is also a named metric (lower is always better), the metrics
+can be saved as a baseline and later runs compared against it, any metric that
+got slower (or bigger) than the threshold makes the script exit with 1:
+
+    $ python wishlist_bench.py --save bench.json
+    $ python wishlist_bench.py --baseline bench.json --threshold 0.25
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import argparse
+import fnmatch
+import gc
+import glob
+import json
+import os
+import codecs
+import sys
+import timeit
+
+from brow.utils import Soup
+
+from wishlist.core import Wishlist, WishlistElement
+from wishlist.stream import ItemStream
+from wishlist_server import FakeAmazonServer
+
+
+TESTDATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata")
+
+
+def get_pages(paths):
+    """Return (basename, body) tuples for the pages in paths, if paths is empty then
+    the full page fixtures in testdata/ are used"""
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(TESTDATA_DIR, "wishlist-*.html")))
+        # these are also full wishlist pages
+        paths.append(os.path.join(TESTDATA_DIR, "html-2018-06.html"))
+        paths.append(os.path.join(TESTDATA_DIR, "zero-price-2.html"))
+        paths.append(os.path.join(TESTDATA_DIR, "discount-DE.html"))
+
+    for path in paths:
+        with codecs.open(path, encoding="utf-8") as f:
+            yield os.path.basename(path), f.read()
+
+
+def get_elements(pages, parser):
+    """Return the WishlistElement instances of all the pages, and of the single
+    item fixtures in testdata/"""
+    w = Wishlist("BENCH", parser=parser)
+    elements = []
+    for basename, body in pages:
+        elements.extend(w.get_items(w.soupify_page(body), ""))
+
+    for path in sorted(glob.glob(os.path.join(TESTDATA_DIR, "*_element_*.html"))):
+        with codecs.open(path, encoding="utf-8") as f:
+            elements.append(WishlistElement(Soup(f.read(), parser)))
+
+    return elements
+
+
+def get_scaled_page(body, count):
+    """Return a synthetic wishlist page with count items that are copied from the
+    items of body, this is how the benchmarks check parsing stays linear"""
+    stream = ItemStream()
+    items = stream.feed(body) + stream.close()
+    markup = ["<html><head><title>scaled</title></head><body><div id=\"g-items\">"]
+    for i in range(count):
+        markup.append(items[i % len(items)])
+    markup.append("</div></body></html>")
+    return "".join(markup)
+
+
+def timed(callback, number, repeat=3):
+    """Return the best average seconds of running callback number times"""
+    return min(timeit.repeat(callback, number=number, repeat=repeat)) / number
+
+
+def bench_soupify_page(pages, parsers, number):
+    """Compare parsing the full page against only parsing the items and pagination
+    (see PageStrainer), this is the page parsing done by Wishlist.__iter__"""
+    metrics = {}
+    print("{:<30} {:<12} {:>6} {:>10} {:>10} {:>8}".format(
+        "page",
+        "parser",
+        "items",
+        "full ms",
+        "strain ms",
+        "speedup",
+    ))
+
+    for basename, body in pages:
+        for parser in parsers:
+            times = {}
+            for strain in [False, True]:
+                w = Wishlist("BENCH", parser=parser, strain=strain)
+                def callback():
+                    soup = w.soupify_page(body)
+                    times["items"] = len(list(w.get_items(soup, "")))
+                times[strain] = timed(callback, number)
+
+            print("{:<30} {:<12} {:>6} {:>10.2f} {:>10.2f} {:>7.1f}x".format(
+                basename,
+                parser,
+                times["items"],
+                times[False] * 1000.0,
+                times[True] * 1000.0,
+                times[False] / times[True],
+            ))
+            metrics["soupify.{}.{}.ms".format(parser, basename)] = times[True] * 1000.0
+
+    return metrics
+
+
+def bench_get_items(pages, parsers, number):
+    """Time Wishlist.get_items on an already parsed page"""
+    metrics = {}
+    print("{:<30} {:<12} {:>6} {:>10} {:>10}".format("page", "parser", "items", "ms", "us/item"))
+    for basename, body in pages:
+        for parser in parsers:
+            w = Wishlist("BENCH", parser=parser)
+            soup = w.soupify_page(body)
+            count = len(list(w.get_items(soup, "")))
+            t = timed(lambda: list(w.get_items(soup, "")), number)
+            print("{:<30} {:<12} {:>6} {:>10.2f} {:>10.1f}".format(
+                basename,
+                parser,
+                count,
+                t * 1000.0,
+                t * 1000000.0 / max(1, count),
+            ))
+            metrics["get_items.{}.{}.ms".format(parser, basename)] = t * 1000.0
+
+    return metrics
+
+
+def bench_fields(pages, parsers, number):
+    """Time extracting each field on its own, every element's .index is already
+    built so this is only the cost of the field, every other remembered value
+    (eg, is_digital() that digital and source use) is cleared before each field
+    so nothing is a cache hit, fields that fail on an element are counted and not
+    timed"""
+    metrics = {}
+    print("{:<20} {:<12} {:>8} {:>8} {:>10}".format("field", "parser", "items", "failed", "us/item"))
+    for parser in parsers:
+        elements = get_elements(pages, parser)
+        for element in elements:
+            element.index
+
+        index_time = timed(lambda: [e.build_index(e.soup) for e in elements], number)
+        print("{:<20} {:<12} {:>8} {:>8} {:>10.1f}".format(
+            "(index)",
+            parser,
+            len(elements),
+            0,
+            index_time * 1000000.0 / len(elements),
+        ))
+        metrics["fields.{}.index.us".format(parser)] = index_time * 1000000.0 / len(elements)
+
+        for field in WishlistElement.json_fields:
+            working = []
+            for element in elements:
+                element.invalidate_fields()
+                try:
+                    element.jsonable_field(field)
+                    working.append(element)
+                except Exception:
+                    # some of the old single item fixtures don't parse anymore
+                    pass
+
+            def callback():
+                for element in working:
+                    element.invalidate_fields()
+                    element.jsonable_field(field)
+
+            t = timed(callback, number) if working else 0.0
+            us = t * 1000000.0 / max(1, len(working))
+            print("{:<20} {:<12} {:>8} {:>8} {:>10.1f}".format(
+                field,
+                parser,
+                len(working),
+                len(elements) - len(working),
+                us,
+            ))
+            metrics["fields.{}.{}.us".format(parser, field)] = us
+
+    return metrics
+
+
+def bench_jsonable(pages, parsers, number):
+    """Time the full .jsonable() of every item, starting from fresh elements so
+    nothing is already cached"""
+    metrics = {}
+    fields = [f for f in WishlistElement.json_fields if f != "quantity"]
+    print("{:<30} {:<12} {:>6} {:>10}".format("page", "parser", "items", "us/item"))
+    for basename, body in pages:
+        for parser in parsers:
+            w = Wishlist("BENCH", parser=parser)
+            soup = w.soupify_page(body)
+            tags = [item.soup for item in w.get_items(soup, "")]
+            if not tags:
+                continue
+
+            def callback():
+                for tag in tags:
+                    WishlistElement(tag).jsonable(fields)
+
+            t = timed(callback, number)
+            us = t * 1000000.0 / len(tags)
+            print("{:<30} {:<12} {:>6} {:>10.1f}".format(basename, parser, len(tags), us))
+            metrics["jsonable.{}.{}.us".format(parser, basename)] = us
+
+    return metrics
+
+
+def bench_memory(pages, parsers, number):
+    """Measure how much memory each item keeps alive after its page is parsed and
+    its fields extracted, as an element and as a detached record"""
+    metrics = {}
+    try:
+        import tracemalloc
+    except ImportError:
+        print("tracemalloc is not available, skipping")
+        return metrics
+
+    fields = [f for f in WishlistElement.json_fields if f != "quantity"]
+    print("{:<30} {:<12} {:>6} {:>12} {:>12} {:>12}".format(
+        "page",
+        "parser",
+        "items",
+        "element KiB",
+        "record KiB",
+        "peak KiB",
+    ))
+    for basename, body in pages:
+        for parser in parsers:
+            sizes = {}
+            for detach in [False, True]:
+                w = Wishlist("BENCH", parser=parser)
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    soup = w.soupify_page(body)
+                    items = list(w.get_items(soup, ""))
+                    [item.jsonable(fields) for item in items]
+                    if detach:
+                        items = [item.detach(fields) for item in items]
+                        soup.decompose()
+                    del soup
+                    gc.collect()
+                    current, peak = tracemalloc.get_traced_memory()
+
+                finally:
+                    tracemalloc.stop()
+
+                sizes[detach] = current / 1024.0 / max(1, len(items))
+                sizes["peak"] = peak / 1024.0
+                sizes["items"] = len(items)
+                del items
+
+            if not sizes["items"]:
+                continue
+
+            print("{:<30} {:<12} {:>6} {:>12.1f} {:>12.1f} {:>12.1f}".format(
+                basename,
+                parser,
+                sizes["items"],
+                sizes[False],
+                sizes[True],
+                sizes["peak"],
+            ))
+            metrics["memory.{}.{}.element_kib".format(parser, basename)] = sizes[False]
+            metrics["memory.{}.{}.record_kib".format(parser, basename)] = sizes[True]
+
+    return metrics
+
+
+def bench_scaling(pages, parsers, number, counts=(25, 100, 400)):
+    """Parse synthetic pages with more and more items, the time per item should
+    stay flat"""
+    metrics = {}
+    basename, body = next(((b, p) for b, p in pages if "item_" in p), (None, None))
+    if not body:
+        return metrics
+
+    fields = ["uuid", "title", "price"]
+    print("{:<10} {:<12} {:>10} {:>10}".format("items", "parser", "page ms", "us/item"))
+    for parser in parsers:
+        for count in counts:
+            scaled = get_scaled_page(body, count)
+            w = Wishlist("BENCH", parser=parser)
+            def callback():
+                for item in w.get_items(w.soupify_page(scaled), ""):
+                    item.jsonable(fields)
+
+            t = timed(callback, max(1, number // 2))
+            us = t * 1000000.0 / count
+            print("{:<10} {:<12} {:>10.2f} {:>10.1f}".format(count, parser, t * 1000.0, us))
+            metrics["scaling.{}.{}.us".format(parser, count)] = us
+
+    return metrics
+
+
+def bench_crawl(pages, parsers, number, counts=(250, 1000)):
+    """Crawl synthetic lists end to end (http, pagination, parsing) from a local
+    FakeAmazonServer, the time per item should stay flat as the lists grow"""
+    metrics = {}
+    modes = [
+        ("pages", {}),
+        ("stream", {"stream": True}),
+        ("detach", {"stream": True, "detach": ["uuid", "title", "price"]}),
+    ]
+
+    print("{:<10} {:<12} {:<8} {:>10} {:>10} {:>10}".format(
+        "items",
+        "parser",
+        "mode",
+        "total s",
+        "us/item",
+        "items/s",
+    ))
+    for count in counts:
+        with FakeAmazonServer(items=count).running() as server:
+            for parser in parsers:
+                for mode, kwargs in modes:
+                    def callback():
+                        for item in Wishlist("BENCH", parser=parser, host=server.host, **kwargs):
+                            item.jsonable(["uuid", "title", "price"])
+
+                    # a crawl is long enough that one run is a good measurement
+                    t = timed(callback, 1, repeat=1 if count > 1000 else max(1, min(3, number)))
+                    us = t * 1000000.0 / count
+                    print("{:<10} {:<12} {:<8} {:>10.2f} {:>10.1f} {:>10.0f}".format(
+                        count,
+                        parser,
+                        mode,
+                        t,
+                        us,
+                        count / t,
+                    ))
+                    metrics["crawl.{}.{}.{}.us".format(parser, mode, count)] = us
+
+    return metrics
+
+
+BENCHMARKS = {
+    "soupify": bench_soupify_page,
+    "get_items": bench_get_items,
+    "fields": bench_fields,
+    "jsonable": bench_jsonable,
+    "memory": bench_memory,
+    "scaling": bench_scaling,
+    "crawl": bench_crawl,
+}
+
+
+def get_threshold(name, threshold, metric_thresholds):
+    """Return the allowed regression of the metric name, the last --metric-threshold
+    pattern that matches wins"""
+    for pattern, value in metric_thresholds:
+        if fnmatch.fnmatch(name, pattern):
+            threshold = value
+    return threshold
+
+
+def compare(metrics, baseline, threshold, metric_thresholds=()):
+    """Compare metrics against the baseline metrics
+
+    :param metrics: dict, name -> value of this run
+    :param baseline: dict, name -> value of the saved run
+    :param threshold: float, how much bigger a value can get (eg, 0.2 is 20%)
+    :param metric_thresholds: list, (fnmatch pattern, threshold) tuples that
+        override threshold for the matching metrics
+    :returns: list, (name, baseline value, value, change) tuples of the regressions
+    """
+    regressions = []
+    for name in sorted(metrics):
+        if name in baseline and baseline[name] > 0:
+            change = (metrics[name] - baseline[name]) / baseline[name]
+            if change > get_threshold(name, threshold, metric_thresholds):
+                regressions.append((name, baseline[name], metrics[name], change))
+    return regressions
+
+
+def console():
+    parser = argparse.ArgumentParser(description="Wishlist parsing benchmarks")
+    parser.add_argument("paths", nargs="*", help="html pages, defaults to testdata/")
+    parser.add_argument(
+        "--parser",
+        dest="parsers",
+        action="append",
+        default=[],
+        help="Beautiful Soup parser, can be passed multiple times (default: lxml and html.parser)"
+    )
+    parser.add_argument("--number", type=int, default=5, help="runs per measurement")
+    parser.add_argument(
+        "--bench",
+        dest="benches",
+        action="append",
+        choices=sorted(BENCHMARKS.keys()),
+        default=[],
+        help="which benchmark to run, can be passed multiple times (default: all)"
+    )
+    parser.add_argument(
+        "--crawl-items",
+        dest="crawl_counts",
+        type=int,
+        action="append",
+        default=[],
+        help="how many items the crawl benchmark's lists have, can be passed multiple times (default: 250 and 1000)"
+    )
+    parser.add_argument("--save", default="", help="write the metrics to this json file")
+    parser.add_argument("--baseline", default="", help="compare the metrics to this json file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="how much slower a metric can get before it is a regression (default: 0.2, 20%%)"
+    )
+    parser.add_argument(
+        "--metric-threshold",
+        dest="metric_thresholds",
+        action="append",
+        default=[],
+        help="PATTERN=THRESHOLD, overrides --threshold for metrics matching the pattern (eg, memory.*=0.05)"
+    )
+    args = parser.parse_args()
+
+    parsers = args.parsers or ["lxml", "html.parser"]
+    pages = list(get_pages(args.paths))
+    benches = args.benches or ["soupify", "get_items", "fields", "jsonable", "memory", "scaling", "crawl"]
+
+    metrics = {}
+    for bench in benches:
+        print("")
+        print("== {} ==".format(bench))
+        kwargs = {}
+        if bench == "crawl" and args.crawl_counts:
+            kwargs["counts"] = args.crawl_counts
+        metrics.update(BENCHMARKS[bench](pages, parsers, args.number, **kwargs))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+        print("")
+        print("Saved {} metrics to {}".format(len(metrics), args.save))
+
+    ret = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        metric_thresholds = []
+        for mt in args.metric_thresholds:
+            pattern, value = mt.rsplit("=", 1)
+            metric_thresholds.append((pattern, float(value)))
+
+        regressions = compare(metrics, baseline, args.threshold, metric_thresholds)
+        print("")
+        print("Compared {} metrics to {}, {} regressions".format(
+            len(set(metrics) & set(baseline)),
+            args.baseline,
+            len(regressions),
+        ))
+        for name, before, after, change in regressions:
+            print("  {}: {:.2f} -> {:.2f} (+{:.0f}%)".format(name, before, after, change * 100.0))
+
+        if regressions:
+            ret = 1
+
+    return ret
+
+
+if __name__ == "__main__":
+    sys.exit(console())
+
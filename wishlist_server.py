@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""A local stand-in for Amazon that serves synthetic wishlists built from the item
+markup in testdata/, so the crawler can be load tested offline
+
+    $ python wishlist_server.py --items 100000 --latency 0.05 --captcha 0.01
+    $ WISHLIST_HOST=http://127.0.0.1:8000 wishlist dump NAME --rate 5
+
+or in code:
+
+    with FakeAmazonServer(items=1000).running() as server:
+        for item in Wishlist("NAME", host=server.host):
+            pass
+
+every wishlist name is the same list of unique items, the pages follow the
+showMoreUrl/lastEvaluatedKey pagination of the real pages and, like the real
+lists, the last page can point back to the first page (circular)
+"""
+from __future__ import unicode_literals, division, print_function, absolute_import
+import argparse
+import codecs
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from wishlist.compat import *
+from wishlist.core import Wishlist
+from wishlist.stream import ItemStream
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+
+TESTDATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata")
+
+
+def get_templates(paths=None):
+    """Return the item markups that synthetic items are copied from
+
+    only the items whose uuid, title and price parse are used, each template is a
+    (markup, asin, item_id) tuple, the asin and item id are replaced to make every
+    copy a different item
+
+    :param paths: list, full wishlist pages, defaults to the ones in testdata/
+    :returns: list
+    """
+    if not paths:
+        paths = [
+            os.path.join(TESTDATA_DIR, "html-2018-06.html"),
+            os.path.join(TESTDATA_DIR, "zero-price-2.html"),
+            os.path.join(TESTDATA_DIR, "wishlist-1.html"),
+        ]
+
+    w = Wishlist("TEMPLATES")
+    templates = []
+    for path in paths:
+        with codecs.open(path, encoding="utf-8") as f:
+            stream = ItemStream()
+            markups = stream.feed(f.read()) + stream.close()
+
+        for markup in markups:
+            item = w.get_stream_item(markup, "", 1)
+            try:
+                item.jsonable(["uuid", "title", "price"])
+
+            except Exception:
+                continue
+
+            item_id = re.search(r"id=\"item_([^\"]+)\"", markup).group(1)
+            if item.uuid and item.uuid != item_id:
+                templates.append((markup, item.uuid, item_id))
+
+    return templates
+
+
+class SyntheticWishlist(object):
+    """Builds the pages of a wishlist with any number of unique items"""
+    def __init__(self, items=1000, per_page=25, circular=False, templates=None):
+        """
+        :param items: int, how many items the list has
+        :param per_page: int, how many items are on each page
+        :param circular: bool, True if the last page points back to the first page
+            instead of being the last page
+        :param templates: list, see get_templates()
+        """
+        self.items = items
+        self.per_page = per_page
+        self.circular = circular
+        self.templates = templates or get_templates()
+
+    def get_key(self, page):
+        """Return the lastEvaluatedKey of page, the key is what the next page is
+        requested with"""
+        return "synthetic-{:08d}".format(page)
+
+    def get_page_count(self):
+        return max(1, (self.items + self.per_page - 1) // self.per_page)
+
+    def get_page_number(self, key):
+        """Return the page that the key of the page before it fetches, the first
+        page is 1, 0 if key isn't a key"""
+        m = re.match(r"^synthetic-(\d+)$", key or "")
+        return int(m.group(1)) + 1 if m else 0
+
+    def get_item(self, n):
+        """Return the markup of the nth item (starting at 0)"""
+        markup, asin, item_id = self.templates[n % len(self.templates)]
+        return markup.replace(asin, "B{:09d}".format(n)).replace(
+            item_id,
+            "I{:013d}".format(n)
+        )
+
+    def get_page(self, name, page):
+        """Return the html of page (starting at 1)"""
+        start = (page - 1) * self.per_page
+        stop = min(self.items, start + self.per_page)
+        html = [
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+            "<title>Amazon.com: {}</title></head><body>".format(name),
+            "<div id=\"wishlist-page\"><ul id=\"g-items\">",
+        ]
+
+        for n in range(start, stop):
+            html.append(self.get_item(n))
+
+        html.append("</ul>")
+
+        next_key = ""
+        if page < self.get_page_count():
+            next_key = self.get_key(page)
+
+        elif self.circular:
+            # the real lists will go back to the start, the first page's key has
+            # already been seen so the crawler should stop
+            next_key = self.get_key(1)
+
+        if next_key:
+            html.append(
+                "<form method=\"post\" action=\"\" class=\"scroll-state a-spacing-none\">"
+                "<input type=\"hidden\" name=\"showMoreUrl\" value=\"/hz/wishlist/ls/{name}"
+                "?filter=DEFAULT&amp;lek={key}&amp;sort=default&amp;type=wishlist\" class=\"showMoreUrl\">"
+                "<input type=\"hidden\" name=\"lastEvaluatedKey\" value=\"{key}\" class=\"lastEvaluatedKey\">"
+                "</form>".format(name=name, key=next_key)
+            )
+
+        html.append("</div></body></html>")
+        return "".join(html)
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    """An HTTP server on localhost that a Wishlist can crawl, pass its .host to the
+    Wishlist (eg, Wishlist(name, host=server.host))"""
+    daemon_threads = True
+
+    @property
+    def host(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    @contextmanager
+    def running(self):
+        """serve in a background thread until the with block is done"""
+        t = threading.Thread(target=self.serve_forever)
+        t.daemon = True
+        t.start()
+        try:
+            yield self
+
+        finally:
+            self.shutdown()
+            self.server_close()
+
+
+class FakeAmazonServer(LocalServer):
+    """Serves SyntheticWishlist pages, with optional latency and robot checks"""
+    def __init__(self, items=1000, per_page=25, circular=False, latency=0.0, captcha=0.0, seed=None, port=0):
+        """
+        :param items: int, see SyntheticWishlist
+        :param per_page: int, see SyntheticWishlist
+        :param circular: bool, see SyntheticWishlist
+        :param latency: float, seconds every response is delayed
+        :param captcha: float, the chance (0.0 - 1.0) of a request getting the robot
+            check page instead of the wishlist page
+        :param seed: int, seeds the captcha chance so a run can be repeated
+        :param port: int, 0 picks a free port
+        """
+        self.wishlist = SyntheticWishlist(items, per_page, circular)
+        self.latency = latency
+        self.captcha = captcha
+        self.random = random.Random(seed)
+        self.requests = []
+        self.captchas = 0
+        self._lock = threading.Lock()
+
+        with codecs.open(os.path.join(TESTDATA_DIR, "robot-check.html"), encoding="utf-8") as f:
+            self.robot_check = f.read()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.server.handle_page(self)
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+        HTTPServer.__init__(self, ("127.0.0.1", port), Handler)
+
+    def get_body(self, path):
+        """Return the (status, html) of the requested path"""
+        parts = urlparse.urlparse(path)
+        m = re.match(r"^/(?:gp/registry/wishlist|hz/wishlist/ls)/([^/?]+)", parts.path)
+        if not m:
+            return 404, "Not Found"
+
+        with self._lock:
+            captcha = self.captcha and self.random.random() < self.captcha
+            if captcha:
+                self.captchas += 1
+        if captcha:
+            return 200, self.robot_check
+
+        page = 1
+        keys = urlparse.parse_qs(parts.query).get("lek")
+        if keys:
+            page = self.wishlist.get_page_number(keys[0])
+            if not page or page > self.wishlist.get_page_count():
+                return 404, "Not Found"
+
+        return 200, self.wishlist.get_page(m.group(1), page)
+
+    def handle_page(self, handler):
+        with self._lock:
+            self.requests.append(handler.path)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        status, body = self.get_body(handler.path)
+        body = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def console():
+    parser = argparse.ArgumentParser(description="Serve synthetic wishlists like Amazon would")
+    parser.add_argument("--port", type=int, default=8000, help="the port to listen on (default: 8000)")
+    parser.add_argument("--items", type=int, default=1000, help="how many items every list has (default: 1000)")
+    parser.add_argument("--per-page", type=int, default=25, help="how many items are on each page (default: 25)")
+    parser.add_argument("--circular", action="store_true", help="the last page points back to the first page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed")
+    parser.add_argument(
+        "--captcha",
+        type=float,
+        default=0.0,
+        help="the chance (0.0 - 1.0) of a request getting the robot check page"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seeds the captcha chance")
+    args = parser.parse_args()
+
+    server = FakeAmazonServer(
+        items=args.items,
+        per_page=args.per_page,
+        circular=args.circular,
+        latency=args.latency,
+        captcha=args.captcha,
+        seed=args.seed,
+        port=args.port,
+    )
+    print("Serving {} items per list on {}".format(args.items, server.host))
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(console())
@@ -5,12 +5,26 @@ import os
 from contextlib import contextmanager
 import codecs
 import datetime
+import json
+import subprocess
+import sys
+import time
+import re
+import threading
 
 import testdata
 from bs4 import BeautifulSoup
 
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+from wishlist import environ
+from wishlist.compat import StringIO
 from wishlist.core import WishlistElement, Wishlist
 from wishlist.exception import ParseError
+from wishlist_server import LocalServer
 from brow.utils import Soup
 
 
@@ -27,6 +41,40 @@ class BaseTestCase(TestCase):
         return soup
 
 
+class FixtureServer(LocalServer):
+    """Serves testdata pages on localhost so a Wishlist can crawl them
+
+    :param routes: dict, the keys are substrings of the requested path and the
+        values are the testdata filenames that will be returned
+    """
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        self.headers = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.server.requests.append(self.path)
+                self.server.headers.append(dict((k.lower(), v) for k, v in self.headers.items()))
+                for path, filename in self.server.routes.items():
+                    if path in self.path:
+                        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", filename)
+                        with open(path, "rb") as f:
+                            body = f.read()
+                        self.send_response(200)
+                        self.send_header("Content-Type", "text/html; charset=utf-8")
+                        self.send_header("Content-Length", str(len(body)))
+                        self.end_headers()
+                        self.wfile.write(body)
+                        return
+                self.send_error(404)
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+        HTTPServer.__init__(self, ("127.0.0.1", 0), Handler)
+
+
 class WishlistElementTest(BaseTestCase):
 
     def get_item(self, filename):
@@ -86,6 +134,28 @@ class WishlistElementTest(BaseTestCase):
         items = list(w.get_items(soup, w.get_wishlist_url()))
         self.assertEqual(10, len(items))
 
+    def test_soupify_page(self):
+        body = self.get_body("zero-price-2.html")
+        full_items = self.get_items("zero-price-2.html")
+        for parser in ["lxml", "html.parser"]:
+            w = Wishlist("WISHLIST_NAME", parser=parser)
+            soup = w.soupify_page(body)
+            self.assertIsNone(soup.find("script"))
+            self.assertIsNone(soup.find("title"))
+            self.assertIsNotNone(soup.select_one("input.showMoreUrl"))
+            self.assertIsNotNone(soup.select_one("input.lastEvaluatedKey"))
+
+            items = list(w.get_items(soup, w.get_wishlist_url()))
+            self.assertEqual(len(full_items), len(items))
+            # this page is older than the current quantity markup
+            fields = [f for f in WishlistElement.json_fields if f != "quantity"]
+            for item, full_item in zip(items, full_items):
+                self.assertEqual(full_item.jsonable(fields), item.jsonable(fields))
+
+        w = Wishlist("WISHLIST_NAME", strain=False)
+        soup = w.soupify_page(body)
+        self.assertIsNotNone(soup.find("script"))
+
     def test_permalinks(self):
         we = self.get_item("permalinks.html")
         we._page_url = "{}/hz/wishlist/ls/XXX?filter=DEFAULT&lek=xxxxx-xxxx&sort=default&type=wishlist".format(
@@ -213,3 +283,1425 @@ class WishlistElementTest(BaseTestCase):
         we = self.get_item("discount-DE.html")
 
         self.assertEqual(3, we.discount)
+        self.assertEqual(6.9, we.price)
+        self.assertEqual(datetime.date(2020, 7, 16), we.added)
+
+        from wishlist.region import get_region
+        we = WishlistElement(self.get_body("discount-DE.html"), region=get_region("de"))
+        self.assertEqual("de_DE", we.locale)
+        self.assertEqual(6.9, we.price)
+        self.assertEqual(datetime.date(2020, 7, 16), we.added)
+
+    def test_index(self):
+        we = self.get_item("permalinks.html")
+        index = we.index
+        self.assertTrue(index is we.index)
+
+        el = we.soup.find("a", id=re.compile("^itemName_"))
+        self.assertTrue(el is we.find_anchor("itemName_", "a"))
+
+        el = we.soup.find("div", class_=re.compile("^itemPriceDrop"))
+        self.assertTrue(el is we.find_anchor("itemPriceDrop", "div"))
+
+        self.assertEqual(len(we.soup.find_all("img")), len(index.get("img", [])))
+        self.assertIsNone(we.find_anchor("itemName_", "div"))
+
+    def test_cache(self):
+        we = self.get_item("failed_wishlist_element_10.html")
+        self.assertFalse(hasattr(we, "__dict__"))
+
+        added = we.added
+        self.assertTrue(added is we.added)
+        self.assertTrue(we.is_digital())
+        self.assertTrue("is_digital" in we._cache)
+
+        we.invalidate("added")
+        self.assertFalse("added" in we._cache)
+        self.assertTrue("is_digital" in we._cache)
+        self.assertEqual(added, we.added)
+
+        index = we.index
+        we.invalidate_fields()
+        self.assertEqual(["index"], list(we._cache))
+        self.assertTrue(index is we.index)
+
+        we.invalidate()
+        self.assertEqual({}, we._cache)
+
+    def test_jsonable_fields(self):
+        we = self.get_item("failed_wishlist_element_10.html")
+        d = we.jsonable(["title", "price", "uuid"])
+        self.assertEqual(set(["title", "price", "uuid"]), set(d.keys()))
+        self.assertEqual(9.99, d["price"])
+        self.assertFalse("added" in we._cache)
+        self.assertFalse("image" in we._cache)
+
+        d = we.jsonable(["added", "digital"])
+        self.assertEqual("June 15, 2020", d["added"])
+        self.assertTrue(d["digital"])
+
+        d = we.jsonable()
+        self.assertEqual(set(we.json_fields), set(d.keys()))
+
+        with self.assertRaises(ValueError):
+            we.jsonable(["foo"])
+
+
+class WishlistTest(BaseTestCase):
+    def get_wishlist(self, filenames, **kwargs):
+        """Returns a Wishlist that loads page N from filenames[N - 1] instead of
+        fetching it"""
+        test = self
+        class FixtureWishlist(Wishlist):
+            def load_page(self, b, url, page):
+                self.loaded.append(url)
+                filename = filenames[page - 1]
+                if isinstance(filename, Exception):
+                    raise filename
+                return self.soupify_page(test.get_body(filename))
+
+        w = FixtureWishlist("WISHLIST_NAME", **kwargs)
+        w.loaded = []
+        return w
+
+    def test_iter_pages(self):
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        w = self.get_wishlist(filenames)
+        pages = list(w.iter_pages())
+        self.assertEqual([1, 2, 3], [p[2] for p in pages])
+        self.assertEqual(3, len(w.loaded))
+        self.assertTrue("lek=8cf07a89" in pages[1][1])
+
+        # the lists are circular so it should stop when it sees a page again
+        filenames = ["html-2018-06.html", "zero-price-2.html", "html-2018-06.html"]
+        w = self.get_wishlist(filenames + ["wishlist-1.html"])
+        pages = list(w.iter_pages())
+        self.assertEqual(3, len(pages))
+
+    def test_sync(self):
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        fields = ["title", "price"]
+        w = self.get_wishlist(filenames)
+        items = [item.jsonable(fields + ["uuid"]) for item in w]
+
+        # the first 5 items were added after the previous crawl, and the previous
+        # crawl had an item that has since been removed
+        snapshot = [dict(d) for d in items[5:]]
+        snapshot[1]["price"] = 1234.0
+        snapshot.insert(3, {"uuid": "REMOVED", "title": "foo", "price": 1.0})
+
+        w = self.get_wishlist(filenames)
+        delta = w.sync(snapshot, fields=fields)
+        self.assertEqual(1, delta.pages)
+        self.assertEqual(1, len(w.loaded))
+        self.assertFalse(delta.complete)
+        self.assertEqual(items[:5], delta.added)
+        self.assertEqual([(snapshot[1], items[6])], delta.changed)
+        self.assertEqual(["REMOVED"], [d["uuid"] for d in delta.removed])
+        self.assertEqual(items[0]["uuid"], delta.watermark)
+
+        w = self.get_wishlist(filenames)
+        delta = w.sync(watermark=items[12]["uuid"], fields=fields)
+        self.assertEqual(2, delta.pages)
+        self.assertEqual(items[:12], delta.added)
+
+        w = self.get_wishlist(filenames)
+        delta = w.sync(fields=fields)
+        self.assertTrue(delta.complete)
+        self.assertEqual(3, delta.pages)
+        self.assertEqual(items, delta.added)
+
+    def test_sync_parse_failed(self):
+        """quantity doesn't parse on these pages, the default fields include it so
+        those items should still sync with a None quantity"""
+        from wishlist.events import Events
+
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        failed = []
+        events = Events()
+        events.on("parse_failed", lambda error, **kwargs: failed.append(error))
+        w = self.get_wishlist(filenames)
+        delta = w.sync(events=events)
+        self.assertTrue(delta.complete)
+        self.assertEqual(33, len(delta.added))
+        self.assertLess(0, len(failed))
+        self.assertTrue(all(isinstance(e, ParseError) for e in failed))
+        missing = [d for d in delta.added if d["quantity"] == {"wanted": None, "has": None}]
+        self.assertEqual(len(failed), len(missing))
+
+        # the same failures on the next sync aren't seen as changes
+        w = self.get_wishlist(filenames)
+        delta = w.sync(delta.items)
+        self.assertFalse(delta)
+
+    def test_prefetch(self):
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        w = self.get_wishlist(filenames)
+        items = [(it.page, it.title) for it in w]
+
+        for prefetch in [1, 3]:
+            w = self.get_wishlist(filenames, prefetch=prefetch)
+            self.assertEqual(items, [(it.page, it.title) for it in w])
+
+    def test_prefetch_error(self):
+        filenames = ["html-2018-06.html", ValueError("page 2")]
+        w = self.get_wishlist(filenames, prefetch=2)
+        it = iter(w)
+        self.assertEqual(1, next(it).page)
+        with self.assertRaises(ValueError):
+            list(it)
+
+    def test_prefetch_close(self):
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        w = self.get_wishlist(filenames, prefetch=1)
+        it = iter(w)
+        next(it)
+        it.close()
+        names = [t.name for t in threading.enumerate()]
+        self.assertFalse("wishlist-prefetch" in names)
+
+    def test_detach(self):
+        import pickle
+        from wishlist.core import WishlistRecord
+
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        fields = ["uuid", "title", "price", "added", "digital", "page_url"]
+        w = self.get_wishlist(filenames)
+        items = [item.jsonable(fields) for item in w]
+
+        soups = []
+        w = self.get_wishlist(filenames, detach=fields)
+        get_items = w.get_items
+        def record_soup(soup, *args):
+            soups.append(soup)
+            return get_items(soup, *args)
+        w.get_items = record_soup
+
+        records = list(w)
+        self.assertTrue(all(isinstance(r, WishlistRecord) for r in records))
+        self.assertEqual(items, [r.jsonable() for r in records])
+        self.assertEqual([1] * 10 + [2] * 23, [r.page for r in records])
+        self.assertIsNone(records[0].comment)
+
+        # the pages were freed once their items were extracted
+        self.assertEqual(3, len(soups))
+        self.assertEqual([], [s for s in soups if s.find_all(True)])
+
+        with self.assertRaises(AttributeError):
+            records[0].price = 1.0
+        self.assertFalse(hasattr(records[0], "__dict__"))
+
+        r = pickle.loads(pickle.dumps(records[0]))
+        self.assertEqual(records[0], r)
+        self.assertEqual(records[0].jsonable(), r.jsonable())
+
+    def test_detach_parse_error(self):
+        w = Wishlist("WISHLIST_NAME")
+        item = next(w.get_items(self.get_soup("html-2018-06.html"), w.get_wishlist_url()))
+        r = item.detach(["uuid", "quantity"])
+        self.assertIsNone(r.quantity)
+        self.assertEqual({"wanted": None, "has": None}, r.jsonable()["quantity"])
+        self.assertEqual(item.uuid, r.uuid)
+
+    def test_stream(self):
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        fields = ["uuid", "title", "price", "page_url"]
+        w = self.get_wishlist(filenames)
+        items = [(item.page, item.jsonable(fields)) for item in w]
+
+        test = self
+        chunks = []
+        class StreamWishlist(Wishlist):
+            def session(self):
+                return contextmanager(lambda: (yield None))()
+
+            def load_page_chunks(self, b, url, page):
+                body = test.get_body(filenames[page - 1]).decode("utf-8")
+                for i in range(0, len(body), 1000):
+                    chunks.append(page)
+                    yield body[i:i + 1000]
+
+        w = StreamWishlist("WISHLIST_NAME", stream=True)
+        it = iter(w)
+        item = next(it)
+        # the first item is ready long before the first page is downloaded
+        self.assertLess(len(chunks), len(test.get_body(filenames[0])) // 1000)
+        self.assertEqual(items, [(item.page, item.jsonable(fields))] + [(item.page, item.jsonable(fields)) for item in it])
+
+    def test_profile(self):
+        from wishlist.profile import Profiler
+        from wishlist import profile
+
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        fields = ["uuid", "title", "added", "image"]
+        with Profiler(memory=True) as p:
+            self.assertIs(p, profile.current)
+            items = [item.jsonable(fields) for item in self.get_wishlist(filenames)]
+        self.assertIsNone(profile.current)
+
+        self.assertEqual(3, p.stats["soupify"].count)
+        self.assertLess(0, p.stats["soupify"].peak)
+        self.assertEqual(3, p.stats["get_items"].count)
+        self.assertEqual(33, p.stats["jsonable"].count)
+        self.assertEqual(33, p.stats["field.added"].count)
+        self.assertLess(0.0, p.stats["field.image"].total)
+        self.assertTrue("field.added" in p.report())
+
+        # nothing is recorded when there isn't an active profiler
+        items = [item.jsonable(fields) for item in self.get_wishlist(filenames)]
+        self.assertEqual(33, p.stats["jsonable"].count)
+
+    def test_export_jsonl(self):
+        import json
+        from wishlist.export import export
+
+        class FP(list):
+            flushes = []
+            write = list.append
+            def flush(self):
+                self.flushes.append(len(self))
+
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        fields = ["uuid", "title", "price", "page_url"]
+        w = self.get_wishlist(filenames)
+        fp = FP()
+        self.assertEqual(33, export(w, fp, fields=fields))
+        self.assertEqual(33, len(fp))
+        # one flush per page of items, the last page doesn't have any items
+        self.assertEqual([10, 33], fp.flushes)
+
+        item_json = json.loads(fp[0])
+        self.assertEqual(set(fields), set(item_json.keys()))
+
+        # the wishlist's own options are used, not bypassed
+        from wishlist.core import WishlistRecord
+        from wishlist.events import Events
+        events = Events()
+        parsed = []
+        events.on("item_parsed", lambda item, **kwargs: parsed.append(item))
+        w = self.get_wishlist(filenames, detach=["uuid", "title"])
+        fp = FP()
+        self.assertEqual(33, export(w.crawl(events=events), fp, fields=["uuid", "title"], events=events))
+        self.assertEqual(33, len(parsed))
+        self.assertTrue(all(isinstance(item, WishlistRecord) for item in parsed))
+
+        with self.assertRaises(ValueError):
+            export(w, fp, format="xml")
+
+    def test_export_flush(self):
+        """a page is flushed before the next page is fetched, not after"""
+        from wishlist.events import Events
+        from wishlist.export import export
+
+        log = []
+        class FP(list):
+            write = list.append
+            def flush(self):
+                log.append(("flush", len(self)))
+
+        events = Events()
+        events.on("page_fetched", lambda page, **kwargs: log.append(("fetched", page)))
+        with FixtureServer(FetchTest.routes).running() as server:
+            for kwargs in [{}, {"stream": True}]:
+                del log[:]
+                w = Wishlist("WISHLIST_NAME", host=server.host, **kwargs)
+                items = w.crawl(events=events)
+                self.assertEqual(33, export(items, FP(), fields=["uuid", "title"], events=events))
+                self.assertEqual(
+                    [("fetched", 1), ("flush", 10), ("fetched", 2), ("flush", 33), ("fetched", 3)],
+                    log
+                )
+
+            # a Wishlist is crawled with its own hooks
+            del log[:]
+            self.assertEqual(33, export(Wishlist("WISHLIST_NAME", host=server.host), FP(), fields=["uuid", "title"]))
+            self.assertEqual([("flush", 10), ("flush", 33)], log)
+
+    def test_export_csv(self):
+        import csv
+        from wishlist.export import export, iter_csv
+
+        filenames = ["html-2018-06.html", "zero-price-2.html", "wishlist-pagination-last.html"]
+        w = self.get_wishlist(filenames)
+        path = os.path.join(testdata.create_dir(), "wishlist.csv")
+        with open(path, "w") as fp:
+            self.assertEqual(33, export(w, fp, format="csv", fields=["uuid", "title", "price"]))
+
+        with open(path) as fp:
+            rows = list(csv.reader(fp))
+        self.assertEqual(["uuid", "title", "price"], rows[0])
+        self.assertEqual(34, len(rows))
+
+        # quantity is split into 2 columns and failed items are skipped
+        errors = []
+        w = self.get_wishlist(filenames)
+        lines = list(iter_csv(w, ["uuid", "quantity"], on_error=lambda item, e: errors.append(e)))
+        self.assertEqual("uuid,wanted,has\n", lines[0])
+        self.assertEqual(33, len(lines) + len(errors) - 1)
+
+
+class FetchTest(BaseTestCase):
+    routes = {
+        "lek=8cf07a89": "zero-price-2.html",
+        "lek=76d461d5": "wishlist-pagination-last.html",
+        "/wishlist/WISHLIST_NAME": "html-2018-06.html",
+    }
+
+    def test_import_budget(self):
+        """importing wishlist shouldn't import the browser stacks, they are only
+        needed to sign in"""
+        budget = float(os.environ.get("WISHLIST_IMPORT_BUDGET", 1.0))
+        code = "; ".join([
+            "import sys, time",
+            "start = time.time()",
+            "import wishlist, wishlist.core, wishlist.crawl",
+            "print(time.time() - start)",
+            "print(','.join(m for m in sys.modules if m.startswith(('selenium', 'brow.interface', 'requests'))))",
+        ])
+        output = subprocess.check_output(
+            [sys.executable, "-W", "ignore", "-c", code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).decode("utf-8").splitlines()
+
+        self.assertEqual("", output[1] if len(output) > 1 else "")
+        self.assertLess(float(output[0]), budget)
+
+    def test_http_fetcher(self):
+        from wishlist.fetch import HTTPFetcher
+        from brow import environ as brow_environ
+        from brow.core import Cookies
+
+        cache_dir = brow_environ.CACHE_DIR
+        brow_environ.CACHE_DIR = testdata.create_dir()
+        try:
+            cookies = Cookies("127.0.0.1")
+            cookies.append({"name": "session-id", "value": "1234", "domain": "127.0.0.1", "path": "/"})
+            cookies.dump()
+
+            with FixtureServer(self.routes).running() as server:
+                with HTTPFetcher.session() as f:
+                    url = "{}/gp/registry/wishlist/WISHLIST_NAME".format(server.host)
+                    f.load(url)
+                    self.assertTrue("showMoreUrl" in f.body)
+                    self.assertEqual(url, f.url)
+
+                    paths = f.dump(basename="WISHLIST_NAME-1")
+                    self.assertTrue(os.path.isfile(paths[0]))
+
+            self.assertTrue("session-id=1234" in server.headers[0]["cookie"])
+            self.assertTrue("gzip" in server.headers[0]["accept-encoding"])
+
+        finally:
+            brow_environ.CACHE_DIR = cache_dir
+
+    def test_stream(self):
+        with FixtureServer(self.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            items = [(item.page, item.uuid) for item in w]
+            w = Wishlist("WISHLIST_NAME", host=server.host, stream=True, detach=["uuid"])
+            self.assertEqual(items, [(item.page, item.uuid) for item in w])
+        self.assertEqual(33, len(items))
+
+
+class ItemStreamTest(BaseTestCase):
+    def test_feed(self):
+        from wishlist.stream import ItemStream
+
+        html = "".join([
+            '<html><body><!--[if !IE]><!--><p>not ie</p><![endif]--><div id="nav"><div>nav</div></div>',
+            '<div id="item_1" class="a"><div><img src="foo.jpg"><br/><p>one &amp; <b>1</b></div>',
+            '<input type="hidden" name="x" value="y"><!-- comment --></div>',
+            '<div id="item_2"><span>two &#8211; 2</span></div>',
+            '<input class="showMoreUrl" type="hidden" value="/next?lek=1">',
+            '<input class="lastEvaluatedKey" type="hidden" value="KEY"/>',
+            '</body></html>',
+        ])
+
+        items = []
+        stream = ItemStream()
+        for i in range(0, len(html), 7):
+            items.extend(stream.feed(html[i:i + 7]))
+        items.extend(stream.close())
+
+        self.assertEqual(2, len(items))
+        self.assertTrue(items[0].startswith('<div id="item_1" class="a">'))
+        self.assertTrue(items[0].endswith('<!-- comment --></div>'))
+        self.assertTrue("one &amp; <b>1</b>" in items[0])
+        self.assertEqual('<div id="item_2"><span>two &#8211; 2</span></div>', items[1])
+        self.assertEqual({"showMoreUrl": "/next?lek=1", "lastEvaluatedKey": "KEY"}, stream.pagination)
+
+        # a conditional comment shouldn't stop items from being found until close
+        stream = ItemStream()
+        self.assertEqual(2, len(stream.feed(html)))
+
+
+class EventsTest(BaseTestCase):
+    routes = FetchTest.routes
+
+    def test_stats(self):
+        from wishlist.events import Events, Stats
+
+        events = Events()
+        stats = Stats(events)
+        urls = []
+        events.on("page_fetched", lambda **kw: urls.append(kw["url"]))
+        with FixtureServer(self.routes).running() as server:
+            items = list(Wishlist("WISHLIST_NAME", host=server.host).crawl(events=events))
+
+        self.assertEqual(3, len(urls))
+        d = stats.jsonable()
+        self.assertEqual(3, d["pages"])
+        self.assertEqual(33, d["items"])
+        self.assertLess(1000, d["bytes"])
+        self.assertEqual({"last_page": 1}, d["crawls"])
+
+        text = stats.prometheus()
+        self.assertTrue("wishlist_pages_fetched_total 3\n" in text)
+        self.assertTrue('wishlist_fetch_seconds_bucket{le="+Inf"} 3\n' in text)
+        self.assertTrue('wishlist_crawls_total{reason="last_page"} 1\n' in text)
+
+        path = os.path.join(testdata.create_dir(), "stats.json")
+        stats.write(path)
+        with open(path) as fp:
+            self.assertEqual(d, json.load(fp))
+
+    def test_robot_check(self):
+        from wishlist.events import Events, Stats
+        from wishlist.exception import RobotError
+
+        events = Events()
+        stats = Stats(events)
+        finished = []
+        events.on("crawl_finished", lambda **kw: finished.append(kw))
+        routes = {"/wishlist/WISHLIST_NAME": "robot-check.html"}
+        with FixtureServer(routes).running() as server:
+            with self.assertRaises(RobotError):
+                list(Wishlist("WISHLIST_NAME", host=server.host).crawl(events=events))
+
+        self.assertEqual(1, stats.robot_checks)
+        self.assertEqual("robot_check", finished[0]["reason"])
+        self.assertEqual(0, finished[0]["items"])
+
+    def test_closed(self):
+        from wishlist.events import Events
+
+        events = Events()
+        finished = []
+        events.on("crawl_finished", lambda **kw: finished.append(kw))
+        events.on("item_parsed", lambda **kw: 1 / 0)
+        with FixtureServer(self.routes).running() as server:
+            it = Wishlist("WISHLIST_NAME", host=server.host).crawl(events=events)
+            next(it)
+            it.close()
+
+        self.assertEqual("closed", finished[0]["reason"])
+        self.assertEqual(1, finished[0]["pages"])
+
+        with self.assertRaises(ValueError):
+            events.on("foo", lambda **kw: None)
+
+    def test_parse_failed(self):
+        from wishlist.events import Events, Stats
+        from wishlist.export import export
+
+        events = Events()
+        stats = Stats(events)
+        failed = []
+        events.on("parse_failed", lambda page, item, **kw: failed.append((page, item)))
+        with FixtureServer(self.routes).running() as server:
+            # quantity doesn't parse on these pages, catching it is what counts it
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            items = w.crawl(events=events)
+            count = export(items, StringIO(), fields=["quantity"], on_error=w.item_failed, events=events)
+
+            class FailingWishlist(Wishlist):
+                def load_page(self, b, url, page):
+                    if page == 2:
+                        raise ParseError(msg="page 2")
+                    return super(FailingWishlist, self).load_page(b, url, page)
+
+            with self.assertRaises(ParseError):
+                list(FailingWishlist("WISHLIST_NAME", host=server.host).crawl(events=events))
+
+        self.assertEqual(33, count + stats.parse_failures - 1)
+        self.assertLess(1, stats.parse_failures)
+        # the page that failed, not how many pages were fetched
+        self.assertEqual((2, None), failed[-1])
+        self.assertEqual({"last_page": 1, "parse_failed": 1}, stats.crawls)
+
+
+class ThrottleTest(BaseTestCase):
+    def get_throttle(self, **kwargs):
+        from wishlist.throttle import Throttle, Backoff
+
+        clock = [0.0]
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        throttle = Throttle(backoff=Backoff(retries=kwargs.pop("retries", 2)), **kwargs)
+        throttle.sleep = sleep
+        throttle.bucket_class = type(
+            "FakeClockBucket",
+            (throttle.bucket_class,),
+            {"clock": staticmethod(lambda: clock[0]), "sleep": staticmethod(sleep)}
+        )
+        return throttle, sleeps
+
+    def test_bucket(self):
+        throttle, sleeps = self.get_throttle(rate=2.0, burst=1.0)
+        bucket = throttle.get_bucket("http://example.com/foo")
+        self.assertTrue(bucket is throttle.get_bucket("http://example.com/bar"))
+        self.assertFalse(bucket is throttle.get_bucket("http://example.de/foo"))
+
+        self.assertEqual(0.0, bucket.acquire())
+        self.assertEqual(0.5, bucket.acquire())
+        self.assertEqual([0.5], sleeps)
+
+        bucket.success()
+        self.assertAlmostEqual(2.1, bucket.rate)
+        bucket.failure()
+        self.assertAlmostEqual(1.05, bucket.rate)
+        for _ in range(20):
+            bucket.failure()
+        self.assertEqual(bucket.min_rate, bucket.rate)
+
+    def test_call(self):
+        from wishlist.exception import RobotError, FetchError
+
+        throttle, sleeps = self.get_throttle(rate=1.0, retries=2)
+        url = "http://example.com/foo"
+
+        calls = []
+        def callback():
+            calls.append(1)
+            if len(calls) < 3:
+                raise RobotError("Amazon robot check")
+            return "body"
+
+        self.assertEqual("body", throttle.call(url, callback))
+        self.assertEqual(3, len(calls))
+        self.assertGreater(1.0, throttle.get_bucket(url).rate)
+
+        calls = []
+        def callback():
+            calls.append(1)
+            raise FetchError("Service Unavailable", status=503)
+        with self.assertRaises(FetchError):
+            throttle.call(url, callback)
+        self.assertEqual(3, len(calls))
+
+        calls = []
+        def callback():
+            calls.append(1)
+            raise FetchError("Not Found", status=404)
+        with self.assertRaises(FetchError):
+            throttle.call(url, callback)
+        self.assertEqual(1, len(calls))
+
+    def test_wishlist(self):
+        from wishlist.cache import PageCache
+        from wishlist.exception import RobotError
+
+        throttle, sleeps = self.get_throttle(rate=100.0, retries=1)
+        cache = PageCache(testdata.create_dir())
+        routes = {"/wishlist/WISHLIST_NAME": "robot-check.html"}
+        with FixtureServer(routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, cache=cache)
+            with self.assertRaises(RobotError):
+                list(w.crawl(throttle=throttle))
+
+        # the robot check was retried and never made it into the cache
+        self.assertEqual(2, len(server.headers))
+        self.assertEqual([], cache.get_entries())
+
+        with FixtureServer(FetchTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, stream=True)
+            self.assertEqual(33, len(list(w.crawl(throttle=throttle))))
+
+    def test_retry_events(self):
+        """a robot check that is retried (and then succeeds) is still counted"""
+        from wishlist.fetch import HTTPFetcher
+        from wishlist.events import Events, Stats
+        from wishlist.exception import RobotError
+
+        class FlakyFetcher(HTTPFetcher):
+            robot_checks = [2]
+            def load(self, url):
+                if self.robot_checks[0]:
+                    self.robot_checks[0] -= 1
+                    raise RobotError("Amazon robot check")
+                return super(FlakyFetcher, self).load(url)
+
+        throttle, sleeps = self.get_throttle(rate=100.0, retries=2)
+        events = Events()
+        stats = Stats(events)
+        checks = []
+        events.on("robot_check", lambda page, **kwargs: checks.append(page))
+        with FixtureServer(FetchTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, fetcher_class=FlakyFetcher)
+            self.assertEqual(33, len(list(w.crawl(events=events, throttle=throttle))))
+
+        self.assertEqual([1, 1], checks)
+        self.assertEqual(2, stats.robot_checks)
+
+
+class CheckpointTest(BaseTestCase):
+    def test_resume(self):
+        from wishlist.checkpoint import Checkpoint
+
+        directory = testdata.create_dir()
+        with FixtureServer(FetchTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            items = [item.uuid for item in w]
+
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            it = w.crawl(checkpoint=Checkpoint("WISHLIST_NAME", directory))
+            first = [next(it).uuid for _ in range(15)]
+            it.close()
+
+            checkpoint = Checkpoint("WISHLIST_NAME", directory)
+            self.assertTrue(checkpoint.load())
+            self.assertEqual(2, checkpoint.page)
+            self.assertEqual(first, checkpoint.uuids)
+
+            requests = len(server.headers)
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            rest = [item.uuid for item in w.resume(checkpoint=Checkpoint("WISHLIST_NAME", directory))]
+            self.assertEqual(items, first + rest)
+            # the first page wasn't fetched again
+            self.assertEqual(2, len(server.headers) - requests)
+            self.assertFalse(os.path.isfile(checkpoint.path))
+
+            # nothing to resume so it starts over
+            self.assertEqual(items, [item.uuid for item in w.resume(checkpoint=Checkpoint("WISHLIST_NAME", directory))])
+
+    def test_resume_stream(self):
+        from wishlist.checkpoint import Checkpoint
+
+        directory = testdata.create_dir()
+        with FixtureServer(FetchTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, stream=True, detach=["title"])
+            it = w.crawl(checkpoint=Checkpoint("WISHLIST_NAME", directory))
+            first = [next(it).uuid for _ in range(5)]
+            it.close()
+
+            rest = [item.uuid for item in w.resume(checkpoint=Checkpoint("WISHLIST_NAME", directory))]
+            self.assertEqual(33, len(set(first + rest)))
+            self.assertEqual(33, len(first + rest))
+
+    def test_resume_killed(self):
+        """a crawl that is killed in the middle of a page (so nothing gets to save
+        the checkpoint) shouldn't yield that page's items again"""
+        from wishlist.checkpoint import Checkpoint
+
+        directory = testdata.create_dir()
+        code = "; ".join([
+            "import sys, time",
+            "from wishlist.core import Wishlist",
+            "from wishlist.checkpoint import Checkpoint",
+            "it = Wishlist('WISHLIST_NAME').crawl(checkpoint=Checkpoint('WISHLIST_NAME', sys.argv[1]))",
+            "[(print(item.uuid, flush=True), i == 15 and time.sleep(60)) for i, item in enumerate(it, 1)]",
+        ])
+        with FixtureServer(FetchTest.routes).running() as server:
+            items = [item.uuid for item in Wishlist("WISHLIST_NAME", host=server.host)]
+
+            env = dict(os.environ, WISHLIST_HOST=server.host)
+            p = subprocess.Popen(
+                [sys.executable, "-W", "ignore", "-c", code, directory],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=env,
+                stdout=subprocess.PIPE,
+            )
+            first = []
+            try:
+                while len(first) < 15:
+                    first.append(p.stdout.readline().decode("utf-8").strip())
+
+            finally:
+                p.kill()
+                p.wait()
+                p.stdout.close()
+
+            # the 15th item is 5 items into the second page
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            rest = [item.uuid for item in w.resume(checkpoint=Checkpoint("WISHLIST_NAME", directory))]
+            self.assertEqual(items, first + rest)
+
+
+class FakeAmazonServerTest(BaseTestCase):
+    def test_crawl(self):
+        from wishlist_server import FakeAmazonServer
+
+        with FakeAmazonServer(items=60, per_page=25).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host)
+            items = [item.uuid for item in w]
+            self.assertEqual(60, len(set(items)))
+            self.assertEqual("B000000059", items[-1])
+            self.assertEqual(3, w.pages)
+            self.assertEqual("last_page", w.stop_reason)
+
+        with FakeAmazonServer(items=60, per_page=25, circular=True).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, stream=True)
+            self.assertEqual(items, [item.uuid for item in w])
+            self.assertEqual("circular", w.stop_reason)
+            self.assertEqual(3, len(server.requests))
+
+    def test_captcha(self):
+        from wishlist_server import FakeAmazonServer
+        from wishlist.exception import RobotError
+
+        with FakeAmazonServer(items=10, captcha=1.0).running() as server:
+            with self.assertRaises(RobotError):
+                list(Wishlist("WISHLIST_NAME", host=server.host))
+            self.assertEqual(1, server.captchas)
+
+
+class RegionTest(BaseTestCase):
+    def test_get_region(self):
+        from wishlist.region import get_region
+
+        r = get_region("de")
+        self.assertEqual("https://www.amazon.de", r.host)
+        self.assertEqual("de_DE", r.locale)
+
+        r = get_region(host="https://amazon.co.uk")
+        self.assertEqual("uk", r.code)
+        self.assertEqual("https://amazon.co.uk", r.host)
+
+        r = get_region(host="http://127.0.0.1:8000")
+        self.assertEqual("", r.code)
+        self.assertEqual("en_US", r.locale)
+
+        with self.assertRaises(ValueError):
+            get_region("xx")
+
+    def test_wishlist(self):
+        w = Wishlist("WISHLIST_NAME", region="de")
+        self.assertEqual("https://www.amazon.de", w.host)
+        self.assertEqual("de_DE", w.locale)
+        self.assertTrue(w.get_wishlist_url().startswith("https://www.amazon.de/"))
+
+        w = Wishlist("WISHLIST_NAME", region="fr", locale="en_GB")
+        self.assertEqual("https://www.amazon.fr", w.host)
+        self.assertEqual("en_GB", w.locale)
+
+        # without a host or region environ.HOST is followed
+        self.assertEqual(environ.HOST, Wishlist("WISHLIST_NAME").host)
+
+        from wishlist.crawl import Crawler
+        crawler = Crawler([], region="uk")
+        self.assertEqual("https://www.amazon.co.uk", crawler.get_wishlist("NAME").host)
+        w = crawler.get_wishlist("NAME it")
+        self.assertEqual("NAME", w.name)
+        self.assertEqual("it_IT", w.locale)
+
+    def test_concurrent(self):
+        """two lists on different hosts can be crawled at the same time"""
+        results = {}
+        with FixtureServer(FetchTest.routes).running() as server1:
+            with FixtureServer(FetchTest.routes).running() as server2:
+                def crawl(host, region):
+                    w = Wishlist("WISHLIST_NAME", host=host, region=region)
+                    results[host] = [(item.url, item.locale) for item in w]
+
+                threads = [
+                    threading.Thread(target=crawl, args=(server1.host, "")),
+                    threading.Thread(target=crawl, args=(server2.host, "de")),
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+
+        self.assertEqual(33, len(results[server1.host]))
+        self.assertEqual(33, len(results[server2.host]))
+        self.assertTrue(all(url.startswith(server1.host) for url, locale in results[server1.host]))
+        self.assertEqual(set(["en_US"]), set(locale for url, locale in results[server1.host]))
+        self.assertTrue(all(url.startswith(server2.host) for url, locale in results[server2.host]))
+        self.assertEqual(set(["de_DE"]), set(locale for url, locale in results[server2.host]))
+        self.assertEqual(3, len(server1.requests))
+        self.assertEqual(3, len(server2.requests))
+
+
+class TableTest(BaseTestCase):
+    def get_table(self, **kwargs):
+        with FixtureServer(FetchTest.routes).running() as server:
+            items = list(Wishlist("WISHLIST_NAME", host=server.host, detach=["uuid", "price", "rating", "added"]))
+            table = Wishlist("WISHLIST_NAME", host=server.host, **kwargs).to_table(["uuid", "price", "rating", "added", "wanted"])
+        return items, table
+
+    def test_to_table(self):
+        items, table = self.get_table(stream=True)
+        self.assertEqual(33, len(table))
+        self.assertEqual([item.uuid for item in items], table["uuid"])
+        self.assertEqual([item.price for item in items], list(table["price"]))
+        self.assertEqual([item.added for item in items], table.dates())
+        # quantity doesn't parse on the fixtures so every wanted is missing
+        self.assertEqual(set([-1]), set(table["wanted"]))
+        self.assertEqual(0, table.aggregate("wanted")["count"])
+
+        prices = [item.price for item in items]
+        d = table.aggregate("price")
+        self.assertEqual(33, d["count"])
+        self.assertAlmostEqual(sum(prices), d["sum"])
+        self.assertEqual(min(prices), d["min"])
+        self.assertEqual(max(prices), d["max"])
+
+    def test_where_sort(self):
+        items, table = self.get_table()
+        cheap = table.where("price", "<", 20.0)
+        self.assertEqual(
+            [item.uuid for item in items if item.price < 20.0],
+            cheap["uuid"]
+        )
+
+        table["price"][0] = float("nan")
+        s = table.sort("price", reverse=True)
+        self.assertEqual(max(item.price for item in items[1:]), s["price"][0])
+        self.assertEqual(items[0].uuid, s["uuid"][-1])
+        self.assertEqual(32, len(table.where("price", ">=", 0.0)))
+        self.assertEqual(32, table.aggregate("price")["count"])
+
+        mask = [a and b for a, b in zip(table.compare("price", ">", 10.0), table.compare("rating", ">=", 4.0))]
+        self.assertEqual(
+            [item.uuid for item in items[1:] if item.price > 10.0 and item.rating >= 4.0],
+            table.filter(mask)["uuid"]
+        )
+
+    def test_to_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy isn't installed")
+
+        items, table = self.get_table()
+        prices = table.to_numpy("price")
+        self.assertEqual(numpy.float64, prices.dtype)
+        self.assertEqual(list(table["price"]), prices.tolist())
+
+        # it's a view, not a copy
+        table["price"][1] = 1234.5
+        self.assertEqual(1234.5, prices[1])
+
+        arrays = table.to_numpy()
+        self.assertEqual(33, len(arrays["uuid"]))
+
+
+class LocaleParserTest(BaseTestCase):
+    def test_parse_price(self):
+        from wishlist.locales import get_parser
+
+        p = get_parser("en_US")
+        self.assertEqual(1424.05, p.parse_price("$1,424.05"))
+        self.assertEqual(1424.0, p.parse_price("$1,424"))
+        self.assertEqual(12.99, p.parse_price("2 new from $12.99"))
+        self.assertEqual(6.9, p.parse_price("6,90\u00a0\u20ac"))
+        self.assertEqual(None, p.parse_price("Unavailable"))
+
+        p = get_parser("de_DE")
+        self.assertEqual(1234.56, p.parse_price("1.234,56 \u20ac"))
+        self.assertEqual(1234.0, p.parse_price("1.234 \u20ac"))
+        self.assertEqual(1.5, p.parse_price("1,5 \u20ac"))
+
+        p = get_parser("fr_FR")
+        self.assertEqual(1234.56, p.parse_price("1\u202f234,56\u00a0\u20ac"))
+
+        self.assertTrue(p is get_parser("fr_FR"))
+
+    def test_parse_date(self):
+        from wishlist.locales import get_parser
+
+        p = get_parser("en_US")
+        self.assertEqual(datetime.date(2018, 6, 19), p.parse_date("Item added June 19, 2018"))
+        self.assertEqual(datetime.date(2018, 6, 19), p.parse_date("Added 19 June 2018"))
+        # the other languages are still found
+        self.assertEqual(datetime.date(2020, 7, 16), p.parse_date("Artikel hinzugef\u00fcgt 16. Juli 2020"))
+        self.assertEqual(None, p.parse_date("Item added"))
+
+        p = get_parser("es_ES")
+        self.assertEqual(datetime.date(2020, 7, 16), p.parse_date("A\u00f1adido el 16 de julio de 2020"))
+        self.assertEqual(datetime.date(2020, 3, 2), get_parser("fr_FR").parse_date("ajout\u00e9 le 2 mars 2020"))
+        self.assertEqual(datetime.date(2020, 7, 16), get_parser("ja_JP").parse_date("2020\u5e747\u670816\u65e5"))
+
+    def test_cache(self):
+        from wishlist.locales import LocaleParser, BoundedCache
+
+        p = LocaleParser("en_US")
+        p.cache = BoundedCache(2)
+        for _ in range(3):
+            self.assertEqual(datetime.date(2018, 6, 19), p.parse_date("Item added June 19, 2018"))
+        self.assertEqual(2, p.cache.hits)
+        self.assertEqual(1, p.cache.misses)
+
+        p.parse_date("Item added June 18, 2018")
+        p.parse_date("Item added June 17, 2018")
+        self.assertEqual(2, len(p.cache))
+        # the least recently used date was dropped
+        self.assertEqual(False, p.cache.get("Item added June 19, 2018", False))
+
+
+class ArchiverTest(BaseTestCase):
+    def test_policies(self):
+        from wishlist.archive import Archiver
+
+        a = Archiver("off")
+        self.assertFalse(a.archive("NAME-1", "<html></html>"))
+        self.assertIsNone(a.thread)
+
+        a = Archiver("sample", sample_rate=0.0)
+        self.assertFalse(a.archive("NAME-1", "<html></html>"))
+
+        a = Archiver("sample", sample_rate=1.0)
+        self.assertTrue(a.should_archive("NAME-1"))
+
+        with self.assertRaises(ValueError):
+            Archiver("foo")
+
+    def test_archive(self):
+        from wishlist.archive import Archiver
+        import gzip
+
+        directory = testdata.create_dir()
+        a = Archiver("always", directory=directory)
+        self.assertTrue(a.archive("NAME-1", "<html>1</html>"))
+        self.assertTrue(a.archive("NAME-2", "<html>2</html>"))
+        a.close()
+        self.assertIsNone(a.thread)
+
+        with gzip.open(os.path.join(directory, "NAME-2.html.gz")) as f:
+            self.assertEqual(b"<html>2</html>", f.read())
+
+        a = Archiver("always", directory=directory, compress=False)
+        a.archive("NAME-3", "<html>3</html>")
+        a.flush()
+        self.assertEqual([os.path.join(directory, "NAME-3.html")], a.paths)
+
+    def test_wishlist(self):
+        def archive_threads():
+            return [t for t in threading.enumerate() if t.name == "wishlist-archive"]
+
+        threads = archive_threads()
+        directory = testdata.create_dir()
+        with FixtureServer(AsyncWishlistTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, archive="off")
+            list(w)
+            self.assertEqual([], os.listdir(directory))
+
+            from wishlist.archive import Archiver
+            w = Wishlist("WISHLIST_NAME", host=server.host, archive=Archiver("always", directory=directory))
+            list(w)
+            self.assertEqual(
+                ["WISHLIST_NAME-1.html.gz", "WISHLIST_NAME-2.html.gz", "WISHLIST_NAME-3.html.gz"],
+                sorted(os.listdir(directory))
+            )
+            # an archiver that was passed in is left running for the caller
+            self.assertIsNotNone(w.archiver.thread)
+            w.archiver.close()
+
+            # an archiver the wishlist created is stopped when each crawl is done
+            environ_dir = environ.ARCHIVE_DIR
+            environ.ARCHIVE_DIR = testdata.create_dir()
+            try:
+                for _ in range(3):
+                    w = Wishlist("WISHLIST_NAME", host=server.host, archive="always")
+                    list(w)
+                    self.assertIsNone(w.archiver.thread)
+                    self.assertEqual(3, len(w.archiver.paths))
+
+            finally:
+                environ.ARCHIVE_DIR = environ_dir
+
+        self.assertEqual(threads, archive_threads())
+
+    def test_write_atomic(self):
+        from wishlist.archive import Archiver
+
+        class Body(str):
+            def encode(self, *args, **kwargs):
+                raise IOError("disk full")
+
+        directory = testdata.create_dir()
+        a = Archiver("always", directory=directory)
+        with self.assertRaises(IOError):
+            a.write("NAME-1", Body("<html>1</html>"))
+        # nothing is left behind, not even the temp file
+        self.assertEqual([], os.listdir(directory))
+
+        a.write("NAME-1", "<html>1</html>")
+        self.assertEqual(["NAME-1.html.gz"], os.listdir(directory))
+
+
+class PageCacheTest(BaseTestCase):
+    def test_get_set(self):
+        from wishlist.cache import PageCache
+
+        c = PageCache(testdata.create_dir())
+        url = "https://www.amazon.com/hz/wishlist/ls/NAME?lek=1234"
+        self.assertIsNone(c.get(url))
+        c.set(url, "<html>1</html>")
+        self.assertEqual("<html>1</html>", c.get(url))
+        self.assertIsNone(c.get(url + "5"))
+
+        c.ttl = 10
+        path = c.get_path(url)
+        mtime = time.time() - 20
+        os.utime(path, (mtime, mtime))
+        self.assertIsNone(c.get(url))
+
+        c.replay = True
+        self.assertEqual("<html>1</html>", c.get(url))
+
+    def test_evict(self):
+        from wishlist.cache import PageCache
+
+        c = PageCache(testdata.create_dir())
+        for i in range(3):
+            c.set("http://example.com/{}".format(i), testdata.get_ascii(1000))
+            path = c.get_path("http://example.com/{}".format(i))
+            os.utime(path, (time.time() - 100 + i, time.time()))
+        size = c.get_size()
+
+        # using page 0 makes page 1 the least recently used
+        c.get("http://example.com/0")
+        c.max_size = size
+        c.set("http://example.com/3", testdata.get_ascii(1000))
+
+        self.assertIsNone(c.get("http://example.com/1"))
+        self.assertIsNotNone(c.get("http://example.com/0"))
+        self.assertIsNotNone(c.get("http://example.com/3"))
+        self.assertLessEqual(c.get_size(), size)
+
+    def test_replay(self):
+        from wishlist.cache import PageCache
+        from wishlist.exception import CacheMissError
+
+        directory = testdata.create_dir()
+        with FixtureServer(AsyncWishlistTest.routes).running() as server:
+            w = Wishlist("WISHLIST_NAME", host=server.host, cache=PageCache(directory))
+            titles = [item.title for item in w]
+            self.assertEqual(3, len(server.requests))
+
+            w = Wishlist("WISHLIST_NAME", host=server.host, cache=PageCache(directory))
+            self.assertEqual(titles, [item.title for item in w])
+            self.assertEqual(3, len(server.requests))
+
+            w = Wishlist("WISHLIST_NAME", host=server.host, cache=PageCache(directory, replay=True))
+            self.assertEqual(titles, [item.title for item in w])
+            self.assertEqual(3, len(server.requests))
+
+            w = Wishlist("OTHER_NAME", cache=PageCache(directory, replay=True))
+            with self.assertRaises(CacheMissError):
+                list(w)
+            self.assertEqual(3, len(server.requests))
+
+
+class StoreTest(BaseTestCase):
+    def get_items(self, prices):
+        return [
+            {
+                "uuid": "UUID{}".format(i),
+                "title": "Item {}".format(i),
+                "price": price,
+                "digital": False,
+                "quantity": {"wanted": 1, "has": 0},
+            } for i, price in enumerate(prices)
+        ]
+
+    def test_save(self):
+        from wishlist.store import Store
+
+        with Store(os.path.join(testdata.create_dir(), "wishlist.db")) as s:
+            s.save(self.get_items([10.0, 20.0, 30.0, 0.0]), wishlist="NAME")
+            self.assertEqual([], s.price_drops(10))
+
+            s.save(self.get_items([9.5, 15.0, 33.0, 0.0]), wishlist="NAME")
+            drops = s.price_drops(5)
+            self.assertEqual(["UUID1", "UUID0"], [d["uuid"] for d in drops])
+            self.assertEqual(20.0, drops[0]["previous_price"])
+            self.assertEqual(["UUID1"], [d["uuid"] for d in s.price_drops(10)])
+
+            self.assertEqual(
+                ["UUID0", "UUID1"],
+                [d["uuid"] for d in s.cheapest(2)]
+            )
+
+            history = s.history("UUID2")
+            self.assertEqual([30.0, 33.0], [h["price"] for h in history])
+            self.assertEqual(0, s.get("UUID3")["in_stock"])
+
+    def test_missing_values(self):
+        from wishlist.store import Store
+
+        with Store() as s:
+            s.save(self.get_items([10.0, 20.0, 30.0]), wishlist="NAME")
+
+            # a price that didn't parse is NULL, not a 100% drop
+            items = self.get_items([None, 20.0, 15.0])
+            items.append({"uuid": "", "title": "no uuid 1", "price": 1.0})
+            items.append({"uuid": None, "title": "no uuid 2", "price": 2.0})
+            s.save(items, wishlist="NAME")
+            self.assertIsNone(s.get("UUID0")["price"])
+            self.assertIsNone(s.get("UUID0")["price_ratio"])
+            self.assertEqual(["UUID2"], [d["uuid"] for d in s.price_drops(10)])
+
+            # the items without a uuid aren't saved
+            self.assertEqual(3, len(s.query("SELECT * FROM item")))
+            self.assertEqual(3, s.query("SELECT items FROM crawl ORDER BY id DESC LIMIT 1")[0]["items"])
+
+            # UUID2 isn't on the list anymore so its old drop doesn't count
+            s.save(self.get_items([10.0, 20.0]), wishlist="NAME")
+            self.assertEqual([], s.price_drops(10))
+
+    def test_save_elements(self):
+        from wishlist.store import Store
+
+        w = Wishlist("WISHLIST_NAME")
+        items = list(w.get_items(self.get_soup("wishlist-1.html"), w.get_wishlist_url()))
+        with Store() as s:
+            s.save(items, wishlist="WISHLIST_NAME")
+            self.assertEqual(25, len(s.query("SELECT * FROM item")))
+            self.assertEqual(items[0].price, s.get(items[0].uuid)["price"])
+
+    def test_indexes(self):
+        from wishlist.store import Store
+
+        with Store() as s:
+            plan = s.query("EXPLAIN QUERY PLAN SELECT * FROM item WHERE price_ratio <= 0.9 AND price > 0 ORDER BY price_ratio ASC")
+            self.assertTrue("item_price_ratio" in plan[0]["detail"])
+
+            plan = s.query("EXPLAIN QUERY PLAN SELECT * FROM item WHERE in_stock = 1 AND price > 0 ORDER BY price ASC LIMIT 5")
+            self.assertTrue("item_in_stock_price" in plan[0]["detail"])
+
+
+class ReparserTest(BaseTestCase):
+    def get_directory(self):
+        import gzip
+        directory = testdata.create_dir()
+        pages = [
+            ("WISHLIST_NAME-1.html.gz", "html-2018-06.html"),
+            ("WISHLIST_NAME-2.html", "zero-price-2.html"),
+            ("WISHLIST_NAME-10.html", "wishlist-pagination-last.html"),
+            ("dump-OTHER-1.html", "wishlist-1.html"),
+        ]
+        for basename, filename in pages:
+            body = self.get_body(filename)
+            path = os.path.join(directory, basename)
+            if basename.endswith(".gz"):
+                with gzip.open(path, "wb") as f:
+                    f.write(body)
+            else:
+                with open(path, "wb") as f:
+                    f.write(body)
+        return directory
+
+    def test_reparse(self):
+        from wishlist.reparse import Reparser
+
+        directory = self.get_directory()
+        fields = ["uuid", "title", "price"]
+        results = list(Reparser(directory, processes=1, fields=fields))
+        self.assertEqual(
+            [("OTHER", 1), ("WISHLIST_NAME", 1), ("WISHLIST_NAME", 2), ("WISHLIST_NAME", 10)],
+            [(r.name, r.page) for r in results]
+        )
+        self.assertEqual([25, 10, 23, 0], [len(r.items) for r in results])
+
+        r = Reparser(directory, processes=2, fields=fields)
+        self.assertEqual(results, list(r))
+        self.assertEqual(58, r.count)
+        self.assertEqual({}, r.failures)
+
+    def test_failures(self):
+        from wishlist.reparse import Reparser
+
+        directory = self.get_directory()
+        r = Reparser(directory, processes=2, fields=["uuid", "quantity"])
+        results = list(r)
+        # quantity doesn't parse on these pages, every item should be reported
+        failed = [path for path in r.failures if path.endswith("WISHLIST_NAME-2.html")]
+        self.assertEqual(1, len(failed))
+        self.assertEqual(
+            sum(len(res.items) + len(res.failures) for res in results),
+            58
+        )
+
+    def test_bad_files(self):
+        """a file that can't be read shouldn't lose the rest of the pages"""
+        from wishlist.reparse import Reparser
+
+        directory = self.get_directory()
+        with open(os.path.join(directory, "WISHLIST_NAME-1.html.gz"), "rb") as f:
+            body = f.read()
+        # a page that was cut off in the middle of being written
+        with open(os.path.join(directory, "WISHLIST_NAME-3.html.gz"), "wb") as f:
+            f.write(body[:len(body) // 2])
+        with open(os.path.join(directory, "WISHLIST_NAME-4.html"), "wb") as f:
+            f.write(self.get_body("robot-check.html"))
+
+        r = Reparser(directory, processes=2, fields=["uuid", "title"])
+        results = list(r)
+        self.assertEqual(6, len(results))
+        self.assertEqual(58, r.count)
+        self.assertEqual(
+            ["WISHLIST_NAME-3.html.gz", "WISHLIST_NAME-4.html"],
+            sorted(os.path.basename(path) for path in r.failures)
+        )
+
+
+class AsyncWishlistTest(BaseTestCase):
+    routes = {
+        "lek=8cf07a89": "zero-price-2.html",
+        "lek=76d461d5": "wishlist-pagination-last.html",
+        "/wishlist/WISHLIST_NAME": "html-2018-06.html",
+    }
+
+    def test_aiter(self):
+        import asyncio
+        from wishlist.aio import AsyncWishlist
+
+        async def crawl(w):
+            return [(item.page, item.title, item.price) async for item in w]
+
+        with FixtureServer(self.routes).running() as server:
+            w = AsyncWishlist("WISHLIST_NAME", host=server.host, fields=["title", "price"])
+            items = asyncio.run(crawl(w))
+            self.assertEqual(3, len(server.requests))
+
+            sync_items = [(item.page, item.title, item.price) for item in Wishlist("WISHLIST_NAME", host=server.host)]
+
+        self.assertEqual(33, len(items))
+        self.assertEqual(sync_items, items)
+
+    def test_concurrent(self):
+        import asyncio
+        from wishlist.aio import AsyncWishlist
+
+        async def crawl(w):
+            return [item.uuid async for item in w]
+
+        async def crawl_all(names, host):
+            return await asyncio.gather(*[crawl(AsyncWishlist(name, host=host)) for name in names])
+
+        with FixtureServer(self.routes).running() as server:
+            results = asyncio.run(crawl_all(["WISHLIST_NAME"] * 4, server.host))
+
+        self.assertEqual(12, len(server.requests))
+        for uuids in results:
+            self.assertEqual(results[0], uuids)
+
+    def test_options(self):
+        """the async iteration is the sync crawl, so the Wishlist options and the
+        hooks work the same"""
+        import asyncio
+        from wishlist.aio import AsyncWishlist
+        from wishlist.core import WishlistRecord
+        from wishlist.events import Events
+
+        async def crawl(w):
+            return [item async for item in w.aiter_crawl(events=events)]
+
+        events = Events()
+        finished = []
+        events.on("crawl_finished", lambda **kwargs: finished.append(kwargs))
+        with FixtureServer(self.routes).running() as server:
+            w = AsyncWishlist("WISHLIST_NAME", host=server.host, detach=["uuid", "title"], stream=True)
+            items = asyncio.run(crawl(w))
+
+        self.assertEqual(33, len(items))
+        self.assertTrue(all(isinstance(item, WishlistRecord) for item in items))
+        self.assertEqual("last_page", w.stop_reason)
+        self.assertEqual(1, len(finished))
+        self.assertEqual(33, finished[0]["items"])
+        self.assertEqual("last_page", finished[0]["reason"])
+
+
+class CrawlerTest(BaseTestCase):
+    def test_crawl(self):
+        from wishlist.crawl import Crawler
+        from wishlist.exception import RobotError
+
+        lock = threading.Lock()
+        active = []
+        max_active = [0]
+
+        class FixtureWishlist(Wishlist):
+            def crawl(self, **kwargs):
+                if self.name == "ROBOT":
+                    raise RobotError("Amazon robot check")
+
+                with lock:
+                    active.append(self.name)
+                    max_active[0] = max(max_active[0], len(active))
+
+                soup = Soup(testdata.get_contents("html-2018-06.html"))
+                for item in self.get_items(soup, self.get_wishlist_url()):
+                    yield item
+
+                with lock:
+                    active.remove(self.name)
+
+        class FixtureCrawler(Crawler):
+            wishlist_class = FixtureWishlist
+
+        names = ["ONE", "ROBOT", "TWO", "", "THREE"]
+        c = FixtureCrawler(names, workers=2, per_host=1)
+        results = list(c)
+
+        self.assertEqual(31, len(results))
+        self.assertEqual(1, max_active[0])
+        self.assertEqual(set(["ONE", "TWO", "THREE", "ROBOT"]), set(c.counts))
+        self.assertEqual(["ROBOT"], list(c.failures))
+        self.assertTrue(isinstance(c.failures["ROBOT"], RobotError))
+
+        titles = [r.item.title for r in results if r.name == "TWO"]
+        self.assertEqual(10, len(titles))
+        self.assertEqual(titles, [r.item.title for r in results if r.name == "ONE"])
+
+        c = FixtureCrawler(names, workers=2)
+        it = iter(c)
+        next(it)
+        it.close()
+        names = [t.name for t in threading.enumerate()]
+        self.assertFalse([n for n in names if n.startswith("wishlist-crawl")])
+
+    def test_crawl_hosts(self):
+        """a worker shouldn't wait on a full host while a name on another host is
+        waiting"""
+        from wishlist.crawl import Crawler
+
+        lock = threading.Lock()
+        active = []
+        overlaps = []
+        started = {}
+
+        class FixtureWishlist(Wishlist):
+            def crawl(self, **kwargs):
+                with lock:
+                    started[self.name] = time.time()
+                    active.append(self.host)
+                    overlaps.append(list(active))
+                time.sleep(0.1)
+                with lock:
+                    active.remove(self.host)
+                return iter([])
+
+        class FixtureCrawler(Crawler):
+            wishlist_class = FixtureWishlist
+
+        names = ["ONE", "TWO", "THREE", "FOUR de"]
+        c = FixtureCrawler(names, workers=2, per_host=1)
+        start = time.time()
+        self.assertEqual([], list(c))
+        # the de list is crawled alongside the first list, not after the second
+        # list got a turn
+        self.assertLess(started["FOUR"] - start, 0.05)
+        for hosts in overlaps:
+            self.assertEqual(len(hosts), len(set(hosts)))
+        self.assertEqual(4, len(c.counts))
+        self.assertEqual({}, c.failures)
+
+        c = FixtureCrawler(["ONE", "TWO xx"], workers=2)
+        self.assertEqual(1, len([r for r in c if r.error]))
+        self.assertTrue(isinstance(c.failures["TWO xx"], ValueError))